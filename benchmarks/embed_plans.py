@@ -0,0 +1,100 @@
+"""Compares the per-embed cost of building a member report in different ways.
+
+"synthesized" recreates the embed's mixin class and validates everything on every call
+(as embeds used to be built), "cached class" uses `create_embed_with_files()`, and
+"compiled plan" fills in an `EmbedPlan` and `FieldsPlan` that are prepared up front.
+
+Usage:
+    python benchmarks/embed_plans.py [--number 20000]
+"""
+
+import timeit
+from argparse import ArgumentParser
+
+from qibot.embeds import (
+    EmbedPlan,
+    FieldsPlan,
+    create_embed_with_files,
+    create_inline_fields,
+    create_standalone_fields,
+)
+from qibot.embeds.builders import _MIXIN_MATCHER
+from qibot.embeds.core import EmbedData
+
+_COLOR = 0x141414
+_EMOJI = "🌈"
+_TEXT = "**<@1001> has entered the building.**"
+_THUMBNAIL = "https://cdn.discordapp.com/avatars/1001/abc.png"
+_CONTENTS = ("1001", "user1#0001", "<t:1666000000> (2 days ago)")
+
+
+def _build_synthesized() -> None:
+    params = {
+        "color": _COLOR,
+        "text": _TEXT,
+        "emoji": _EMOJI,
+        "thumbnail": _THUMBNAIL,
+        "fields": _create_fields(),
+    }
+    mixins = {
+        mixin
+        for mixin, required_params in _MIXIN_MATCHER.items()
+        if all(params.get(param_name) for param_name in required_params)
+    }
+    label = "And".join(mixin.__name__ for mixin in mixins)
+    cls = type(f"EmbedDataWith{label}", (*mixins, EmbedData), {})
+    embed_data = cls(**params)
+    embed_data.build_embed()
+    embed_data.get_files()
+
+
+def _build_with_cached_class() -> None:
+    create_embed_with_files(
+        color=_COLOR,
+        text=_TEXT,
+        emoji=_EMOJI,
+        thumbnail=_THUMBNAIL,
+        fields=_create_fields(),
+    )
+
+
+def _create_fields() -> list:
+    return create_inline_fields(
+        ("❄", "Unique ID", _CONTENTS[0]),
+        ("🏷️", "Current Tag", _CONTENTS[1]),
+    ) + create_standalone_fields(("🐣", "Account Created", _CONTENTS[2]))
+
+
+_EMBED_PLAN = EmbedPlan(color=_COLOR, emoji=_EMOJI)
+_FIELDS_PLAN = FieldsPlan(
+    *create_inline_fields(("❄", "Unique ID", None), ("🏷️", "Current Tag", None)),
+    *create_standalone_fields(("🐣", "Account Created", None)),
+)
+
+
+def _build_with_plan() -> None:
+    _EMBED_PLAN.build(
+        text=_TEXT, thumbnail=_THUMBNAIL, fields=_FIELDS_PLAN.fill(*_CONTENTS)
+    )
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    baseline_us = 0.0
+    for label, func in (
+        ("synthesized", _build_synthesized),
+        ("cached class", _build_with_cached_class),
+        ("compiled plan", _build_with_plan),
+    ):
+        seconds = min(timeit.repeat(func, number=args.number, repeat=5))
+        per_embed_us = seconds / args.number * 1_000_000
+        baseline_us = baseline_us or per_embed_us
+        speedup = baseline_us / per_embed_us
+        print(f"{label:>14} | {per_embed_us:7.2f} us/embed | {speedup:4.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,508 @@
+"""Drives QiBot's cogs with synthetic member events, against a local Discord stand-in.
+
+Member joins, leaves, and renames are dispatched through a real `QiBot` instance (so
+they reach `MemberListeners` the same way gateway events would) at a configurable
+rate, following one of these shapes:
+
+    steady  Random arrivals averaging `--rate` events per second.
+    burst   `--burst-size` events at once, every `--burst-interval` seconds.
+    ramp    Arrivals speeding up linearly from 0 to `--rate` events per second.
+
+Webhook messages, CDN avatar downloads, and interaction responses are all sent to an
+in-process HTTP server that imitates Discord's latency and webhook rate limits
+(including the rate-limit headers). Each event is considered delivered once a
+message that mentions its member is posted to the admin log channel.
+
+Usage:
+    python benchmarks/gateway_load.py [--rate 20] [--duration 10] [--shape steady]
+"""
+
+import asyncio
+import json
+import random
+import re
+import statistics
+import time
+from argparse import ArgumentParser, Namespace
+from collections import Counter, deque
+from collections.abc import Callable
+from datetime import datetime, timezone
+from io import BytesIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+from typing import Any, cast
+from unittest import mock
+
+from aiohttp import BodyPartReader, web
+from discord import Asset, MessageType, TextChannel, Webhook
+from discord.http import Route
+from PIL.Image import new as new_image
+
+from qibot.assets import DATA_PATH
+from qibot.bot import QiBot
+from qibot.characters import Greeter, Reporter
+from qibot.characters import core as character_core
+from qibot.utils import (
+    EVENT_PIPELINE,
+    HTTP_CLIENT,
+    OUTBOUND_SCHEDULER,
+    BotChannel,
+    BotConfig,
+    initialize_logging,
+    shutdown_image_executor,
+)
+from qibot.utils.channels import _CHANNEL_CACHE, _WEBHOOK_CACHE
+from qibot.utils.outbox import Outbox
+
+_API_PATH = "/api/v10"
+_MENTION_PATTERN = re.compile(r"<@!?(\d+)>")
+_RENAME_FIELD_TITLE = "Old Name"
+_PROBE_INTERVAL_SECONDS = 0.005
+_FIRST_MEMBER_ID = 100_000_000_000_000_000
+_FIRST_WEBHOOK_ID = 900_000_000_000_000_000
+
+
+class _DiscordStandIn:
+    """A tiny imitation of the parts of Discord's HTTP API that the bot uses."""
+
+    def __init__(self, args: Namespace) -> None:
+        self.on_webhook_message: Callable[[int, Counter], None] = lambda *_: None
+        self.stats: Counter = Counter()
+
+        self._latency = args.latency_ms / 1000
+        self._jitter = args.jitter_ms / 1000
+        self._rate_limit = args.rate_limit
+        self._rate_limit_window = args.rate_limit_window
+        self._buckets: dict[int, tuple[float, int]] = {}  # Reset time, request count.
+        self._avatar_bytes = _create_avatar_bytes()
+
+        self._app = web.Application()
+        self._app.router.add_post(
+            f"{_API_PATH}/webhooks/{{webhook_id}}/{{token}}", self._handle_webhook
+        )
+        self._app.router.add_post(
+            f"{_API_PATH}/interactions/{{id}}/{{token}}/callback",
+            self._handle_interaction,
+        )
+        self._app.router.add_get("/avatars/{user_id}/{filename}", self._handle_avatar)
+        self._runner = web.AppRunner(self._app, access_log=None)
+
+    async def start(self) -> str:
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        return f"http://{host}:{port}"
+
+    async def stop(self) -> None:
+        await self._runner.cleanup()
+
+    async def _simulate_latency(self) -> None:
+        await asyncio.sleep(max(random.gauss(self._latency, self._jitter), 0))
+
+    async def _handle_webhook(self, request: web.Request) -> web.Response:
+        await self._simulate_latency()
+        webhook_id = int(request.match_info["webhook_id"])
+
+        now = time.monotonic()
+        reset_time, count = self._buckets.get(webhook_id, (0.0, 0))
+        if now >= reset_time:
+            reset_time, count = now + self._rate_limit_window, 0
+        reset_after = reset_time - now
+
+        if count >= self._rate_limit:
+            self.stats["webhook_rate_limited"] += 1
+            body = {"message": "You are being rate limited.", "global": False}
+            return web.json_response(
+                body | {"retry_after": reset_after},
+                status=429,
+                headers=self._get_rate_limit_headers(webhook_id, 0, reset_after)
+                | {"Retry-After": f"{reset_after:.3f}", "Via": "1.1 stand-in"},
+            )
+
+        self._buckets[webhook_id] = (reset_time, count + 1)
+        self.stats["webhook_messages"] += 1
+        payload, attachment_sizes = await _read_payload(request)
+        self.stats["uploaded_bytes"] += sum(attachment_sizes.values())
+        self.on_webhook_message(webhook_id, _count_mentions(payload))
+
+        remaining = self._rate_limit - count - 1
+        headers = self._get_rate_limit_headers(webhook_id, remaining, reset_after)
+        if request.query.get("wait") == "1":
+            # discord.py only parses the body if the content type is exactly this.
+            headers["Content-Type"] = "application/json"
+            message = _create_message_payload(webhook_id, attachment_sizes)
+            return web.Response(body=json.dumps(message).encode(), headers=headers)
+        return web.Response(status=204, headers=headers)
+
+    async def _handle_interaction(self, _: web.Request) -> web.Response:
+        await self._simulate_latency()
+        self.stats["interaction_responses"] += 1
+        return web.Response(status=204)
+
+    async def _handle_avatar(self, request: web.Request) -> web.Response:
+        await self._simulate_latency()
+        self.stats["avatar_downloads"] += 1
+        return web.Response(
+            body=self._avatar_bytes,
+            content_type="image/png",
+            headers={
+                "ETag": f'"{request.match_info["filename"]}"',
+                "Cache-Control": "public, max-age=86400",
+            },
+        )
+
+    def _get_rate_limit_headers(
+        self, webhook_id: int, remaining: int, reset_after: float
+    ) -> dict[str, str]:
+        return {
+            "X-RateLimit-Limit": str(self._rate_limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+            "X-RateLimit-Reset": f"{time.time() + reset_after:.3f}",
+            "X-RateLimit-Bucket": f"webhook-{webhook_id}",
+        }
+
+
+async def _read_payload(request: web.Request) -> tuple[str, dict[str, int]]:
+    # Returns the JSON payload, and the size of each attached file (by filename).
+    if not request.content_type.startswith("multipart/"):
+        return await request.text(), {}
+
+    payload_text, attachment_sizes = "", {}
+    reader = await request.multipart()
+    while part := await reader.next():
+        if not isinstance(part, BodyPartReader):
+            continue  # Discord never sends nested multipart bodies.
+        elif part.name == "payload_json":
+            payload_text = await part.text()
+        else:
+            attachment_sizes[part.filename or ""] = len(await part.read())
+    return payload_text, attachment_sizes
+
+
+def _count_mentions(payload: str) -> Counter:
+    # Counts the events reported for each member, keyed by (member ID, is rename). Each
+    # embed reports one event per member it mentions, and a batched message can report
+    # more than one event for the same member (e.g. a join and a leave).
+    mentions: Counter = Counter()
+    for embed in json.loads(payload or "{}").get("embeds", []):
+        embed_text = json.dumps(embed)
+        is_rename = _RENAME_FIELD_TITLE in embed_text
+        mentions.update(
+            {(int(id_), is_rename) for id_ in _MENTION_PATTERN.findall(embed_text)}
+        )
+    return mentions
+
+
+def _create_message_payload(
+    webhook_id: int, attachment_sizes: dict[str, int]
+) -> dict[str, Any]:
+    # Only includes what's needed to construct a `WebhookMessage` from the response.
+    message_id = time.monotonic_ns()
+    return {
+        "id": str(message_id),
+        "channel_id": "0",
+        "webhook_id": str(webhook_id),
+        "author": {"id": str(webhook_id), "username": "stand-in", "discriminator": "0"},
+        "content": "",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [
+            {
+                "id": str(message_id + index),
+                "filename": filename,
+                "size": size,
+                "url": f"{Asset.BASE}/attachments/{message_id}/{filename}",
+                "proxy_url": f"{Asset.BASE}/attachments/{message_id}/{filename}",
+            }
+            for index, (filename, size) in enumerate(attachment_sizes.items())
+        ],
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+    }
+
+
+def _create_avatar_bytes(size: int = 128) -> bytes:
+    with BytesIO() as image_bytes:
+        new_image("RGB", (size, size), (240, 96, 128)).save(image_bytes, format="png")
+        return image_bytes.getvalue()
+
+
+class _DeliveryTracker:
+    def __init__(self, admin_log_webhook_id: int) -> None:
+        self.latencies: list[float] = []
+        self.last_delivery_time = 0.0
+        self._admin_log_webhook_id = admin_log_webhook_id
+        # Dispatch times of the events that haven't been reported, by (member, rename).
+        self._pending: dict[tuple[int, bool], deque[float]] = {}
+
+    @property
+    def pending_count(self) -> int:
+        return sum(len(dispatch_times) for dispatch_times in self._pending.values())
+
+    def record_dispatch(self, member_id: int, is_rename: bool = False) -> None:
+        key = (member_id, is_rename)
+        self._pending.setdefault(key, deque()).append(time.perf_counter())
+
+    def record_message(self, webhook_id: int, mentions: Counter) -> None:
+        if webhook_id != self._admin_log_webhook_id:
+            return
+        now = time.perf_counter()
+        for (member_id, is_rename), count in mentions.items():
+            dispatch_times = self._pending.get((member_id, is_rename), deque())
+            # A member's renames are debounced, so one report can cover several.
+            if is_rename:
+                count = len(dispatch_times)
+            for _ in range(min(count, len(dispatch_times))):
+                self.latencies.append(now - dispatch_times.popleft())
+                self.last_delivery_time = now
+
+
+class _FakeMemberFactory:
+    def __init__(self) -> None:
+        self._next_id = _FIRST_MEMBER_ID
+        self.guild = SimpleNamespace(
+            id=BotConfig.get_server_id(),
+            system_channel=object(),
+            system_channel_flags=SimpleNamespace(join_notifications=True),
+        )
+
+    def create(self) -> SimpleNamespace:
+        member_id, self._next_id = self._next_id, self._next_id + 1
+        now = datetime.now(timezone.utc)
+        return SimpleNamespace(
+            id=member_id,
+            mention=f"<@{member_id}>",
+            name=f"user{member_id}",
+            discriminator=f"{member_id % 10000:04}",
+            display_name=f"user{member_id}",
+            display_avatar=Asset._from_avatar(None, member_id, f"a{member_id:x}"),
+            created_at=now,
+            joined_at=now,
+            roles=[SimpleNamespace(mention="@everyone")],
+            guild=self.guild,
+        )
+
+    @staticmethod
+    def rename(member: SimpleNamespace) -> SimpleNamespace:
+        return SimpleNamespace(**(vars(member) | {"display_name": f"{member.name}!"}))
+
+
+def _get_event_offsets(args: Namespace) -> list[float]:
+    if args.shape == "burst":
+        burst_count = max(int(args.duration / args.burst_interval), 1)
+        return [
+            burst_index * args.burst_interval
+            for burst_index in range(burst_count)
+            for _ in range(args.burst_size)
+        ]
+    elif args.shape == "ramp":
+        # With a linear ramp, the k-th of N events happens at duration * sqrt(k / N).
+        event_count = max(int(args.rate * args.duration / 2), 1)
+        return [args.duration * (k / event_count) ** 0.5 for k in range(event_count)]
+    else:
+        offsets, offset = [], random.expovariate(args.rate)
+        while offset < args.duration:
+            offsets.append(offset)
+            offset += random.expovariate(args.rate)
+        return offsets
+
+
+def _parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for item in mix.split(","):
+        kind, _, weight = item.partition("=")
+        weights[kind.strip()] = float(weight)
+    return weights
+
+
+async def _probe_loop_lag(lags: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(_PROBE_INTERVAL_SECONDS)
+        lags.append(time.perf_counter() - start - _PROBE_INTERVAL_SECONDS)
+
+
+def _install_stand_in(base_url: str) -> int:
+    # Point discord.py's REST routes and CDN assets at the stand-in.
+    setattr(Route, "base", property(lambda _: f"{base_url}{_API_PATH}"))
+    Asset.BASE = base_url
+
+    server_id = BotConfig.get_server_id()
+    channels = _CHANNEL_CACHE.setdefault(server_id, {})
+    webhooks = _WEBHOOK_CACHE.setdefault(server_id, {})
+    for index, channel in enumerate(BotChannel):
+        webhook_id = _FIRST_WEBHOOK_ID + index
+        channels[channel.name] = cast(
+            TextChannel,
+            SimpleNamespace(
+                id=index,
+                name=channel.name.lower(),
+                jump_url=f"{base_url}/{channel.name}",
+            ),
+        )
+        webhooks[channel.name] = Webhook.partial(
+            webhook_id, "token", session=HTTP_CLIENT.session
+        )
+    return webhooks[BotChannel.ADMIN_LOG.name].id
+
+
+async def _generate_load(
+    bot: QiBot, args: Namespace, tracker: _DeliveryTracker, counts: Counter
+) -> None:
+    members = _FakeMemberFactory()
+    joined_members: list[SimpleNamespace] = []
+    mix = _parse_mix(args.mix)
+    loop = asyncio.get_running_loop()
+
+    def dispatch_join_message(member_id: int) -> None:
+        author = SimpleNamespace(id=member_id)
+        message = SimpleNamespace(
+            type=MessageType.new_member, author=author, guild=members.guild
+        )
+        bot.dispatch("message", message)
+
+    start_time = loop.time()
+    for offset in _get_event_offsets(args):
+        if (delay := start_time + offset - loop.time()) > 0:
+            await asyncio.sleep(delay)
+
+        kind = random.choices(list(mix), weights=list(mix.values()))[0]
+        if (kind != "join") and not joined_members:
+            kind = "join"
+        counts[kind] += 1
+
+        if kind == "join":
+            member = members.create()
+            joined_members.append(member)
+            tracker.record_dispatch(member.id)
+            bot.dispatch("member_join", member)
+            join_message_delay = args.join_message_delay_ms / 1000
+            loop.call_later(join_message_delay, dispatch_join_message, member.id)
+        elif kind == "leave":
+            member = joined_members.pop(random.randrange(len(joined_members)))
+            tracker.record_dispatch(member.id)
+            bot.dispatch("member_remove", member)
+        else:
+            before = random.choice(joined_members)
+            tracker.record_dispatch(before.id, is_rename=True)
+            bot.dispatch("member_update", before, members.rename(before))
+
+
+def _format_percentiles(samples: list[float]) -> str:
+    samples_ms = sorted(sample * 1000 for sample in samples) or [0.0]
+
+    def percentile(fraction: float) -> float:
+        return samples_ms[min(len(samples_ms) - 1, int(len(samples_ms) * fraction))]
+
+    return (
+        f"mean {statistics.fmean(samples_ms):8.1f} ms | p50 {percentile(0.5):8.1f} ms"
+        f" | p99 {percentile(0.99):8.1f} ms | max {samples_ms[-1]:8.1f} ms"
+    )
+
+
+async def _run(args: Namespace) -> None:
+    stand_in = _DiscordStandIn(args)
+    base_url = await stand_in.start()
+    tracker = _DeliveryTracker(_install_stand_in(base_url))
+    stand_in.on_webhook_message = tracker.record_message
+
+    # Reports go through an outbox of their own, so the real bot never replays them.
+    temp_dir = TemporaryDirectory()
+    outbox = Outbox(
+        scheduler=OUTBOUND_SCHEDULER,
+        enabled=True,
+        database_path=Path(temp_dir.name) / "outbox.sqlite3",
+        flush_interval=0.05,
+        retry_delay=2.0,
+        max_attempts=5,
+    )
+    outbox_patch = mock.patch.object(character_core, "OUTBOX", outbox)
+    outbox_patch.start()
+
+    bot = QiBot()
+    counts: Counter = Counter()
+    lags: list[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe_loop_lag(lags, stop))
+
+    start_time = time.perf_counter()
+    await _generate_load(bot, args, tracker, counts)
+    load_seconds = time.perf_counter() - start_time
+
+    drain_deadline = time.perf_counter() + args.drain_timeout
+    while tracker.pending_count and (time.perf_counter() < drain_deadline):
+        await asyncio.sleep(0.05)
+
+    stop.set()
+    await probe
+    await EVENT_PIPELINE.close()
+    await Reporter.flush()
+    await Greeter.flush()
+    await OUTBOUND_SCHEDULER.close()
+    await outbox.close()
+    outbox_patch.stop()
+    temp_dir.cleanup()
+    await HTTP_CLIENT.close()
+    await stand_in.stop()
+    shutdown_image_executor()
+
+    dispatched = sum(counts.values())
+    delivered = len(tracker.latencies)
+    delivery_seconds = (tracker.last_delivery_time or time.perf_counter()) - start_time
+    event_summary = ", ".join(f"{kind} {count}" for kind, count in counts.items())
+
+    print(f"Shape: {args.shape} | {dispatched} events ({event_summary})")
+    print(f"Offered load: {dispatched / load_seconds:8.1f} events/s")
+    print(f"Throughput:   {delivered / delivery_seconds:8.1f} events/s")
+    print(f"Delivered:    {delivered}/{dispatched} within the drain timeout")
+    print(f"End-to-end:   {_format_percentiles(tracker.latencies)}")
+    print(f"Loop lag:     {_format_percentiles(lags)}")
+    print(f"Stand-in:     {json.dumps(dict(stand_in.stats))}")
+
+    if dispatched and not delivered:
+        raise SystemExit("No events were delivered. Check the log for errors.")
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--shape", choices=("steady", "burst", "ramp"), default="steady"
+    )
+    parser.add_argument("--rate", type=float, default=20.0, help="Events per second.")
+    parser.add_argument("--duration", type=float, default=10.0, help="In seconds.")
+    parser.add_argument("--burst-size", type=int, default=50)
+    parser.add_argument("--burst-interval", type=float, default=5.0)
+    parser.add_argument("--mix", default="join=6,leave=3,rename=1")
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--jitter-ms", type=float, default=30.0)
+    parser.add_argument("--rate-limit", type=int, default=5, help="Per webhook.")
+    parser.add_argument("--rate-limit-window", type=float, default=2.0)
+    parser.add_argument("--join-message-delay-ms", type=float, default=50.0)
+    parser.add_argument("--drain-timeout", type=float, default=60.0)
+    parser.add_argument("--loglevel", default="w")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # Without a real config, every event would be ignored as coming from another server.
+    if not BotConfig.get_server_id():
+        parser.error(
+            'the config file has no "server_id". Set it (and "channel_ids") in '
+            f"{DATA_PATH / 'config.json'}. Any IDs will do, since the benchmark "
+            "never contacts Discord."
+        )
+
+    random.seed(args.seed)
+    initialize_logging(log_level=args.loglevel)
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
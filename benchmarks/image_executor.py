@@ -0,0 +1,78 @@
+"""Measures event loop lag while rendering avatars in each image executor mode.
+
+Renders a batch of concurrent avatars (resize + circle crop + PNG encode) from an
+in-memory source image, while a probe task measures how late the event loop wakes up.
+No network access or Discord connection is required.
+
+Usage:
+    python benchmarks/image_executor.py [--renders 100] [--workers 2]
+"""
+
+import asyncio
+import statistics
+import time
+from argparse import ArgumentParser
+from io import BytesIO
+
+from PIL.Image import new as new_image
+
+from qibot.utils.executors import BoundedExecutor, ExecutorMode
+from qibot.utils.images import ImageWrapper
+
+_PROBE_INTERVAL_SECONDS = 0.005
+
+
+def _create_source_image(size: int = 512) -> bytes:
+    with BytesIO() as image_bytes:
+        new_image("RGB", (size, size), (240, 96, 128)).save(image_bytes, format="png")
+        return image_bytes.getvalue()
+
+
+async def _probe_loop_lag(lags: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(_PROBE_INTERVAL_SECONDS)
+        lags.append(time.perf_counter() - start - _PROBE_INTERVAL_SECONDS)
+
+
+async def _render_avatar(source: bytes, executor: BoundedExecutor) -> None:
+    await ImageWrapper(source, executor).resize(64).circle_crop().write_to_bytes()
+
+
+async def _run_mode(mode: ExecutorMode, renders: int, workers: int) -> None:
+    source = _create_source_image()
+    executor = BoundedExecutor(mode.value, mode, workers, max_queued=renders)
+    await _render_avatar(source, executor)  # Warm up the executor before measuring.
+
+    lags: list[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe_loop_lag(lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(_render_avatar(source, executor) for _ in range(renders)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+    executor.shutdown()
+
+    lags_ms = sorted(lag * 1000 for lag in lags) or [0.0]
+    p99_ms = lags_ms[min(len(lags_ms) - 1, int(len(lags_ms) * 0.99))]
+    print(
+        f"{mode.value:>8} | total {elapsed * 1000:8.1f} ms"
+        f" | lag mean {statistics.fmean(lags_ms):7.2f} ms"
+        f" | p99 {p99_ms:7.2f} ms | max {lags_ms[-1]:7.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--renders", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"Rendering {args.renders} concurrent avatars with {args.workers} worker(s).")
+    for mode in ExecutorMode:
+        asyncio.run(_run_mode(mode, args.renders, args.workers))
+
+
+if __name__ == "__main__":
+    main()
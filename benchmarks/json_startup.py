@@ -0,0 +1,70 @@
+"""Measures how long it takes to load a large data file, with and without a snapshot.
+
+A JSON5 file (with comments and trailing commas, so the fast `json` parser can't
+handle it) is generated in the data directory with thousands of lines of dialogue.
+"cold" loads it after deleting its snapshot (i.e. the first startup after an edit),
+and "warm" loads it from the snapshot that the previous load saved.
+
+Usage:
+    python benchmarks/json_startup.py [--lines 5000] [--repeat 5]
+"""
+
+import timeit
+from argparse import ArgumentParser
+
+from qibot.assets import DATA_PATH
+from qibot.utils import load_json_from_file
+
+_FILENAME = "benchmark_startup"
+_LINES_PER_ACTION = 50
+
+
+def _generate_json5(line_count: int) -> str:
+    lines = ["{", "  // Generated by benchmarks/json_startup.py."]
+    for action_index in range(max(line_count // _LINES_PER_ACTION, 1)):
+        lines += [f'  "ACTION_{action_index}": {{', '    "dialogue": [']
+        lines += [
+            f'      "Line {i} of action {action_index}, for $name.",'
+            for i in range(_LINES_PER_ACTION)
+        ]
+        lines += ["    ],", '    "emoji": "🌈",', "  },"]
+    return "\n".join(lines + ["}"])
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    file_path = DATA_PATH / f"{_FILENAME}.json"
+    snapshot_path = DATA_PATH / f"{_FILENAME}.json.dict-lowercase.snapshot"
+
+    def load() -> None:
+        load_json_from_file(_FILENAME, dict, lowercase_dict_keys=True)
+
+    def load_cold() -> None:
+        snapshot_path.unlink(missing_ok=True)
+        load()
+
+    try:
+        file_path.write_text(_generate_json5(args.lines), encoding="utf-8")
+        load()  # Make sure the snapshot exists before the first "warm" load.
+
+        baseline_ms = 0.0
+        for label, func in (("cold", load_cold), ("warm", load)):
+            seconds = min(timeit.repeat(func, number=1, repeat=args.repeat))
+            load_ms = seconds * 1000
+            baseline_ms = baseline_ms or load_ms
+            speedup = baseline_ms / load_ms
+            print(f"{label:>5} | {load_ms:9.2f} ms | {speedup:6.1f}x")
+
+        print(f"\n{args.lines} lines | {file_path.stat().st_size:,} bytes of JSON5")
+        print(f"Snapshot size: {snapshot_path.stat().st_size:,} bytes")
+    finally:
+        file_path.unlink(missing_ok=True)
+        snapshot_path.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    main()
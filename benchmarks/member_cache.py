@@ -0,0 +1,180 @@
+"""Measures the memory and startup cost of each member cache policy, with fake members.
+
+For each policy, a bot is created (without connecting to Discord) and given a guild
+with `--members` members. If the policy chunks guilds at startup, every member is
+loaded from synthetic chunk payloads, the same way discord.py handles real ones. The
+time it takes Discord to send those chunks isn't simulated, so the reported startup
+time is only the bot's own share of the work.
+
+Afterwards, `--events` join, rename, and leave payloads are fed to the gateway parsers
+for random members, to show how much the cache grows and which events still reach the
+listeners. Nothing is actually reported, since the dispatched events are only counted.
+
+Usage:
+    python benchmarks/member_cache.py [--members 100000] [--events 1000]
+"""
+
+import asyncio
+import gc
+import random
+import time
+import tracemalloc
+from argparse import ArgumentParser, Namespace
+from collections import Counter
+from typing import Any, cast
+
+from discord import Guild, Member
+from discord.state import ConnectionState
+from discord.types.guild import Guild as GuildPayload
+from discord.types.member import MemberWithUser
+
+from qibot.bot import MemberCachePolicy, QiBot, _get_required_intents
+from qibot.utils import BotConfig, initialize_logging
+
+_FIRST_MEMBER_ID = 100_000_000_000_000_000
+
+
+def _create_guild_payload(guild_id: int, member_count: int) -> dict[str, Any]:
+    everyone_role = {
+        "id": str(guild_id),
+        "name": "@everyone",
+        "permissions": "0",
+        "position": 0,
+        "color": 0,
+        "hoist": False,
+        "managed": False,
+        "mentionable": False,
+    }
+    return {
+        "id": str(guild_id),
+        "name": "Benchmark Server",
+        "member_count": member_count,
+        "large": True,
+        "roles": [everyone_role],
+        "channels": [],
+        "members": [],
+    }
+
+
+def _create_member_payload(member_id: int, nick: str | None = None) -> dict[str, Any]:
+    return {
+        "user": {
+            "id": str(member_id),
+            "username": f"user{member_id}",
+            "discriminator": f"{member_id % 10000:04}",
+            "avatar": f"{member_id:032x}",
+        },
+        "nick": nick,
+        "roles": [],
+        "joined_at": "2022-10-01T00:00:00+00:00",
+        "deaf": False,
+        "mute": False,
+    }
+
+
+def _load_members(state: ConnectionState, guild: Guild, member_count: int) -> None:
+    if not state._chunk_guilds:
+        return
+    # This is what discord.py does with each chunk that it requested at startup.
+    for member_index in range(member_count):
+        payload = cast(
+            MemberWithUser, _create_member_payload(_FIRST_MEMBER_ID + member_index)
+        )
+        guild._add_member(Member(data=payload, guild=guild, state=state))
+
+
+def _measure_policy(policy: MemberCachePolicy, args: Namespace) -> dict[str, Any]:
+    bot = QiBot(**policy.get_client_options(_get_required_intents()))
+    state = bot._connection
+    dispatched: Counter = Counter()
+
+    def count_dispatch(event: str, *_: Any, **__: Any) -> None:
+        dispatched[event] += 1
+
+    for dispatcher in (bot, state):
+        setattr(dispatcher, "dispatch", count_dispatch)
+    guild_id = BotConfig.get_server_id()
+    guild_payload = cast(GuildPayload, _create_guild_payload(guild_id, args.members))
+
+    # Tracing memory allocations is slow, so the startup time is measured separately.
+    start_time = time.perf_counter()
+    _load_members(state, state._add_guild_from_data(guild_payload), args.members)
+    startup_seconds = time.perf_counter() - start_time
+    state.clear()
+
+    member_ids = list(range(_FIRST_MEMBER_ID, _FIRST_MEMBER_ID + args.members))
+    next_member_id = member_ids[-1] + 1
+
+    gc.collect()
+    tracemalloc.start()
+    guild = state._add_guild_from_data(guild_payload)
+    _load_members(state, guild, args.members)
+    startup_bytes = tracemalloc.get_traced_memory()[0]
+
+    guild_fields = {"guild_id": str(guild_id)}
+    for _ in range(args.events):
+        kind = random.choice(("join", "rename", "leave"))
+        if kind == "join":
+            payload = _create_member_payload(next_member_id)
+            state.parsers["GUILD_MEMBER_ADD"](payload | guild_fields)
+            member_ids.append(next_member_id)
+            next_member_id += 1
+        elif kind == "rename":
+            payload = _create_member_payload(
+                random.choice(member_ids), nick=f"nick{random.randrange(1000)}"
+            )
+            state.parsers["GUILD_MEMBER_UPDATE"](payload | guild_fields)
+        else:
+            member_id = member_ids.pop(random.randrange(len(member_ids)))
+            user_payload = _create_member_payload(member_id)["user"]
+            state.parsers["GUILD_MEMBER_REMOVE"]({"user": user_payload} | guild_fields)
+        dispatched[kind] += 1
+
+    final_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return {
+        "cached_members": len(guild.members),
+        "startup_seconds": startup_seconds,
+        "startup_bytes": startup_bytes,
+        "final_bytes": final_bytes,
+        "dispatched": dispatched,
+    }
+
+
+def _format_coverage(dispatched: Counter) -> str:
+    reported_events = {
+        "join": dispatched["member_join"],
+        "rename": dispatched["member_update"],
+        "leave": dispatched["member_remove"] + dispatched["uncached_member_remove"],
+    }
+    return ", ".join(
+        f"{kind} {count}/{dispatched[kind]}" for kind, count in reported_events.items()
+    )
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--members", type=int, default=100_000)
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    initialize_logging(log_level="w")
+    asyncio.set_event_loop(asyncio.new_event_loop())
+
+    print(f"{args.members} members, then {args.events} random events:")
+    for policy in MemberCachePolicy:
+        random.seed(args.seed)
+        result = _measure_policy(policy, args)
+        print(
+            f"{policy.value:>10} | startup {result['startup_seconds']:6.2f} s, "
+            f"{result['startup_bytes'] / 1_000_000:7.1f} MB | after events "
+            f"{result['final_bytes'] / 1_000_000:7.1f} MB, "
+            f"{result['cached_members']} cached | dispatched "
+            f"{_format_coverage(result['dispatched'])}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""Runs offline microbenchmarks for the rendering hot paths, or compares two runs.
+
+No network access or Discord connection is required. Members and their avatars are
+faked (avatars are read from a generated image file), and the JSON files are written
+to the data directory under temporary names and deleted afterwards.
+
+"run" saves its results to a JSON file. "compare" reads two of those files and flags
+every benchmark whose best time got slower by more than the threshold, exiting with
+a non-zero status if there were any regressions.
+
+Usage:
+    python benchmarks/microbenchmarks.py run [--output FILE] [--filter TEXT] [--quick]
+    python benchmarks/microbenchmarks.py compare BASELINE NEW [--threshold 0.1]
+"""
+
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import timeit
+from argparse import ArgumentParser, Namespace
+from collections.abc import Callable, Iterator
+from datetime import datetime, timezone
+from functools import partial
+from itertools import count, product
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+from typing import Any, cast
+
+from discord import Member
+from PIL.Image import new as new_image
+
+from qibot.assets import DATA_PATH
+from qibot.characters import Reporter
+from qibot.characters.core import Action
+from qibot.embeds import (
+    create_embed_with_files,
+    create_inline_fields,
+    create_standalone_fields,
+)
+from qibot.utils import load_json_from_file
+from qibot.utils.images import (
+    _ENCODERS,
+    get_member_avatar_file,
+    shutdown_image_executor,
+)
+from qibot.utils.rendering import render_image
+
+_DEFAULT_OUTPUT = "benchmark_results.json"
+_RESULTS_VERSION = 1
+
+_FILENAME_PREFIX = "microbenchmark"
+_AVATAR_SIZE = 64
+_SOURCE_IMAGE_SIZE = 256
+_DIALOGUE_LINES = 500
+
+_TEXT = "**<@1001> has entered the building.**"
+_THUMBNAIL_URL = "https://cdn.discordapp.com/avatars/1001/abc.png"
+
+_Benchmark = Callable[[], object]
+_Samples = list[float]  # Seconds per call, one entry for each repetition.
+
+
+class _FakeAsset:
+    def __init__(self, key: str, file_path: Path) -> None:
+        self.key = key
+        self.url = f"https://cdn.discordapp.com/avatars/{key}.png"
+        self._file_path = file_path
+
+    def with_size(self, _: int) -> "_FakeAsset":
+        return self
+
+    def with_format(self, _: str) -> str:
+        # A file path is treated as a local image, so nothing is fetched.
+        return str(self._file_path)
+
+
+def _create_fake_member(member_id: int, avatar_path: Path) -> Member:
+    return cast(
+        Member,
+        SimpleNamespace(
+            id=member_id,
+            mention=f"<@{member_id}>",
+            name=f"user{member_id}",
+            discriminator="0001",
+            display_name=f"user{member_id}",
+            display_avatar=_FakeAsset(f"avatar{member_id}", avatar_path),
+        ),
+    )
+
+
+def _create_fields() -> list:
+    return create_inline_fields(
+        ("❄", "Unique ID", "1001"),
+        ("🏷️", "Current Tag", "user1#0001"),
+    ) + create_standalone_fields(("🐣", "Account Created", "<t:1666000000>"))
+
+
+def _generate_json(json5: bool) -> str:
+    trailing_comma = "," if json5 else ""
+    lines = [f'    "Line {i} for $name."' for i in range(_DIALOGUE_LINES)]
+    dialogue = ",\n".join(lines) + trailing_comma
+    comment = "  // Generated for benchmarks.\n" if json5 else ""
+    return (
+        f'{{\n{comment}  "ACTION": {{\n    "dialogue": [\n{dialogue}\n    ],\n'
+        f'    "emoji": "🌈"{trailing_comma}\n  }}{trailing_comma}\n}}'
+    )
+
+
+def _collect_embed_benchmarks() -> Iterator[tuple[str, _Benchmark]]:
+    fields = _create_fields()
+    for has_text, has_thumbnail, has_fields in product((False, True), repeat=3):
+        params: dict[str, Any] = {
+            "text": _TEXT if has_text else "",
+            "emoji": "🌈" if has_text else "",
+            "thumbnail": _THUMBNAIL_URL if has_thumbnail else None,
+            "fields": fields if has_fields else None,
+        }
+        label = "+".join(name for name, value in params.items() if value) or "none"
+        yield f"embeds.create_embed_with_files[{label}]", partial(
+            create_embed_with_files, **params
+        )
+
+    yield "embeds.create_inline_fields", lambda: create_inline_fields(
+        ("❄", "Unique ID", "1001"), ("🏷️", "Current Tag", "user1#0001")
+    )
+    yield "embeds.create_standalone_fields", lambda: create_standalone_fields(
+        ("🐣", "Account Created", "<t:1666000000>")
+    )
+
+
+def _collect_character_benchmarks() -> Iterator[tuple[str, _Benchmark]]:
+    # noinspection PyProtectedMember
+    yield "characters.get_dialogue", lambda: Reporter._get_dialogue(
+        Action.MEMBER_JOINED, name="<@1001>"
+    )
+
+
+def _collect_json_benchmarks() -> Iterator[tuple[str, _Benchmark]]:
+    for label, json5 in (("json", False), ("json5", True)):
+        filename = f"{_FILENAME_PREFIX}_{label}"
+        snapshot_path = DATA_PATH / f"{filename}.json.dict-lowercase.snapshot"
+        (DATA_PATH / f"{filename}.json").write_text(
+            _generate_json(json5), encoding="utf-8"
+        )
+
+        def load_without_snapshot(name: str = filename, path: Path = snapshot_path):
+            path.unlink(missing_ok=True)
+            load_json_from_file(name, dict, lowercase_dict_keys=True)
+
+        yield f"json.load_json_from_file[{label}]", load_without_snapshot
+
+        yield f"json.load_json_from_file[{label}+snapshot]", partial(
+            load_json_from_file, filename, dict, lowercase_dict_keys=True
+        )
+
+
+def _collect_avatar_benchmarks(
+    avatar_path: Path, loop: asyncio.AbstractEventLoop
+) -> Iterator[tuple[str, _Benchmark]]:
+    cached_member = _create_fake_member(1, avatar_path)
+    loop.run_until_complete(get_member_avatar_file(cached_member))
+    yield "images.get_member_avatar_file[cached]", lambda: loop.run_until_complete(
+        get_member_avatar_file(cached_member)
+    )
+
+    # Every call uses a new member, so the avatar is always processed from scratch.
+    member_ids = count(start=2)
+    yield "images.get_member_avatar_file[uncached]", lambda: loop.run_until_complete(
+        get_member_avatar_file(_create_fake_member(next(member_ids), avatar_path))
+    )
+
+
+def _measure(benchmark: _Benchmark, repeat: int, min_seconds: float) -> dict:
+    timer = timeit.Timer(benchmark)
+    number = 1
+    while (timer.timeit(number) < min_seconds) and (number < 1_000_000):
+        number *= 2
+    return _summarize([seconds / number for seconds in timer.repeat(repeat, number)])
+
+
+def _measure_image_stages(avatar_path: Path, repeat: int) -> Iterator[tuple[str, dict]]:
+    # Each stage is timed by the renderer itself, so each render is one sample.
+    operations = (("resize", ((_AVATAR_SIZE, _AVATAR_SIZE),)), ("circle_crop", ()))
+    for encoder_name, encoder in _ENCODERS.items():
+        stage_samples: dict[str, _Samples] = {}
+        for _ in range(max(repeat * 10, 10)):
+            _, timings = render_image(str(avatar_path), operations, encoder)
+            for stage, seconds in timings.items():
+                stage_samples.setdefault(stage, []).append(seconds)
+        for stage, samples in stage_samples.items():
+            yield f"images.render[{encoder_name}].{stage}", _summarize(samples)
+
+
+def _summarize(samples: _Samples) -> dict:
+    return {
+        "min_us": min(samples) * 1_000_000,
+        "median_us": statistics.median(samples) * 1_000_000,
+        "mean_us": statistics.fmean(samples) * 1_000_000,
+        "samples": len(samples),
+    }
+
+
+def _run(args: Namespace) -> int:
+    repeat, min_seconds = (3, 0.02) if args.quick else (7, 0.1)
+    results: dict[str, dict] = {}
+
+    def record(name: str, result: dict) -> None:
+        results[name] = result
+        print(f"{result['min_us']:12.2f} us | {result['median_us']:12.2f} us | {name}")
+
+    loop = asyncio.new_event_loop()
+    with TemporaryDirectory() as temp_dir:
+        avatar_path = Path(temp_dir) / "avatar.png"
+        new_image("RGB", (_SOURCE_IMAGE_SIZE,) * 2, (240, 96, 128)).save(avatar_path)
+
+        print(f"{'best':>15} | {'median':>15} | benchmark")
+        try:
+            for name, benchmark in (
+                *_collect_embed_benchmarks(),
+                *_collect_character_benchmarks(),
+                *_collect_json_benchmarks(),
+                *_collect_avatar_benchmarks(avatar_path, loop),
+            ):
+                if args.filter in name:
+                    record(name, _measure(benchmark, repeat, min_seconds))
+            for name, result in _measure_image_stages(avatar_path, repeat):
+                if args.filter in name:
+                    record(name, result)
+        finally:
+            shutdown_image_executor()
+            loop.close()
+            for file_path in DATA_PATH.glob(f"{_FILENAME_PREFIX}_*"):
+                file_path.unlink()
+
+    Path(args.output).write_text(
+        json.dumps(
+            {
+                "version": _RESULTS_VERSION,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": results,
+            },
+            indent=2,
+        ),
+        encoding="utf-8",
+    )
+    print(f"\nSaved {len(results)} results to {args.output}.")
+    return 0
+
+
+def _compare(args: Namespace) -> int:
+    baseline, new = (
+        json.loads(Path(path).read_text(encoding="utf-8"))["results"]
+        for path in (args.baseline, args.new)
+    )
+    regressions = 0
+    print(f"{'baseline':>15} | {'new':>15} | {'change':>8} | benchmark")
+    for name in sorted(baseline.keys() & new.keys()):
+        old_us, new_us = baseline[name]["min_us"], new[name]["min_us"]
+        change = (new_us / old_us - 1) if old_us else 0.0
+        flag = ""
+        if change > args.threshold:
+            regressions += 1
+            flag = "  <-- REGRESSION"
+        print(f"{old_us:12.2f} us | {new_us:12.2f} us | {change:+7.1%} | {name}{flag}")
+
+    for label, names in (
+        ("Only in baseline", baseline.keys() - new.keys()),
+        ("Only in new", new.keys() - baseline.keys()),
+    ):
+        if names:
+            print(f"{label}: {', '.join(sorted(names))}")
+
+    print(f"\n{regressions} regression(s) over {args.threshold:.0%}.")
+    return 1 if regressions else 0
+
+
+def main() -> int:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks.")
+    run_parser.add_argument("--output", default=_DEFAULT_OUTPUT)
+    run_parser.add_argument("--filter", default="", help="Only run matching names.")
+    run_parser.add_argument("--quick", action="store_true", help="Fewer repeats.")
+    run_parser.set_defaults(func=_run)
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two results.")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.1)
+    compare_parser.set_defaults(func=_compare)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
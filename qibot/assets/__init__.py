@@ -1,6 +1,8 @@
-from qibot.assets.paths import DATA_PATH, IMAGE_PATH
+from qibot.assets.paths import CACHE_PATH, DATA_PATH, IMAGE_PATH, OPTIMIZED_IMAGE_PATH
 
 __all__ = [
+    "CACHE_PATH",
     "DATA_PATH",
     "IMAGE_PATH",
+    "OPTIMIZED_IMAGE_PATH",
 ]
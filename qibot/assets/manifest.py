@@ -0,0 +1,45 @@
+import json
+from hashlib import sha256
+from typing import Final, NamedTuple
+
+from qibot.assets.paths import OPTIMIZED_IMAGE_PATH
+
+_MANIFEST_FILENAME: Final[str] = "manifest.json"
+_HASH_LENGTH: Final[int] = 12
+
+# Increment this whenever the manifest format changes. Older manifests are ignored.
+_MANIFEST_VERSION: Final[int] = 1
+
+
+class AssetVariants(NamedTuple):
+    source_hash: str  # The content hash of the source image, to detect stale builds.
+    optimized: str  # The filename of each variant, in the optimized images folder.
+    thumbnail: str
+
+
+def get_content_hash(data: bytes) -> str:
+    return sha256(data).hexdigest()[:_HASH_LENGTH]
+
+
+def load_manifest() -> dict[str, AssetVariants]:
+    # Maps the name of each source image to its variants. Empty if there's no build.
+    try:
+        manifest = json.loads((OPTIMIZED_IMAGE_PATH / _MANIFEST_FILENAME).read_text())
+        if manifest["version"] != _MANIFEST_VERSION:
+            return {}
+        return {
+            name: AssetVariants(**variants)
+            for name, variants in manifest["assets"].items()
+        }
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+
+
+def save_manifest(assets: dict[str, AssetVariants]) -> None:
+    manifest = {
+        "version": _MANIFEST_VERSION,
+        "assets": {name: variants._asdict() for name, variants in assets.items()},
+    }
+    (OPTIMIZED_IMAGE_PATH / _MANIFEST_FILENAME).write_text(
+        json.dumps(manifest, indent=2) + "\n"
+    )
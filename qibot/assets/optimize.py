@@ -0,0 +1,353 @@
+"""Optimizes the bot's local images, and writes a manifest that the asset store uses.
+
+By default, this handles every image that the bot serves from the images folder (i.e.
+each local thumbnail in the character data). Other PNG, GIF, and WebP images in that
+folder can be named instead. For each image, two variants are written to its
+"optimized" subfolder:
+
+- The optimized image, with all metadata (EXIF, ICC profiles, comments, etc.)
+  stripped. Images with at most 256 colors are losslessly converted to a palette (or,
+  with `--lossy`, every image is quantized to one). Consecutive identical frames of an
+  animation are merged, by adding up their durations.
+- A thumbnail, pre-sized to fit within `--thumbnail-size` pixels. Pixel art (i.e. an
+  image that was scaled up by a whole number) is only scaled by whole numbers, so it
+  stays crisp. Images are never scaled up.
+
+Each variant is named after a hash of its contents, so anything that serves it can
+cache it forever. If a variant isn't smaller than the image it was made from (or if it
+doesn't look exactly the same, unless `--lossy` is set), that image is used instead.
+If the source image itself is the best thumbnail, nothing is written for it, and it's
+left out of the manifest. Images that weren't optimized this time keep their existing
+entries (and variants), unless they've been removed from the images folder.
+Afterwards, a report of the bytes saved and the time it takes to decode each variant
+is printed.
+
+Usage:
+    python -m qibot.assets.optimize [--thumbnail-size 160] [--format auto] [--lossy]
+        [image ...]
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from argparse import ArgumentParser, Namespace
+from io import BytesIO
+from math import gcd
+from pathlib import Path
+from typing import Any, Final, NamedTuple
+
+from PIL import ImageSequence
+from PIL.Image import Image, Quantize, Resampling
+from PIL.Image import new as new_image
+from PIL.Image import open as open_image
+
+from qibot.assets.manifest import (
+    AssetVariants,
+    get_content_hash,
+    load_manifest,
+    save_manifest,
+)
+from qibot.assets.paths import DATA_PATH, IMAGE_PATH, OPTIMIZED_IMAGE_PATH
+
+_SOURCE_SUFFIXES: Final[set[str]] = {".gif", ".png", ".webp"}
+_CHARACTER_DATA_FILENAME: Final[str] = "characters.json"
+_PALETTE_SIZE: Final[int] = 256
+
+# Discord shows embed thumbnails at up to 80x80, so this is sharp at 2x scaling too.
+_THUMBNAIL_SIZE_DEFAULT: Final[int] = 160
+
+
+class _Animation(NamedTuple):
+    format: str
+    frames: list[Image]  # Always in RGBA mode, with no metadata.
+    durations: list[int]  # In milliseconds, for each frame.
+    loop: int
+    source_frame_count: int
+
+
+class _Variant(NamedTuple):
+    data: bytes
+    suffix: str
+    frame_count: int
+    decode_seconds: float
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "images",
+        nargs="*",
+        help="Filenames in the images folder. (Default: every local thumbnail.)",
+    )
+    parser.add_argument("--thumbnail-size", type=int, default=_THUMBNAIL_SIZE_DEFAULT)
+    parser.add_argument(
+        "--format",
+        choices=("auto", "webp"),
+        default="auto",
+        help='"auto" keeps the format of each source image.',
+    )
+    parser.add_argument(
+        "--lossy", action="store_true", help="Quantize images with too many colors."
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=20, help="Decodes to time for each variant."
+    )
+    args = parser.parse_args()
+
+    OPTIMIZED_IMAGE_PATH.mkdir(exist_ok=True)
+    manifest = {
+        name: variants
+        for name, variants in load_manifest().items()
+        if (IMAGE_PATH / name).is_file()
+    }
+    report_lines: list[list[str]] = []
+    names = sorted(args.images or _get_local_thumbnails())
+    for name in names:
+        if Path(name).suffix.lower() not in _SOURCE_SUFFIXES:
+            parser.error(f'"{name}" is not a PNG, GIF, or WebP image.')
+        elif not (IMAGE_PATH / name).is_file():
+            parser.error(f'"{name}" is not in the images folder.')
+
+    for name in names:
+        variants, report_line = _optimize(IMAGE_PATH / name, args)
+        if variants:
+            manifest[name] = variants
+        else:
+            manifest.pop(name, None)
+        report_lines.append(report_line)
+
+    # Remove variants from earlier builds, so that stale files don't pile up.
+    current_filenames = {
+        filename
+        for variants in manifest.values()
+        for filename in (variants.optimized, variants.thumbnail)
+    }
+    for file_path in OPTIMIZED_IMAGE_PATH.iterdir():
+        if file_path.suffix.lower() in _SOURCE_SUFFIXES:
+            if file_path.name not in current_filenames:
+                file_path.unlink()
+
+    save_manifest(manifest)
+    _print_report(report_lines)
+
+
+def _get_local_thumbnails() -> set[str]:
+    # Thumbnails that aren't URLs are the filenames of images in the images folder.
+    def find_thumbnails(data: Any) -> set[str]:
+        if isinstance(data, list):
+            return {name for item in data for name in find_thumbnails(item)}
+        elif not isinstance(data, dict):
+            return set()
+        names = {name for value in data.values() for name in find_thumbnails(value)}
+        if isinstance(thumbnail := data.get("thumbnail"), str):
+            if (IMAGE_PATH / thumbnail).is_file():
+                names.add(thumbnail)
+        return names
+
+    character_data_path = DATA_PATH / _CHARACTER_DATA_FILENAME
+    return find_thumbnails(json.loads(character_data_path.read_text(encoding="utf-8")))
+
+
+def _optimize(
+    source_path: Path, args: Namespace
+) -> tuple[AssetVariants | None, list[str]]:
+    source_data = source_path.read_bytes()
+    animation = _load_animation(source_data)
+    image_format = "WEBP" if args.format == "webp" else animation.format
+
+    source = _Variant(
+        source_data,
+        source_path.suffix.lower(),
+        animation.source_frame_count,
+        _measure_decode_seconds(source_data, args.repeat),
+    )
+    optimized = _encode(animation, image_format, args, fallback=source)
+    thumbnail_animation = _create_thumbnail(animation, args.thumbnail_size)
+    if thumbnail_animation is animation:
+        thumbnail = optimized
+    else:
+        thumbnail = _encode(thumbnail_animation, image_format, args, fallback=optimized)
+
+    # There's no need for a copy of the source, since it's what the asset store falls
+    # back to anyway. (The thumbnail is only the source if the optimized image is too.)
+    variants = None
+    if thumbnail is not source:
+        variants = AssetVariants(
+            source_hash=get_content_hash(source_data),
+            optimized=_write_variant(source_path.stem, optimized),
+            thumbnail=_write_variant(source_path.stem, thumbnail),
+        )
+    report_line = [source_path.name] + [
+        _format_variant(variant, source) for variant in (source, optimized, thumbnail)
+    ]
+    return variants, report_line
+
+
+def _load_animation(data: bytes) -> _Animation:
+    frames: list[Image] = []
+    durations: list[int] = []
+    source_frame_count = 0
+    with open_image(BytesIO(data)) as image:
+        image_format, loop = image.format or "PNG", image.info.get("loop", 0)
+        for frame in ImageSequence.Iterator(image):
+            source_frame_count += 1
+            # Converting the frame leaves its metadata (EXIF, ICC profile, etc.) behind.
+            rgba_frame = _clear_transparent_pixels(frame.convert("RGBA"))
+            duration = frame.info.get("duration", 0)
+            if frames and (rgba_frame.tobytes() == frames[-1].tobytes()):
+                durations[-1] += duration
+            else:
+                frames.append(rgba_frame)
+                durations.append(duration)
+    return _Animation(image_format, frames, durations, loop, source_frame_count)
+
+
+def _clear_transparent_pixels(frame: Image) -> Image:
+    # Invisible pixels may have any color, so make them all the same. This lets them
+    # compress better, and lets frames be compared by what they actually look like.
+    visible_mask = frame.getchannel("A").point(lambda alpha: 255 if alpha else 0)
+    cleared_frame = new_image("RGBA", frame.size)
+    cleared_frame.paste(frame, mask=visible_mask)
+    return cleared_frame
+
+
+def _create_thumbnail(animation: _Animation, max_size: int) -> _Animation:
+    width, height = animation.frames[0].size
+    if max(width, height) <= max_size:
+        return animation
+
+    # Scale pixel art by whole numbers of its original pixels. Otherwise, scale freely.
+    pixel_scale = _get_pixel_scale(animation.frames)
+    pixel_width, pixel_height = width // pixel_scale, height // pixel_scale
+    if multiple := max_size // max(pixel_width, pixel_height):
+        size, resample = (pixel_width * multiple, pixel_height * multiple), "nearest"
+    else:
+        ratio = max_size / max(width, height)
+        size = (max(round(width * ratio), 1), max(round(height * ratio), 1))
+        resample = "lanczos"
+
+    frames = [
+        frame.resize(size, resample=Resampling[resample.upper()])
+        for frame in animation.frames
+    ]
+    return animation._replace(frames=frames)
+
+
+def _get_pixel_scale(frames: list[Image]) -> int:
+    # Returns the largest whole number that the frames were scaled up by, if any.
+    width, height = frames[0].size
+    divisor = gcd(width, height)
+    for scale in range(divisor, 1, -1):
+        if divisor % scale == 0 and all(
+            _is_scaled_up_by(frame, scale) for frame in frames
+        ):
+            return scale
+    return 1
+
+
+def _is_scaled_up_by(frame: Image, scale: int) -> bool:
+    small_size = (frame.width // scale, frame.height // scale)
+    small_frame = frame.resize(small_size, resample=Resampling.NEAREST)
+    restored_frame = small_frame.resize(frame.size, resample=Resampling.NEAREST)
+    return restored_frame.tobytes() == frame.tobytes()
+
+
+def _encode(
+    animation: _Animation, image_format: str, args: Namespace, fallback: _Variant
+) -> _Variant:
+    # Returns the fallback if the result isn't worth using. (See the module docstring.)
+    # GIF and WebP encoders choose their own palettes, so only PNGs are converted.
+    frames = animation.frames
+    if image_format == "PNG":
+        frames = [_to_palette(frame, args.lossy) for frame in frames]
+
+    save_options = {"format": image_format, "optimize": True}
+    if image_format == "WEBP":
+        save_options |= {"lossless": not args.lossy, "quality": 90, "method": 6}
+    if len(frames) > 1:
+        save_options |= {
+            "save_all": True,
+            "append_images": frames[1:],
+            "duration": animation.durations,
+            "loop": animation.loop,
+            "disposal": 2,  # Clear each frame before drawing the next.
+        }
+
+    with BytesIO() as image_bytes:
+        frames[0].save(image_bytes, **save_options)
+        data = image_bytes.getvalue()
+
+    if (len(data) >= len(fallback.data)) or not (
+        args.lossy or _is_identical(data, animation)
+    ):
+        return fallback
+    return _Variant(
+        data,
+        f".{image_format.lower()}",
+        len(frames),
+        _measure_decode_seconds(data, args.repeat),
+    )
+
+
+def _is_identical(data: bytes, animation: _Animation) -> bool:
+    decoded_animation = _load_animation(data)
+    return len(decoded_animation.frames) == len(animation.frames) and all(
+        decoded_frame.tobytes() == frame.tobytes()
+        for decoded_frame, frame in zip(decoded_animation.frames, animation.frames)
+    )
+
+
+def _to_palette(frame: Image, lossy: bool) -> Image:
+    # Only keep the palette version if it's exact, unless some loss is acceptable.
+    colors = frame.getcolors(_PALETTE_SIZE)
+    if not (colors or lossy):
+        return frame
+
+    palette_frame = frame.quantize(
+        colors=len(colors) if colors else _PALETTE_SIZE, method=Quantize.FASTOCTREE
+    )
+    if lossy or (palette_frame.convert("RGBA").tobytes() == frame.tobytes()):
+        return palette_frame
+    return frame
+
+
+def _write_variant(stem: str, variant: _Variant) -> str:
+    # The content hash makes the filename unique to this exact version of the variant.
+    filename = f"{stem}.{get_content_hash(variant.data)}{variant.suffix}"
+    (OPTIMIZED_IMAGE_PATH / filename).write_bytes(variant.data)
+    return filename
+
+
+def _measure_decode_seconds(data: bytes, repeat: int) -> float:
+    # Takes the fastest of several attempts, since the slower ones are mostly noise.
+    best_time = float("inf")
+    for _ in range(max(repeat, 1)):
+        start_time = time.perf_counter()
+        with open_image(BytesIO(data)) as image:
+            for frame in ImageSequence.Iterator(image):
+                frame.load()
+        best_time = min(best_time, time.perf_counter() - start_time)
+    return best_time
+
+
+def _format_variant(variant: _Variant, source: _Variant) -> str:
+    saved_percent = (1 - len(variant.data) / len(source.data)) * 100
+    return (
+        f"{len(variant.data):>7,} B ({saved_percent:>4.0f}%) "
+        f"{variant.frame_count:>2} fr {variant.decode_seconds * 1000:>6.2f} ms"
+    )
+
+
+def _print_report(report_lines: list[list[str]]) -> None:
+    headers = ["Asset", "Source", "Optimized", "Thumbnail"]
+    widths = [
+        max(len(line[column]) for line in [headers, *report_lines])
+        for column in range(len(headers))
+    ]
+    for line in [headers, *report_lines]:
+        print(" | ".join(cell.ljust(width) for cell, width in zip(line, widths)))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,5 +3,7 @@ from typing import Final
 
 _ASSETS_DIR_PATH: Final[Path] = Path(__file__).parent
 
+CACHE_PATH: Final[Path] = _ASSETS_DIR_PATH / "cache"
 DATA_PATH: Final[Path] = _ASSETS_DIR_PATH / "data"
 IMAGE_PATH: Final[Path] = _ASSETS_DIR_PATH / "images"
+OPTIMIZED_IMAGE_PATH: Final[Path] = IMAGE_PATH / "optimized"
@@ -1,5 +1,8 @@
+from asyncio import Task, create_task
 from datetime import datetime
-from typing import Final
+from enum import Enum
+from functools import partial
+from typing import Any, Final, cast
 
 from discord import (
     Activity,
@@ -9,14 +12,83 @@ from discord import (
     Bot,
     Cog,
     Intents,
+    Member,
+    MemberCacheFlags,
     slash_command,
 )
+from discord.types.member import MemberWithUser
 from discord.utils import utcnow
 
-from qibot.characters import Overseer
+from qibot.characters import Greeter, Overseer, Reporter
 from qibot.cogs import MemberListeners
 from qibot.meta import VERSION
-from qibot.utils import BotChannel, BotConfig, Log
+from qibot.utils import (
+    EVENT_PIPELINE,
+    HTTP_CLIENT,
+    METRICS,
+    OUTBOUND_SCHEDULER,
+    OUTBOX,
+    STARTUP_PROFILER,
+    BotChannel,
+    BotConfig,
+    Log,
+    shutdown_image_executor,
+)
+
+_CONFIG_RELOAD_INTERVAL_SECONDS: Final[float] = BotConfig.get_setting(
+    "config", "reload_interval_seconds", 0.0
+)
+_METRICS_EXPORT_INTERVAL_SECONDS: Final[float] = BotConfig.get_setting(
+    "metrics", "export_interval_seconds", 15.0
+)
+
+
+class MemberCachePolicy(Enum):
+    """Determines which members are kept in memory, and whether they're loaded on start.
+
+    Synthetic measurements (from `benchmarks/member_cache.py`, with 100k members):
+
+        full       ~98 MB and ~1.1 s of CPU time to load every member on start, on top
+                   of waiting for Discord to send them all (in 100 chunks of 1000).
+        on_demand  Nothing on start. Members are cached once they join or are updated,
+                   at ~1 KB each. (1000 events added ~1.7 MB.)
+        none       Nothing on start. (1000 events added ~0.9 MB, since discord.py still
+                   keeps a `User` for everyone it sees.)
+
+    Joins are always reported, and leaves are reported for uncached members too (from
+    the raw event). However, discord.py can only report renames for cached members, so
+    with "on_demand", renames are only reported for members who were already cached.
+    With "none", renames are never reported.
+    """
+
+    FULL = "full"
+    ON_DEMAND = "on_demand"
+    NONE = "none"
+
+    @classmethod
+    def from_name(cls, name: str) -> "MemberCachePolicy":
+        try:
+            return cls(name.lower())
+        except ValueError:
+            Log.e(f'Unknown member cache policy "{name}". Using "full" instead.')
+            return cls.FULL
+
+    def get_client_options(self, intents: Intents) -> dict[str, Any]:
+        if self is MemberCachePolicy.FULL:
+            cache_flags = MemberCacheFlags.from_intents(intents)
+        else:
+            cache_flags = MemberCacheFlags.none()
+            # noinspection PyDunderSlots, PyUnresolvedReferences
+            cache_flags.joined = self is MemberCachePolicy.ON_DEMAND
+        return {
+            "member_cache_flags": cache_flags,
+            "chunk_guilds_at_startup": self is MemberCachePolicy.FULL,
+        }
+
+
+_MEMBER_CACHE_POLICY: Final[MemberCachePolicy] = MemberCachePolicy.from_name(
+    BotConfig.get_setting("member_cache", "policy", MemberCachePolicy.FULL.value)
+)
 
 
 # noinspection PyDunderSlots, PyUnresolvedReferences
@@ -32,37 +104,116 @@ class QiBot(Bot):
     def __init__(self, **options) -> None:
         Log.i(f"Starting QiBot {VERSION}.")
         self.started_at: Final[datetime] = utcnow()
+        self._config_watcher: Task | None = None
+        self._metrics_exporter: Task | None = None
+
+        intents = _get_required_intents()
 
         # These options may be overridden by args passed into this function.
         flexible_options = {
             "allowed_mentions": AllowedMentions.none(),
             "help_command": None,
-        }
+        } | _MEMBER_CACHE_POLICY.get_client_options(intents)
 
         # These options will override the corresponding args if they're passed in.
         required_options = {
-            "debug_guilds": [BotConfig.get_server_id()],
-            "intents": _get_required_intents(),
+            "debug_guilds": BotConfig.get_guild_ids(),
+            "intents": intents,
         }
 
         super().__init__(**(flexible_options | options | required_options))
+        self._dispatch_uncached_member_removals()
 
         # TODO: Redesign cog-adding mechanism when there are more cogs to deal with.
         self.add_cog(_MetaCommands(self))
         self.add_cog(MemberListeners(self))
+        STARTUP_PROFILER.mark_stage("Bot initialized")
 
     async def on_ready(self) -> None:
-        server_name = self._get_server_name()
-        if not server_name:
+        server_names = self._get_server_names()
+        if not server_names:
             return await self.close()
 
-        Log.i(f'Monitoring server: "{server_name}"')
+        for server_name in server_names:
+            Log.i(f'Monitoring server: "{server_name}"')
         await BotChannel.initialize_all(self)
+        await OUTBOX.replay()
+
+        # This may be called again after reconnecting, but only one watcher is needed.
+        if _CONFIG_RELOAD_INTERVAL_SECONDS and not self._config_watcher:
+            self._config_watcher = create_task(
+                BotConfig.watch_for_changes(
+                    on_change=partial(BotChannel.reload_all, self),
+                    poll_interval=_CONFIG_RELOAD_INTERVAL_SECONDS,
+                )
+            )
+
+        if _METRICS_EXPORT_INTERVAL_SECONDS and not self._metrics_exporter:
+            self._metrics_exporter = create_task(
+                METRICS.export_periodically(_METRICS_EXPORT_INTERVAL_SECONDS)
+            )
 
         await self.change_presence(
             activity=Activity(type=ActivityType.watching, name="everything.")
         )
 
+        STARTUP_PROFILER.mark_stage("Bot ready")
+        STARTUP_PROFILER.stop()
+
+    async def close(self) -> None:
+        for task in (self._config_watcher, self._metrics_exporter):
+            if task:
+                task.cancel()
+        # Handle any remaining events first, since their messages go through these.
+        await EVENT_PIPELINE.close()
+        for character in (Reporter, Greeter):
+            try:
+                await character.flush()
+            except Exception as error:
+                Log.e(f"Failed to send held-back messages. ({error})")
+        await OUTBOUND_SCHEDULER.close()
+        await OUTBOX.close()
+        await METRICS.export()
+        await super().close()
+        await HTTP_CLIENT.close()
+        shutdown_image_executor()
+
+    def _dispatch_uncached_member_removals(self) -> None:
+        # discord.py only dispatches "member_remove" for members that are in its cache.
+        # For anyone else, dispatch "uncached_member_remove" with a member built from
+        # the event's payload. (It won't know the member's roles or join date.)
+        parsers = self._connection.parsers
+        parse_member_remove = parsers["GUILD_MEMBER_REMOVE"]
+
+        def parse_member_remove_with_fallback(data: dict[str, Any]) -> None:
+            guild = self.get_guild(int(data["guild_id"]))
+            if guild and not guild.get_member(int(data["user"]["id"])):
+                member_data = cast(MemberWithUser, {"user": data["user"], "roles": []})
+                member = Member(data=member_data, guild=guild, state=self._connection)
+                self.dispatch("uncached_member_remove", member)
+            parse_member_remove(data)
+
+        parsers["GUILD_MEMBER_REMOVE"] = parse_member_remove_with_fallback
+
+    def _get_server_names(self) -> list[str] | None:
+        if not BotConfig.get_snapshot().is_multi_guild:
+            return [name] if (name := self._get_server_name()) else None
+
+        # Unconfigured servers are tolerated here, but their events are ignored.
+        guilds_by_id = {guild.id: guild for guild in self.guilds}
+        for guild_id in guilds_by_id.keys() - set(self.debug_guilds):
+            Log.w(f'Ignoring unconfigured server: "{guilds_by_id[guild_id].name}"')
+
+        # Every configured server must be present, since its channels are required.
+        if missing_ids := [id_ for id_ in self.debug_guilds if id_ not in guilds_by_id]:
+            Log.e(
+                f"This bot account is not a member of configured servers: {missing_ids}"
+                f"{Log.NEWLINE}Make sure the server IDs are configured properly. "
+                "Exiting."
+            )
+            return None
+        return [guilds_by_id[guild_id].name for guild_id in self.debug_guilds]
+
     def _get_server_name(self) -> str | None:
         if len(self.guilds) != 1:
             Log.e(
@@ -87,6 +238,11 @@ class _MetaCommands(Cog):
             # noinspection PyUnresolvedReferences
             await Overseer.show_bot_metadata(ctx, ctx.bot.started_at)
 
+    @slash_command(description="Shows latency percentiles and error counts.")
+    async def stats(self, ctx: ApplicationContext) -> None:
+        if await BotChannel.BOT_SPAM.is_context(ctx):
+            await Overseer.show_bot_stats(ctx)
+
     @slash_command(description="Shows a motivational quote. (Under construction!)")
     async def help(self, ctx: ApplicationContext) -> None:
         # TODO: Properly implement this when there's actual information to show.
@@ -1,3 +1,4 @@
+from qibot.characters.digest import MEMBER_EVENT_RATE
 from qibot.characters.greeter import Greeter as _Greeter
 from qibot.characters.overseer import Overseer as _Overseer
 from qibot.characters.reporter import Reporter as _Reporter
@@ -8,6 +9,7 @@ Reporter = _Reporter()
 
 __all__ = [
     "Greeter",
+    "MEMBER_EVENT_RATE",
     "Overseer",
     "Reporter",
 ]
@@ -1,15 +1,22 @@
 from enum import Enum, auto, unique
 from random import choice as choose_random
-from typing import Any, Final, TypeAlias
+from typing import Any, ClassVar, Final, TypeAlias
 
-from discord import ApplicationContext, File
+from discord import ApplicationContext, Embed, File
 
-from qibot.embeds import Fields, create_embed_with_files
+from qibot.characters.dialogue import (
+    DialogueTemplate,
+    compile_dialogue,
+    is_dialogue_category,
+)
+from qibot.embeds import EmbedPlan, Fields, RenderedFields
 from qibot.utils import (
+    METRICS,
+    OUTBOUND_SCHEDULER,
+    OUTBOX,
     BotChannel,
     Log,
-    Template,
-    get_template_keys,
+    Priority,
     load_json_from_file,
 )
 
@@ -20,6 +27,7 @@ _ActionDict: TypeAlias = dict[str, dict[str, str | list[str]]]
 class Action(Enum):
     BOT_HELP = auto()
     BOT_METADATA = auto()
+    BOT_STATS = auto()
     MEMBER_JOINED = auto()
     MEMBER_LEFT = auto()
     MEMBER_RENAMED = auto()
@@ -41,42 +49,75 @@ class Action(Enum):
 
 
 class Character:
+    PRIORITY: ClassVar[Priority] = Priority.NORMAL
+    DURABLE: ClassVar[bool] = False  # Whether messages go through the outbox.
+
     DATA: Final[dict[str, Any]] = load_json_from_file(
         filename="characters", data_type=dict, lowercase_dict_keys=True
     )
 
     def __init__(self) -> None:
         role = self.__class__.__name__.strip("_")
-        Log.d(f'Initializing character for role "{role}".')
+        Log.d('Initializing character for role "%s".', role)
         data = type(self).DATA[role.lower()]
 
         self._name: Final[str] = data.get("name")
         self._color: Final[int] = int(data.get("color", "0"), base=16)
         self._avatar_url: Final[str] = data.get("avatar_url")
         self._responses: Final[_ActionDict] = Action.sanitize(data["responses"])
+        self._embed_plans: Final[dict[Action, EmbedPlan]] = {
+            action: EmbedPlan(
+                color=self._color,
+                emoji=self._responses.get(action.key, {}).get("emoji", ""),
+                thumbnail=self._get_thumbnail(action),
+            )
+            for action in Action
+        }
+        self._dialogue: Final[dict[tuple[Action, str], list[DialogueTemplate]]] = {
+            (action, category): compile_dialogue(self._responses[action.key], category)
+            for action in Action
+            if action.key in self._responses
+            for category in self._responses[action.key]
+            if is_dialogue_category(category)
+        }
 
         if self._name:
-            Log.d(f'  Name: "{self._name}"')
-        Log.d(f"  Supported actions: [{', '.join(self._responses)}]")
-
-    def _get_response(self, action: Action, category: str) -> str:
-        if action.key in self._responses:
-            # Use the single defined string, or a random choice from the defined list.
-            response = self._responses[action.key].get(category, "")
-            if isinstance(response, list):
-                response = choose_random(response)
-            return response
-        else:
-            return ""
+            Log.d('  Name: "%s"', self._name)
+        Log.d("  Supported actions: [%s]", lambda: ", ".join(self._responses))
+
+    async def flush(self) -> None:
+        # Sends any messages that are being held back (e.g. to be batched) right away.
+        pass
 
-    def _get_dialogue(self, action: Action, **kwargs) -> str:
-        dialogue = self._get_response(action, "dialogue")
-        if not dialogue:
-            Log.e(f'Dialogue for "{action.key}" is not defined for {self._name}.')
-        available_subs = self._responses[action.key] | kwargs
-        while available_subs.keys() & get_template_keys(dialogue):
-            dialogue = Template(dialogue).safe_sub(available_subs)
-        return dialogue
+    def _get_thumbnail(self, action: Action) -> str:
+        thumbnail = self._responses.get(action.key, {}).get("thumbnail", "")
+        if isinstance(thumbnail, str):
+            return thumbnail
+        Log.w(f'"{action.key}" has more than one thumbnail for {self._name}. Ignoring.')
+        return ""
+
+    def _get_dialogue(
+        self, action: Action, category: str = "dialogue", **kwargs
+    ) -> str:
+        # Use a random variant of the dialogue. (There may only be one to choose from.)
+        if dialogue_variants := self._dialogue.get((action, category)):
+            return choose_random(dialogue_variants).render(**kwargs)
+        Log.e(f'"{action.key}" has no {category} defined for {self._name}.')
+        return ""
+
+    def _create_embed(
+        self,
+        action: Action,
+        text: str = "",
+        thumbnail: str | File | None = None,
+        fields: Fields | RenderedFields | None = None,
+    ) -> tuple[Embed, list[File]]:
+        with METRICS.time("stage_seconds", stage="embed_build"):
+            return self._embed_plans[action].build(
+                text=text or self._get_dialogue(action),
+                thumbnail=thumbnail,
+                fields=fields,
+            )
 
     async def _send_message(
         self,
@@ -84,21 +125,36 @@ class Character:
         destination: ApplicationContext | BotChannel,
         text: str = "",
         thumbnail: str | File | None = None,
-        fields: Fields | None = None,
+        fields: Fields | RenderedFields | None = None,
+        guild_id: int | None = None,
+    ) -> None:
+        embed, files = self._create_embed(action, text, thumbnail, fields)
+        await self._send_embeds(destination, [embed], files, guild_id)
+
+    async def _send_embeds(
+        self,
+        destination: ApplicationContext | BotChannel,
+        embeds: list[Embed],
+        files: list[File],
+        guild_id: int | None = None,
     ) -> None:
-        embed, files = create_embed_with_files(
-            color=self._color,
-            text=text or self._get_dialogue(action),
-            emoji=self._get_response(action, "emoji"),
-            thumbnail=thumbnail or self._get_response(action, "thumbnail"),
-            fields=fields,
-        )
+        # The `guild_id` determines which server's channel a `BotChannel` refers to.
         if isinstance(destination, ApplicationContext):
-            await destination.respond(embed=embed)
+            # Interactions must be responded to quickly, so these can't wait in a queue.
+            with METRICS.time("stage_seconds", stage="interaction_send"):
+                await destination.respond(embeds=embeds)
+            return
+
+        priority = type(self).PRIORITY
+        send_kwargs: dict[str, Any] = {
+            "username": self._name,
+            "avatar_url": self._avatar_url,
+            "embeds": embeds,
+            "files": files,
+        }
+        if type(self).DURABLE:
+            await OUTBOX.submit(destination, priority, guild_id, **send_kwargs)
         else:
-            await (await destination.get_webhook()).send(
-                username=self._name,
-                avatar_url=self._avatar_url,
-                embed=embed,
-                files=files,
+            await OUTBOUND_SCHEDULER.submit(
+                destination, priority, guild_id, **send_kwargs
             )
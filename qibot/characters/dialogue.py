@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import Any, Final, NamedTuple
+
+from qibot.utils import Log, Template, get_template_keys
+
+_DIALOGUE_CATEGORY: Final[str] = "dialogue"
+_DIALOGUE_CATEGORY_SUFFIX: Final[str] = f"_{_DIALOGUE_CATEGORY}"
+
+
+def is_dialogue_category(category: str) -> bool:
+    return (category == _DIALOGUE_CATEGORY) or category.endswith(
+        _DIALOGUE_CATEGORY_SUFFIX
+    )
+
+
+class DialogueTemplate(NamedTuple):
+    template: Template
+    required_keys: frozenset[str]
+
+    def render(self, **kwargs: Any) -> str:
+        if missing_keys := self.required_keys - kwargs.keys():
+            Log.e(f"Missing values for dialogue keys: {sorted(missing_keys)}")
+            return self.template.safe_sub(kwargs)
+        return self.template.sub(kwargs)
+
+
+def compile_dialogue(
+    responses: Mapping[str, Any], category: str
+) -> list[DialogueTemplate]:
+    """Compiles each variant of a dialogue response into a ready-to-fill template.
+
+    Any `$key` references to other string fields in the same response are resolved
+    (recursively) at this point, so that rendering only needs a single substitution.
+    The keys that are left over must be provided as kwargs when rendering.
+
+    Args:
+        responses:
+            The fields that define the response to a single action.
+        category:
+            The name of the field that contains the dialogue to compile. It may be a
+            single string, or a list of strings (i.e. variants to choose from).
+
+    Returns:
+        A list with one compiled template for each variant of the dialogue.
+
+    Raises:
+        ValueError:
+            If any of the fields reference each other (or themselves) in a cycle.
+    """
+    dialogue = responses.get(category, "")
+    variants = [dialogue] if isinstance(dialogue, str) else list(dialogue)
+    static_fields = {
+        key: value for key, value in responses.items() if isinstance(value, str)
+    }
+    resolved_fields: dict[str, str] = {}
+
+    def resolve(text: str, reference_chain: tuple[str, ...]) -> str:
+        substitutions = {}
+        for key in get_template_keys(text) & static_fields.keys():
+            if key in reference_chain:
+                cycle_start = reference_chain.index(key)
+                cycle = " -> ".join((*reference_chain[cycle_start:], key))
+                raise ValueError(f'Found a cycle in the "{category}" fields: {cycle}')
+            if key not in resolved_fields:
+                resolved_fields[key] = resolve(
+                    static_fields[key], (*reference_chain, key)
+                )
+            substitutions[key] = resolved_fields[key]
+        return Template(text).safe_sub(substitutions) if substitutions else text
+
+    compiled_variants = []
+    for variant in filter(None, variants):
+        resolved_text = resolve(variant, (category,))
+        required_keys = frozenset(filter(None, get_template_keys(resolved_text)))
+        compiled_variants.append(
+            DialogueTemplate(Template(resolved_text), required_keys)
+        )
+    return compiled_variants
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+from asyncio import Task, create_task, current_task, sleep
+from collections import deque
+from collections.abc import Awaitable, Callable, Hashable, Iterable
+from enum import IntEnum
+from time import monotonic
+from typing import Final, Generic, TypeVar
+
+from qibot.utils import METRICS, BotConfig, Log
+
+_T = TypeVar("_T")
+_K = TypeVar("_K")
+
+_DIGEST_SETTINGS: Final[str] = "digest"
+
+# Discord won't accept more than this many embeds in a single message.
+MAX_EMBEDS_PER_MESSAGE: Final[int] = 10
+
+
+def group_by_key(items: Iterable[_T], key: Callable[[_T], _K]) -> dict[_K, list[_T]]:
+    # Unlike `itertools.groupby()`, this doesn't need the items to be sorted by key.
+    groups: dict[_K, list[_T]] = {}
+    for item in items:
+        groups.setdefault(key(item), []).append(item)
+    return groups
+
+
+class DigestMode(IntEnum):
+    NORMAL = 0  # Every event is reported in its own message.
+    BATCHED = 1  # Up to 10 per-member embeds are packed into each message.
+    SUMMARY = 2  # Members are listed together in a single summary embed.
+
+
+class EventRateMonitor:
+    def __init__(
+        self, window_seconds: float, batch_threshold: int, summary_threshold: int
+    ) -> None:
+        self._window_seconds: Final[float] = window_seconds
+        self._batch_threshold: Final[int] = batch_threshold
+        self._summary_threshold: Final[int] = summary_threshold
+        self._event_times: Final[deque[float]] = deque()
+        self._last_mode: DigestMode = DigestMode.NORMAL
+
+    @property
+    def mode(self) -> DigestMode:
+        cutoff_time = monotonic() - self._window_seconds
+        while self._event_times and (self._event_times[0] < cutoff_time):
+            self._event_times.popleft()
+
+        event_count = len(self._event_times)
+        if self._summary_threshold and (event_count >= self._summary_threshold):
+            mode = DigestMode.SUMMARY
+        elif self._batch_threshold and (event_count >= self._batch_threshold):
+            mode = DigestMode.BATCHED
+        else:
+            mode = DigestMode.NORMAL
+
+        if mode != self._last_mode:
+            Log.i(
+                f"Switching to {mode.name.lower()} digest mode. ({event_count} member "
+                f"events in the last {self._window_seconds:g} seconds.)"
+            )
+            self._last_mode = mode
+        return mode
+
+    def record_event(self) -> DigestMode:
+        self._event_times.append(monotonic())
+        return self.mode
+
+
+class MessageBatch(Generic[_T]):
+    """Collects items and passes them to a `flush` function in batches.
+
+    A batch is flushed as soon as it contains `max_items` items, or `delay_seconds`
+    after its first item was added - whichever comes first.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[list[_T]], Awaitable[None]],
+        max_items: int,
+        delay_seconds: float,
+    ) -> None:
+        self._flush: Final[Callable[[list[_T]], Awaitable[None]]] = flush
+        self._max_items: Final[int] = max_items
+        self._delay_seconds: Final[float] = delay_seconds
+        self._items: list[_T] = []
+        self._timer: Task | None = None
+
+    async def add(self, item: _T) -> None:
+        self._items.append(item)
+        if self._max_items and (len(self._items) >= self._max_items):
+            await self.flush()
+        elif not self._timer:
+            self._timer = create_task(self._flush_later())
+
+    async def flush(self) -> None:
+        if self._timer and (self._timer is not current_task()):
+            self._timer.cancel()
+        self._timer = None
+
+        items, self._items = self._items, []
+        if items:
+            await self._flush(items)
+
+    async def _flush_later(self) -> None:
+        await sleep(self._delay_seconds)
+        try:
+            await self.flush()
+        except Exception as error:
+            METRICS.increment("batch_errors_total")
+            Log.e(f"Failed to send a batched message. ({error})")
+
+
+class KeyedDebouncer(Generic[_T]):
+    """Collects items by key, and passes all of a key's items to a `flush` function.
+
+    A key's items are flushed once `delay_seconds` pass without a new item for that key,
+    or `max_delay_seconds` after its first item - whichever comes first. If the delay is
+    zero, every item is flushed right away.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[list[_T]], Awaitable[None]],
+        delay_seconds: float,
+        max_delay_seconds: float,
+    ) -> None:
+        self._flush: Final[Callable[[list[_T]], Awaitable[None]]] = flush
+        self._delay_seconds: Final[float] = delay_seconds
+        self._max_delay_seconds: Final[float] = max(max_delay_seconds, delay_seconds)
+        self._items: Final[dict[Hashable, list[_T]]] = {}
+        self._deadlines: Final[dict[Hashable, float]] = {}
+        self._max_deadlines: Final[dict[Hashable, float]] = {}
+        self._timers: Final[dict[Hashable, Task]] = {}
+
+    async def add(self, key: Hashable, item: _T) -> None:
+        if not self._delay_seconds:
+            await self._flush([item])
+            return
+
+        now = monotonic()
+        if key not in self._items:
+            self._items[key] = []
+            self._max_deadlines[key] = now + self._max_delay_seconds
+            self._timers[key] = create_task(self._flush_later(key))
+        self._items[key].append(item)
+        # Pushing back the deadline is cheaper than restarting the timer for each item.
+        self._deadlines[key] = min(now + self._delay_seconds, self._max_deadlines[key])
+
+    async def flush(self) -> None:
+        # Flushes every key's items right away, without waiting for their deadlines.
+        for key in list(self._items):
+            self._timers[key].cancel()
+            await self._flush_key(key)
+
+    async def _flush_later(self, key: Hashable) -> None:
+        while (delay := self._deadlines[key] - monotonic()) > 0:
+            await sleep(delay)
+        await self._flush_key(key)
+
+    async def _flush_key(self, key: Hashable) -> None:
+        del self._deadlines[key], self._max_deadlines[key], self._timers[key]
+        try:
+            await self._flush(self._items.pop(key))
+        except Exception as error:
+            METRICS.increment("batch_errors_total")
+            Log.e(f"Failed to send a debounced message. ({error})")
+
+
+MEMBER_EVENT_RATE: Final[EventRateMonitor] = EventRateMonitor(
+    window_seconds=BotConfig.get_setting(_DIGEST_SETTINGS, "window_seconds", 10.0),
+    batch_threshold=BotConfig.get_setting(_DIGEST_SETTINGS, "batch_threshold", 5),
+    summary_threshold=BotConfig.get_setting(_DIGEST_SETTINGS, "summary_threshold", 20),
+)
+
+DIGEST_DELAY_SECONDS: Final[float] = BotConfig.get_setting(
+    _DIGEST_SETTINGS, "flush_delay_seconds", 3.0
+)
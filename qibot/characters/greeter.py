@@ -1,15 +1,67 @@
+from typing import Final
+
 from discord import Member
 
 from qibot.characters.core import Action, Character
-from qibot.utils import BotChannel
+from qibot.characters.digest import (
+    DIGEST_DELAY_SECONDS,
+    MEMBER_EVENT_RATE,
+    DigestMode,
+    MessageBatch,
+    group_by_key,
+)
+from qibot.utils import BotChannel, Priority
+
+# Keeps combined welcomes well within Discord's length limit for embed descriptions.
+_MAX_MENTIONS_PER_GREETING: Final[int] = 50
+
+
+def _join_mentions(members: list[Member]) -> str:
+    mentions = [member.mention for member in members[:_MAX_MENTIONS_PER_GREETING]]
+    if len(members) > len(mentions):
+        mentions.append(f"{len(members) - len(mentions)} others")
+    if len(mentions) == 1:
+        return mentions[0]
+    return f"{', '.join(mentions[:-1])} and {mentions[-1]}"
 
 
 class Greeter(Character):
-    async def greet(self, member: Member) -> None:
-        welcome_text = self._get_dialogue(Action.MEMBER_JOINED, name=member.mention)
-        rules_text = self._get_dialogue(Action.MENTION_RULES, url=BotChannel.RULES.url)
-        await self._send_message(
-            action=Action.MEMBER_JOINED,
-            destination=BotChannel.WELCOME,
-            text=f"{welcome_text}\n\n{rules_text}",
+    PRIORITY = Priority.LOW
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._greeting_batch: Final[MessageBatch[Member]] = MessageBatch(
+            self._greet_members, 0, DIGEST_DELAY_SECONDS
         )
+
+    async def greet(self, member: Member) -> None:
+        # During a raid, welcome everyone who joined around the same time all at once.
+        if MEMBER_EVENT_RATE.mode is DigestMode.SUMMARY:
+            await self._greeting_batch.add(member)
+        else:
+            await self._greet_members([member])
+
+    async def flush(self) -> None:
+        await self._greeting_batch.flush()
+
+    async def _greet_members(self, members: list[Member]) -> None:
+        # Members of different servers are welcomed separately, in their own servers.
+        for guild_id, guild_members in group_by_key(
+            members, lambda member: member.guild.id
+        ).items():
+            # Welcoming several members at once calls for plural dialogue.
+            welcome_text = self._get_dialogue(
+                Action.MEMBER_JOINED,
+                "digest_dialogue" if len(guild_members) > 1 else "dialogue",
+                name=_join_mentions(guild_members),
+                count=len(guild_members),
+            )
+            rules_text = self._get_dialogue(
+                Action.MENTION_RULES, url=BotChannel.RULES.get_url(guild_id)
+            )
+            await self._send_message(
+                action=Action.MEMBER_JOINED,
+                destination=BotChannel.WELCOME,
+                text=f"{welcome_text}\n\n{rules_text}",
+                guild_id=guild_id,
+            )
@@ -4,13 +4,54 @@ from typing import Final
 from discord import ApplicationContext
 
 from qibot.characters.core import Action, Character
-from qibot.embeds import create_inline_fields
+from qibot.embeds import FieldsPlan, create_inline_fields, create_standalone_fields
 from qibot.meta import VERSION
-from qibot.utils import format_time, get_member_nametag
+from qibot.utils import METRICS, format_time, get_member_nametag
 
 _DEVELOPER_DISCORD_TAG: Final[str] = "<@318178318488698891>"
 _GITHUB_LINK: Final[str] = "[Available on GitHub!](https://github.com/nuztalgia/qibot)"
 
+_BOT_METADATA_FIELDS: Final[FieldsPlan] = FieldsPlan(
+    *create_inline_fields(
+        ("🏷️", "Bot Tag", None),
+        ("🧭", "Home Server", None),
+        ("⌛", "Last Restarted", None),
+        ("🤖", "Bot Version", None),
+        ("🤓", "Developer", None),
+        ("💻", "Source Code", None),
+    )
+)
+
+_BOT_STATS_FIELDS: Final[FieldsPlan] = FieldsPlan(
+    *create_standalone_fields(
+        ("⏱️", "Listeners", None),
+        ("📬", "Event to Send", None),
+        ("🧩", "Stages", None),
+        ("⚠️", "Errors & Retries", None),
+    )
+)
+
+_STATS_PERCENTILES: Final[tuple[float, ...]] = (0.5, 0.9, 0.99)
+
+
+def _get_histogram_lines(name: str, label: str) -> list[str]:
+    lines = []
+    for (metric_name, labels), histogram in sorted(METRICS.histograms.items()):
+        if metric_name == name:
+            percentiles = " • ".join(
+                f"p{fraction * 100:g} {histogram.get_percentile(fraction) * 1000:.0f}ms"
+                for fraction in _STATS_PERCENTILES
+            )
+            lines.append(f"`{dict(labels)[label]}` ({histogram.count}) {percentiles}")
+    return lines
+
+
+def _get_counter_lines() -> list[str]:
+    return [
+        f"`{' '.join([name, *(value for _, value in labels)])}` {count}"
+        for (name, labels), count in sorted(METRICS.counters.items())
+    ]
+
 
 class Overseer(Character):
     async def show_bot_help(self, ctx: ApplicationContext) -> None:
@@ -23,12 +64,24 @@ class Overseer(Character):
         await self._send_message(
             action=Action.BOT_METADATA,
             destination=ctx,
-            fields=create_inline_fields(
-                ("🏷️", "Bot Tag", get_member_nametag(ctx.bot.user)),
-                ("🧭", "Home Server", ctx.guild.name),
-                ("⌛", "Last Restarted", format_time(start_time, show_timestamp=False)),
-                ("🤖", "Bot Version", VERSION),
-                ("🤓", "Developer", _DEVELOPER_DISCORD_TAG),
-                ("💻", "Source Code", _GITHUB_LINK),
+            fields=_BOT_METADATA_FIELDS.fill(
+                get_member_nametag(ctx.bot.user),
+                ctx.guild.name,
+                format_time(start_time, show_timestamp=False),
+                VERSION,
+                _DEVELOPER_DISCORD_TAG,
+                _GITHUB_LINK,
+            ),
+        )
+
+    async def show_bot_stats(self, ctx: ApplicationContext) -> None:
+        await self._send_message(
+            action=Action.BOT_STATS,
+            destination=ctx,
+            fields=_BOT_STATS_FIELDS.fill(
+                _get_histogram_lines("listener_seconds", "listener"),
+                _get_histogram_lines("event_to_send_seconds", "listener"),
+                _get_histogram_lines("stage_seconds", "stage"),
+                _get_counter_lines(),
             ),
         )
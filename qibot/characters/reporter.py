@@ -1,50 +1,196 @@
-from discord import Member
+from itertools import groupby
+from typing import Final, TypeAlias
+
+from discord import Embed, File, Member
 
 from qibot.characters.core import Action, Character
-from qibot.embeds import Fields, create_inline_fields, create_standalone_fields
+from qibot.characters.digest import (
+    DIGEST_DELAY_SECONDS,
+    MAX_EMBEDS_PER_MESSAGE,
+    MEMBER_EVENT_RATE,
+    DigestMode,
+    KeyedDebouncer,
+    MessageBatch,
+    group_by_key,
+)
+from qibot.embeds import (
+    Fields,
+    FieldsPlan,
+    RenderedFields,
+    create_inline_fields,
+    create_standalone_fields,
+)
 from qibot.utils import (
     BotChannel,
+    BotConfig,
+    Priority,
     format_time,
     get_member_avatar_file,
     get_member_nametag,
 )
 
+_EmbedWithFiles: TypeAlias = tuple[Embed, list[File]]
+_GuildEmbed: TypeAlias = tuple[int, _EmbedWithFiles]  # Server ID, and the embed.
+_MemberEvent: TypeAlias = tuple[Action, Member]
+_MemberRename: TypeAlias = tuple[Member, str]  # The renamed member, and the old name.
+
+_MEMBER_EVENT_SETTINGS: Final[str] = "member_events"
 
-def _get_core_member_fields(member: Member) -> Fields:
-    return create_inline_fields(
-        ("❄", "Unique ID", str(member.id)),
-        ("🏷️", "Current Tag", get_member_nametag(member)),
-    )
+# Renames that happen in quick succession are reported together, as a chain of names.
+_RENAME_DEBOUNCE_SECONDS: Final[float] = BotConfig.get_setting(
+    _MEMBER_EVENT_SETTINGS, "rename_debounce_seconds", 5.0
+)
+_RENAME_MAX_DELAY_SECONDS: Final[float] = BotConfig.get_setting(
+    _MEMBER_EVENT_SETTINGS, "rename_max_delay_seconds", 30.0
+)
+_NAME_SEPARATOR: Final[str] = " → "
+
+# Leaves plenty of room under Discord's 4096-character limit for embed descriptions.
+_MAX_SUMMARY_LENGTH: Final[int] = 3800
+
+_CORE_MEMBER_FIELDS: Final[Fields] = create_inline_fields(
+    ("❄", "Unique ID", None),
+    ("🏷️", "Current Tag", None),
+)
+
+_MEMBER_JOINED_FIELDS: Final[FieldsPlan] = FieldsPlan(
+    *_CORE_MEMBER_FIELDS,
+    *create_standalone_fields(("🐣", "Account Created", None)),
+)
+_MEMBER_LEFT_FIELDS: Final[FieldsPlan] = FieldsPlan(
+    *_CORE_MEMBER_FIELDS,
+    *create_standalone_fields(
+        ("🌱", "Joined Server", None),
+        ("🍂", "Server Roles", None),
+    ),
+)
+_MEMBER_RENAMED_FIELDS: Final[FieldsPlan] = FieldsPlan(
+    *create_inline_fields(("🌘", "Old Name", None), ("🌔", "New Name", None))
+)
 
 
 class Reporter(Character):
+    PRIORITY = Priority.HIGH
+    DURABLE = True
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._embed_batch: Final[MessageBatch[_GuildEmbed]] = MessageBatch(
+            self._send_embed_batch, MAX_EMBEDS_PER_MESSAGE, DIGEST_DELAY_SECONDS
+        )
+        self._summary_batch: Final[MessageBatch[_MemberEvent]] = MessageBatch(
+            self._send_summary_batch, 0, DIGEST_DELAY_SECONDS
+        )
+        self._renames: Final[KeyedDebouncer[_MemberRename]] = KeyedDebouncer(
+            self._report_renames, _RENAME_DEBOUNCE_SECONDS, _RENAME_MAX_DELAY_SECONDS
+        )
+
     async def report_member_joined(self, member: Member) -> None:
-        fields = _get_core_member_fields(member) + create_standalone_fields(
-            ("🐣", "Account Created", format_time(member.created_at)),
+        fields = _MEMBER_JOINED_FIELDS.fill(
+            str(member.id),
+            get_member_nametag(member),
+            format_time(member.created_at),
         )
-        await self._report_member_action(member, Action.MEMBER_JOINED, fields)
+        await self._report_member_event(member, Action.MEMBER_JOINED, fields)
 
     async def report_member_left(self, member: Member) -> None:
-        fields = _get_core_member_fields(member) + create_standalone_fields(
-            ("🌱", "Joined Server", format_time(member.joined_at)),
-            ("🍂", "Server Roles", [role.mention for role in member.roles[1:]]),
+        fields = _MEMBER_LEFT_FIELDS.fill(
+            str(member.id),
+            get_member_nametag(member),
+            format_time(member.joined_at) if member.joined_at else None,
+            [role.mention for role in member.roles[1:]],
         )
-        await self._report_member_action(member, Action.MEMBER_LEFT, fields)
+        await self._report_member_event(member, Action.MEMBER_LEFT, fields)
 
     async def report_member_renamed(self, member: Member, old_name: str) -> None:
-        fields = create_inline_fields(
-            ("🌘", "Old Name", old_name),
-            ("🌔", "New Name", member.display_name),
+        await self._renames.add((member.guild.id, member.id), (member, old_name))
+
+    async def flush(self) -> None:
+        await self._renames.flush()
+        await self._embed_batch.flush()
+        await self._summary_batch.flush()
+
+    async def _report_renames(self, renames: list[_MemberRename]) -> None:
+        # The avatar and other details should reflect the member's latest state.
+        member = renames[-1][0]
+        names = [renames[0][1]] + [member.display_name for member, _ in renames]
+        old_names = [name for name, _ in groupby(names[:-1])]
+        fields = _MEMBER_RENAMED_FIELDS.fill(
+            _NAME_SEPARATOR.join(old_names), member.display_name
         )
         await self._report_member_action(member, Action.MEMBER_RENAMED, fields)
 
+    async def _report_member_event(
+        self, member: Member, action: Action, fields: RenderedFields
+    ) -> None:
+        # Joins and leaves are digested when they arrive faster than usual (i.e. raids).
+        digest_mode = MEMBER_EVENT_RATE.mode
+        if digest_mode is DigestMode.SUMMARY:
+            await self._summary_batch.add((action, member))
+        elif digest_mode is DigestMode.BATCHED:
+            avatar_name = f"avatar_{action.key}_{member.id}"  # Must be unique.
+            embed_with_files = await self._create_member_embed(
+                member, action, fields, avatar_name
+            )
+            await self._embed_batch.add((member.guild.id, embed_with_files))
+        else:
+            await self._report_member_action(member, action, fields)
+
     async def _report_member_action(
-        self, member: Member, action: Action, fields: Fields
+        self, member: Member, action: Action, fields: RenderedFields
     ) -> None:
-        await self._send_message(
+        embed, files = await self._create_member_embed(member, action, fields)
+        await self._send_embeds(BotChannel.ADMIN_LOG, [embed], files, member.guild.id)
+
+    async def _create_member_embed(
+        self,
+        member: Member,
+        action: Action,
+        fields: RenderedFields,
+        avatar_name: str = "avatar",
+    ) -> _EmbedWithFiles:
+        return self._create_embed(
             action=action,
-            destination=BotChannel.ADMIN_LOG,
             text=f"**{self._get_dialogue(action, name=member.mention)}**",
-            thumbnail=await get_member_avatar_file(member),
+            thumbnail=await get_member_avatar_file(member, name=avatar_name),
             fields=fields,
         )
+
+    async def _send_embed_batch(self, guild_embeds: list[_GuildEmbed]) -> None:
+        # Each server's embeds are sent to its own channel.
+        for guild_id, items in group_by_key(guild_embeds, lambda item: item[0]).items():
+            embeds = [embed for _, (embed, _) in items]
+            files = [file for _, (_, files) in items for file in (files or [])]
+            await self._send_embeds(BotChannel.ADMIN_LOG, embeds, files, guild_id)
+
+    async def _send_summary_batch(self, member_events: list[_MemberEvent]) -> None:
+        for guild_id, guild_member_events in group_by_key(
+            member_events, lambda event: event[1].guild.id
+        ).items():
+            await self._send_guild_summary(guild_id, guild_member_events)
+
+    async def _send_guild_summary(
+        self, guild_id: int, member_events: list[_MemberEvent]
+    ) -> None:
+        for action in Action:
+            members = [member for event, member in member_events if event is action]
+            if not members:
+                continue
+
+            heading = self._get_dialogue(action, "digest_dialogue", count=len(members))
+            member_lines = [
+                f"{member.mention} ({get_member_nametag(member)} • {member.id})"
+                for member in members
+            ]
+
+            # Split long summaries across multiple messages, if necessary.
+            text = f"**{heading}**\n"
+            for member_line in member_lines:
+                if len(text) + len(member_line) > _MAX_SUMMARY_LENGTH:
+                    embed, _ = self._create_embed(action, text)
+                    await self._send_embeds(BotChannel.ADMIN_LOG, [embed], [], guild_id)
+                    text = ""
+                text += f"\n{member_line}"
+
+            embed, _ = self._create_embed(action, text)
+            await self._send_embeds(BotChannel.ADMIN_LOG, [embed], [], guild_id)
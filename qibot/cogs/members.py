@@ -1,26 +1,156 @@
-from asyncio import sleep
+from asyncio import Future, TimeoutError, get_running_loop, wait_for
+from collections import OrderedDict
+from functools import partial
+from time import perf_counter
+from typing import Final, TypeAlias
 
-from discord import Cog, Member
+from discord import Bot, Cog, Guild, Member, Message, MessageType
 
-from qibot.characters import Greeter, Reporter
-from qibot.utils import Log, get_member_nametag
+from qibot.characters import MEMBER_EVENT_RATE, Greeter, Reporter
+from qibot.utils import EVENT_PIPELINE, METRICS, BotConfig, Log, get_member_nametag
+
+_MEMBER_EVENT_SETTINGS: Final[str] = "member_events"
+
+_JOIN_MESSAGE_TIMEOUT_SECONDS: Final[float] = BotConfig.get_setting(
+    _MEMBER_EVENT_SETTINGS, "join_message_timeout_seconds", 5.0
+)
+
+# Discord may deliver a system join message before the corresponding member event.
+_MAX_EARLY_JOIN_MESSAGES: Final[int] = 100
+
+_JoinKey: TypeAlias = tuple[int, int]  # The server ID, and the member ID.
 
 
 class MemberListeners(Cog):
+    def __init__(self, bot: Bot) -> None:
+        self._bot: Final[Bot] = bot
+        # Keyed by server ID and member ID, since a user may join more than one server.
+        self._join_message_futures: Final[dict[_JoinKey, Future]] = {}
+        self._early_join_messages: Final[OrderedDict[_JoinKey, None]] = OrderedDict()
+
     @Cog.listener()
     async def on_member_join(self, member: Member) -> None:
-        Log.i(f"{get_member_nametag(member)} has joined the server.")
-        await Reporter.report_member_joined(member)
-        await sleep(1)  # Wait until after Discord's default welcome message is sent.
-        await Greeter.greet(member)
+        if not _is_configured(member.guild):
+            return
+        Log.i(
+            "%s has joined the server.",
+            get_member_nametag(member),
+            member_id=member.id,
+            action="member_join",
+        )
+        MEMBER_EVENT_RATE.record_event()
+        await EVENT_PIPELINE.submit(
+            member.id, "member_join", partial(_report_member_joined, member)
+        )
+
+        # Greet after Discord's own welcome message, so that it's shown below it. This
+        # waits here instead of in the pipeline, so that it doesn't hold up a worker.
+        system_channel = member.guild.system_channel
+        if system_channel and member.guild.system_channel_flags.join_notifications:
+            await self._wait_for_join_message(member)
+        # Greetings have their own key, so they don't wait behind the member's reports.
+        await EVENT_PIPELINE.submit(
+            ("greet", member.id), "member_greet", partial(Greeter.greet, member)
+        )
 
     @Cog.listener()
     async def on_member_remove(self, member: Member) -> None:
-        Log.i(f"{get_member_nametag(member)} has left the server.")
-        await Reporter.report_member_left(member)
+        if not _is_configured(member.guild):
+            return
+        Log.i(
+            "%s has left the server.",
+            get_member_nametag(member),
+            member_id=member.id,
+            action="member_remove",
+        )
+        MEMBER_EVENT_RATE.record_event()
+        await EVENT_PIPELINE.submit(
+            member.id, "member_remove", partial(Reporter.report_member_left, member)
+        )
+
+    @Cog.listener()
+    async def on_uncached_member_remove(self, member: Member) -> None:
+        await self.on_member_remove(member)
 
     @Cog.listener()
     async def on_member_update(self, before: Member, after: Member) -> None:
-        if before.display_name != after.display_name:
-            Log.i(f"{get_member_nametag(after)} has changed their display name.")
-            await Reporter.report_member_renamed(after, before.display_name)
+        # Most updates are for roles, avatars, etc. Ignore them before doing any work.
+        if before.display_name != after.display_name and _is_configured(after.guild):
+            Log.i(
+                "%s has changed their display name.",
+                get_member_nametag(after),
+                member_id=after.id,
+                action="member_update",
+            )
+            await EVENT_PIPELINE.submit(
+                after.id,
+                "member_update",
+                partial(Reporter.report_member_renamed, after, before.display_name),
+            )
+
+    @Cog.listener()
+    async def on_message(self, message: Message) -> None:
+        guild = message.guild
+        if message.type is not MessageType.new_member or not (
+            guild and _is_configured(guild)
+        ):
+            return
+
+        key = (guild.id, message.author.id)
+        if future := self._join_message_futures.get(key):
+            if not future.done():
+                future.set_result(None)
+        else:
+            self._early_join_messages[key] = None
+            while len(self._early_join_messages) > _MAX_EARLY_JOIN_MESSAGES:
+                self._early_join_messages.popitem(last=False)
+
+    async def _wait_for_join_message(self, member: Member) -> None:
+        key = (member.guild.id, member.id)
+        if key in self._early_join_messages:
+            del self._early_join_messages[key]
+            return
+
+        start_time = perf_counter()
+        future = get_running_loop().create_future()
+        self._join_message_futures[key] = future
+        try:
+            await wait_for(future, timeout=_JOIN_MESSAGE_TIMEOUT_SECONDS)
+            elapsed_ms = (perf_counter() - start_time) * 1000
+            Log.d(
+                "Received join message for %d after %.0f ms.",
+                member.id,
+                elapsed_ms,
+                member_id=member.id,
+                latency_ms=round(elapsed_ms, 1),
+            )
+        except TimeoutError:
+            Log.d(
+                "Timed out while waiting for the join message for %d.",
+                member.id,
+                member_id=member.id,
+            )
+        finally:
+            # A quick rejoin may have replaced this future with a new one. Leave it be.
+            if self._join_message_futures.get(key) is future:
+                del self._join_message_futures[key]
+
+
+async def _report_member_joined(member: Member) -> None:
+    await Reporter.report_member_joined(member)
+    if event := METRICS.get_current_event():
+        # Includes the time that the event spent waiting in the pipeline.
+        elapsed_ms = (perf_counter() - event.started_at) * 1000
+        Log.i(
+            "Handled join for %s in %.0f ms.",
+            get_member_nametag(member),
+            elapsed_ms,
+            member_id=member.id,
+            action="member_join",
+            latency_ms=round(elapsed_ms, 1),
+        )
+
+
+def _is_configured(guild: Guild | None) -> bool:
+    # The bot may be in servers that it isn't configured for. Their events are ignored.
+    return BotConfig.is_configured_guild(guild.id if guild else None)
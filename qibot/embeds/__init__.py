@@ -4,9 +4,13 @@ from qibot.embeds.fielddata import (
     create_inline_fields,
     create_standalone_fields,
 )
+from qibot.embeds.plans import EmbedPlan, FieldsPlan, RenderedFields
 
 __all__ = [
+    "EmbedPlan",
     "Fields",
+    "FieldsPlan",
+    "RenderedFields",
     "create_embed",
     "create_embed_with_files",
     "create_inline_fields",
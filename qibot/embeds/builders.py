@@ -1,4 +1,5 @@
 from collections.abc import Iterable
+from functools import cache
 from typing import Final
 
 from discord import Embed, File
@@ -48,16 +49,20 @@ def _assemble_embed_data(
     params = locals()
 
     # For a mixin to be included, all of its required params must have non-falsy values.
-    class_mixins = {
+    class_mixins = tuple(
         mixin
         for mixin, required_params in _MIXIN_MATCHER.items()
         if all(params.get(param_name) for param_name in required_params)
-    }
+    )
+    return _get_embed_data_class(class_mixins)(**params)
 
-    mixin_label = "And".join(mixin.__name__ for mixin in class_mixins) or "NoMixins"
-    cls = type(f"{EmbedData.__name__}With{mixin_label}", (*class_mixins, EmbedData), {})
 
-    return cls(**params)
+@cache
+def _get_embed_data_class(class_mixins: tuple[type[EmbedData], ...]) -> type[EmbedData]:
+    # Each combination of mixins only needs to be synthesized into a class once.
+    mixin_label = "And".join(mixin.__name__ for mixin in class_mixins) or "NoMixins"
+    class_name = f"{EmbedData.__name__}With{mixin_label}"
+    return type(class_name, (*class_mixins, EmbedData), {})
 
 
 _MIXIN_MATCHER: Final[dict[type[EmbedData], set[str]]] = {
@@ -1,3 +1,4 @@
+from functools import lru_cache
 from typing import Final
 
 from discord import Embed, File
@@ -10,6 +11,7 @@ DEFAULT_COLOR: Final[int] = 0x6C79FF
 TEXT_WITH_EMOJI: Final[Template] = Template(f"$emoji{SPACING}$text")
 
 
+@lru_cache(maxsize=256)  # The same few emoji are validated over and over again.
 def assert_valid_emoji(emoji: str) -> None:
     if (not emoji) or (len(emoji) > 2) or emoji.isascii():
         raise ValueError(f'Invalid emoji: "{emoji}" (Must be non-ascii and <=2 chars.)')
@@ -3,14 +3,14 @@ from __future__ import annotations
 from collections.abc import Iterable
 from typing import Final, NamedTuple, TypeAlias
 
-_FieldContent: TypeAlias = str | Iterable[str] | None
-_PartialFieldData: TypeAlias = tuple[str, str, _FieldContent]
+FieldContent: TypeAlias = str | Iterable[str] | None
+_PartialFieldData: TypeAlias = tuple[str, str, FieldContent]
 
 
 class FieldData(NamedTuple):
     emoji: str = ""  # Required for non-blank fields.
     title: str = ""  # Required for non-blank fields.
-    content: _FieldContent = None
+    content: FieldContent = None
     inline: bool = True
 
 
@@ -1,5 +1,5 @@
 from collections.abc import Iterable
-from typing import Final
+from typing import Final, NamedTuple
 
 from discord import Embed
 
@@ -12,6 +12,72 @@ _FIELD_CONTENT: Final[Template] = Template(
 )
 _EMPTY_FIELD_CONTENT: Final[str] = TEXT_WITH_EMOJI.sub(emoji="✖", text="*None!*")
 
+# Discord rejects embeds with longer field values. (Or that total over 6000 chars.)
+_MAX_FIELD_VALUE_LENGTH: Final[int] = 1024
+
+
+class RenderedField(NamedTuple):
+    name: str
+    value: str
+    inline: bool
+
+
+def is_blank_field(field: FieldData) -> bool:
+    # Blank fields are allowed (and don't need to be validated) for formatting purposes.
+    return not (field.emoji or field.title or field.content)
+
+
+def validate_field(field: FieldData) -> None:
+    if not is_blank_field(field):
+        assert_valid_emoji(field.emoji)
+        if not field.title:
+            raise ValueError("A title is required for all fields.")
+
+
+def get_field_name(field: FieldData) -> str:
+    return TEXT_WITH_EMOJI.sub(emoji=field.emoji, text=field.title)
+
+
+def get_field_value(field: FieldData) -> str:
+    if not (field.emoji or field.title):
+        return SPACING
+    elif not field.content:
+        return _EMPTY_FIELD_CONTENT
+    elif isinstance(field.content, str):
+        return _FIELD_CONTENT.sub(text=field.content)
+    else:
+        return _join_field_lines(
+            [_FIELD_CONTENT.sub(text=text) for text in field.content]
+        )
+
+
+def _join_field_lines(lines: list[str]) -> str:
+    if len(value := "\n".join(lines)) <= _MAX_FIELD_VALUE_LENGTH:
+        return value
+
+    # Keep as many lines as fit, along with a line that says how many were left out.
+    length = 0
+    for shown_count, line in enumerate(lines):
+        length += len(line) + 1
+        left_out_count = len(lines) - shown_count - 1
+        if length + len(_get_more_line(left_out_count)) > _MAX_FIELD_VALUE_LENGTH:
+            break
+    return "\n".join([*lines[:shown_count], _get_more_line(len(lines) - shown_count)])
+
+
+def _get_more_line(count: int) -> str:
+    return _FIELD_CONTENT.sub(text=f"*+{count} more*")
+
+
+def render_field(field: FieldData) -> RenderedField:
+    return RenderedField(get_field_name(field), get_field_value(field), field.inline)
+
+
+def add_rendered_fields(embed: Embed, fields: Iterable[RenderedField]) -> Embed:
+    for field in fields:
+        embed.add_field(name=field.name, value=field.value, inline=field.inline)
+    return embed
+
 
 class FieldsMixin(EmbedData):
     def __init__(self, fields: Iterable[FieldData], **kwargs) -> None:
@@ -22,29 +88,8 @@ class FieldsMixin(EmbedData):
     def _validate(self) -> None:
         super()._validate()
         for field in self._fields:
-            # Validate any non-blank fields. (Blank fields are allowed for formatting.)
-            if field.emoji or field.title or field.content:
-                assert_valid_emoji(field.emoji)
-                if not field.title:
-                    raise ValueError("A title is required for all fields.")
+            validate_field(field)
 
     def build_embed(self) -> Embed:
-        embed = super().build_embed()
-        for field in self._fields:
-            embed.add_field(
-                name=TEXT_WITH_EMOJI.sub(emoji=field.emoji, text=field.title),
-                value=type(self)._get_field_value(field),
-                inline=field.inline,
-            )
-        return embed
-
-    @classmethod
-    def _get_field_value(cls, field: FieldData) -> str:
-        if not (field.emoji or field.title):
-            return SPACING
-        elif not field.content:
-            return _EMPTY_FIELD_CONTENT
-        elif isinstance(field.content, str):
-            return _FIELD_CONTENT.sub(text=field.content)
-        else:
-            return "\n".join(_FIELD_CONTENT.sub(text=text) for text in field.content)
+        rendered_fields = (render_field(field) for field in self._fields)
+        return add_rendered_fields(super().build_embed(), rendered_fields)
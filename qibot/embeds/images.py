@@ -2,13 +2,29 @@ from typing import Final
 
 from discord import Embed, File
 
-from qibot.assets import IMAGE_PATH
 from qibot.embeds.core import EmbedData
-from qibot.utils import Template
+from qibot.utils import ASSET_STORE, Template
 
 _ATTACHMENT_URL: Final[Template] = Template("attachment://$filename")
 
 
+def get_attachment_url(file: File) -> str:
+    return _ATTACHMENT_URL.sub(filename=file.filename)
+
+
+def resolve_thumbnail(thumbnail: str | File) -> tuple[str, File | None]:
+    # Resolve the thumbnail string through the asset store if it's a local image.
+    # Otherwise, assume it's a URL and leave it for Discord to deal with.
+    if isinstance(thumbnail, str):
+        thumbnail = ASSET_STORE.resolve(thumbnail) or thumbnail
+
+    # Wrangle the File into the expected fields & format required by Discord.
+    if isinstance(thumbnail, File):
+        return get_attachment_url(thumbnail), thumbnail
+    else:
+        return thumbnail, None
+
+
 class ThumbnailMixin(EmbedData):
     def __init__(self, thumbnail: str | File, **kwargs) -> None:
         super().__init__(**kwargs)
@@ -16,18 +32,9 @@ class ThumbnailMixin(EmbedData):
         self._thumbnail: str | File = thumbnail  # Intentionally not marked "Final".
 
     def _validate(self) -> None:
-        # Convert the thumbnail string into a File if it exists and is valid.
-        # Otherwise, assume it's a URL and leave it for Discord to deal with.
-        if isinstance(self._thumbnail, str):
-            file_path = IMAGE_PATH / self._thumbnail
-            if file_path.is_file():
-                self._thumbnail = File(fp=file_path)
-
-        # Wrangle the File into the expected fields & format required by Discord.
-        if isinstance(self._thumbnail, File):
-            thumbnail_url = _ATTACHMENT_URL.sub(filename=self._thumbnail.filename)
-            self._files.append(self._thumbnail)
-            self._thumbnail = thumbnail_url
+        self._thumbnail, file = resolve_thumbnail(self._thumbnail)
+        if file:
+            self._files.append(file)
 
         # Perform standard validation AFTER any changes are made to the thumbnail field.
         # At this point, it should be a non-empty and well-formed URL string.
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+from random import choice as choose_random
+from typing import Final, NamedTuple, TypeAlias
+
+from discord import Embed, File
+
+from qibot.embeds.core import DEFAULT_COLOR, TEXT_WITH_EMOJI, assert_valid_emoji
+from qibot.embeds.fielddata import FieldContent, FieldData
+from qibot.embeds.fields import (
+    RenderedField,
+    add_rendered_fields,
+    get_field_name,
+    get_field_value,
+    is_blank_field,
+    render_field,
+    validate_field,
+)
+from qibot.embeds.images import resolve_thumbnail
+from qibot.utils import ASSET_STORE, Template
+
+RenderedFields: TypeAlias = list[RenderedField]
+
+_TEXT_WITHOUT_EMOJI: Final[Template] = Template("$text")
+
+
+class _FieldSlot(NamedTuple):
+    field: FieldData
+    name: str
+
+
+class FieldsPlan:
+    """A fixed layout of embed fields, whose contents are filled in for each embed.
+
+    The given fields are validated, and their names (as well as any blank fields used
+    for padding) are rendered when the plan is created. The content of each non-blank
+    field is ignored, and must instead be passed to `fill()` in the same order.
+    """
+
+    def __init__(self, *fields: FieldData) -> None:
+        layout: list[RenderedField | _FieldSlot] = []
+        for field in (field._replace(content=None) for field in fields):
+            validate_field(field)
+            if is_blank_field(field):
+                layout.append(render_field(field))
+            else:
+                layout.append(_FieldSlot(field, get_field_name(field)))
+
+        self._layout: Final[tuple[RenderedField | _FieldSlot, ...]] = tuple(layout)
+        self._slot_count: Final[int] = sum(
+            isinstance(item, _FieldSlot) for item in self._layout
+        )
+
+    def fill(self, *contents: FieldContent) -> RenderedFields:
+        if len(contents) != self._slot_count:
+            raise ValueError(
+                f"Expected {self._slot_count} field contents, but got {len(contents)}."
+            )
+
+        rendered_fields, content_iterator = [], iter(contents)
+        for item in self._layout:
+            if isinstance(item, _FieldSlot):
+                field = item.field._replace(content=next(content_iterator))
+                rendered_fields.append(
+                    RenderedField(item.name, get_field_value(field), field.inline)
+                )
+            else:
+                rendered_fields.append(item)
+        return rendered_fields
+
+
+class EmbedPlan:
+    """The static parts of an embed, which are validated and prepared ahead of time.
+
+    Every possible emoji is validated and pre-formatted when the plan is created, and
+    the default thumbnail is resolved to either a local image or a URL. Each call to
+    `build()` then only needs to fill in the text, fields, and any dynamic thumbnail.
+    """
+
+    def __init__(
+        self, color: int = 0, emoji: str | Sequence[str] = "", thumbnail: str = ""
+    ) -> None:
+        emoji_choices = [emoji] if isinstance(emoji, str) else list(emoji)
+        for emoji_choice in filter(None, emoji_choices):
+            assert_valid_emoji(emoji_choice)
+
+        self._color: Final[int] = color or DEFAULT_COLOR
+        self._text_templates: Final[list[Template]] = [
+            Template(TEXT_WITH_EMOJI.safe_sub(emoji=emoji_choice))
+            if emoji_choice
+            else _TEXT_WITHOUT_EMOJI
+            for emoji_choice in (emoji_choices or [""])
+        ]
+        # Local images are loaded into the asset store now, rather than on first use.
+        self._thumbnail_is_local: Final[bool] = ASSET_STORE.is_local(thumbnail)
+        self._thumbnail: Final[str] = thumbnail
+
+    def build(
+        self,
+        text: str = "",
+        thumbnail: str | File | None = None,
+        fields: Iterable[RenderedField | FieldData] | None = None,
+    ) -> tuple[Embed, list[File]]:
+        embed, files = Embed(color=self._color), []
+
+        if text:
+            embed.description = choose_random(self._text_templates).sub(text=text)
+
+        if fields:
+            add_rendered_fields(embed, _render_fields(fields))
+
+        if thumbnail:
+            thumbnail_url, thumbnail_file = resolve_thumbnail(thumbnail)
+        elif self._thumbnail_is_local:
+            # May be a new File (they're one-use) or a URL, if the image was uploaded.
+            thumbnail_url, thumbnail_file = resolve_thumbnail(self._thumbnail)
+        else:
+            thumbnail_url, thumbnail_file = self._thumbnail, None
+
+        if thumbnail_url:
+            embed.set_thumbnail(url=thumbnail_url)
+        if thumbnail_file:
+            files.append(thumbnail_file)
+
+        return embed, files
+
+
+def _render_fields(
+    fields: Iterable[RenderedField | FieldData],
+) -> Iterable[RenderedField]:
+    for field in fields:
+        if isinstance(field, FieldData):
+            # Fields that weren't filled in from a plan still need to be validated.
+            validate_field(field)
+            yield render_field(field)
+        else:
+            yield field
@@ -1,9 +1,8 @@
 from typing import Final
 
 from botstrap import Botstrap, CliColors, Color, Option
-from discord import AllowedMentions
 
-from qibot.utils import initialize_logging
+from qibot.utils import STARTUP_PROFILER, initialize_logging
 
 VERSION: Final[str] = "0.2.0"
 
@@ -33,9 +32,19 @@ def main() -> int:
             help="The lowest message level to log.",
         ),
         allow_pings=Option(flag=True, help="Allow the bot to ping people/roles."),
+        json_logs=Option(flag=True, help="Log JSON lines with structured fields."),
+        profile_startup=Option(
+            flag=True, help="Log how long each module takes to import and initialize."
+        ),
     )
 
-    initialize_logging(log_level=args.loglevel)
+    if args.profile_startup:
+        STARTUP_PROFILER.start()
+
+    # Imported after parsing args, so that "--help" doesn't have to wait for it.
+    from discord import AllowedMentions
+
+    initialize_logging(log_level=args.loglevel, json_lines=args.json_logs)
     pings = AllowedMentions.everyone() if args.allow_pings else AllowedMentions.none()
     botstrap.run_bot(bot_class="qibot.bot.QiBot", allowed_mentions=pings)
 
@@ -1,21 +1,83 @@
-from qibot.utils.channels import BotChannel
-from qibot.utils.config import BotConfig
-from qibot.utils.images import get_member_avatar_file
-from qibot.utils.json import load_json_from_file
-from qibot.utils.logging import Log, initialize_logging
-from qibot.utils.misc import format_time, get_member_nametag, load_content_from_url
-from qibot.utils.templates import Template, get_template_keys
+from importlib import import_module
+from typing import TYPE_CHECKING, Any, Final
+
+if TYPE_CHECKING:
+    from qibot.utils.assets import ASSET_STORE
+    from qibot.utils.channels import BotChannel
+    from qibot.utils.config import BotConfig
+    from qibot.utils.http import HTTP_CLIENT, load_content_from_url
+    from qibot.utils.images import (
+        get_avatar_cache_stats,
+        get_member_avatar_file,
+        shutdown_image_executor,
+    )
+    from qibot.utils.json import load_json_from_file, save_json_to_file
+    from qibot.utils.logging import Log, initialize_logging
+    from qibot.utils.metrics import METRICS
+    from qibot.utils.misc import format_time, get_member_nametag
+    from qibot.utils.outbound import OUTBOUND_SCHEDULER, Priority
+    from qibot.utils.outbox import OUTBOX
+    from qibot.utils.pipeline import EVENT_PIPELINE
+    from qibot.utils.profiling import STARTUP_PROFILER
+    from qibot.utils.templates import Template, get_template_keys
+
+# Submodules are only imported when one of their exports is first accessed, so that
+# heavy dependencies (and the config file) aren't loaded before they're needed.
+_EXPORT_MODULES: Final[dict[str, str]] = {
+    "ASSET_STORE": "assets",
+    "BotChannel": "channels",
+    "BotConfig": "config",
+    "EVENT_PIPELINE": "pipeline",
+    "HTTP_CLIENT": "http",
+    "Log": "logging",
+    "METRICS": "metrics",
+    "OUTBOUND_SCHEDULER": "outbound",
+    "OUTBOX": "outbox",
+    "Priority": "outbound",
+    "STARTUP_PROFILER": "profiling",
+    "Template": "templates",
+    "format_time": "misc",
+    "get_avatar_cache_stats": "images",
+    "get_member_avatar_file": "images",
+    "get_member_nametag": "misc",
+    "get_template_keys": "templates",
+    "initialize_logging": "logging",
+    "load_content_from_url": "http",
+    "load_json_from_file": "json",
+    "save_json_to_file": "json",
+    "shutdown_image_executor": "images",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _EXPORT_MODULES:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    value = getattr(import_module(f"{__name__}.{_EXPORT_MODULES[name]}"), name)
+    globals()[name] = value  # Skip this function on subsequent accesses.
+    return value
+
 
 __all__ = [
+    "ASSET_STORE",
     "BotChannel",
     "BotConfig",
+    "EVENT_PIPELINE",
+    "HTTP_CLIENT",
     "Log",
+    "METRICS",
+    "OUTBOUND_SCHEDULER",
+    "OUTBOX",
+    "Priority",
+    "STARTUP_PROFILER",
     "Template",
     "format_time",
+    "get_avatar_cache_stats",
     "get_member_avatar_file",
     "get_member_nametag",
     "get_template_keys",
     "initialize_logging",
     "load_content_from_url",
     "load_json_from_file",
+    "save_json_to_file",
+    "shutdown_image_executor",
 ]
@@ -0,0 +1,163 @@
+import time
+from collections.abc import Iterable
+from io import BytesIO
+from pathlib import Path
+from typing import Final, NamedTuple
+from urllib.parse import parse_qs, quote, urlsplit
+
+from discord import Attachment, File
+
+from qibot.assets import IMAGE_PATH, OPTIMIZED_IMAGE_PATH
+from qibot.assets.manifest import AssetVariants, get_content_hash, load_manifest
+from qibot.utils.config import BotConfig
+from qibot.utils.logging import Log
+from qibot.utils.metrics import METRICS
+
+_ASSET_SETTINGS: Final[str] = "assets"
+
+# Stop reusing an upload URL this long before Discord says it expires, to be safe.
+_UPLOAD_URL_EXPIRY_MARGIN_SECONDS: Final[float] = 3600.0
+
+
+class _AssetFile(File):
+    # Distinguishes uploads of local assets from any other files in a message.
+    pass
+
+
+class _LocalAsset(NamedTuple):
+    path: str  # Relative to the images folder.
+    data: bytes
+
+    @property
+    def filename(self) -> str:
+        return Path(self.path).name
+
+
+class _UploadUrl(NamedTuple):
+    url: str
+    expires_at: float  # As returned by `time.time()`.
+
+
+class AssetStore:
+    """Serves the bot's local images (e.g. character thumbnails) from memory.
+
+    Each image is read from disk once, the first time it's requested. (That's usually
+    at startup, when the embed plans for each character are created.) After that, an
+    embed refers to it by URL whenever possible, instead of re-uploading its bytes:
+
+    - If `static_base_url` is set, every image is assumed to be hosted there, under the
+      same path (relative to the images folder). Nothing is ever uploaded.
+    - Otherwise, an image is attached to the first message that uses it. If
+      `reuse_uploads` is enabled, the URL of that attachment (on Discord's CDN) is
+      recorded once the message is sent, and is used by embeds after that until it
+      expires. (Discord signs these URLs, and they stop working after a while.) At that
+      point, the image is uploaded again.
+
+    If the images have been optimized (by `python -m qibot.assets.optimize`), each one
+    is served as its pre-sized thumbnail variant, as listed in the manifest. Variants
+    are ignored if their source image has changed since they were built.
+    """
+
+    def __init__(
+        self, static_base_url: str, reuse_uploads: bool, upload_url_ttl: float
+    ) -> None:
+        self._static_base_url: Final[str] = static_base_url.rstrip("/")
+        self._reuse_uploads: Final[bool] = reuse_uploads and not static_base_url
+        self._upload_url_ttl: Final[float] = upload_url_ttl
+
+        self._assets: Final[dict[str, _LocalAsset]] = {}
+        self._upload_urls: Final[dict[str, _UploadUrl]] = {}  # Keyed by filename.
+        self._manifest: dict[str, AssetVariants] | None = None  # Loaded on demand.
+
+    def is_local(self, name: str) -> bool:
+        return self._get_asset(name) is not None
+
+    def resolve(self, name: str) -> str | File | None:
+        # Returns the URL or a new `File` for the image, or `None` if there isn't one.
+        if not (asset := self._get_asset(name)):
+            return None
+        elif self._static_base_url:
+            return f"{self._static_base_url}/{quote(asset.path)}"
+        elif upload_url := self._upload_urls.get(asset.filename):
+            if time.time() < upload_url.expires_at:
+                return upload_url.url
+            Log.d('The uploaded URL for "%s" has expired.', asset.filename)
+            del self._upload_urls[asset.filename]
+
+        METRICS.increment("asset_uploads_total", asset=asset.filename)
+        return _AssetFile(BytesIO(asset.data), filename=asset.filename)
+
+    def get_pending_uploads(self, files: Iterable[File] | None) -> list[str]:
+        # The filenames of any assets in `files` whose upload URLs should be recorded.
+        if not self._reuse_uploads:
+            return []
+        return [
+            file.filename
+            for file in (files or [])
+            if isinstance(file, _AssetFile)
+            and file.filename
+            and (file.filename not in self._upload_urls)
+        ]
+
+    def record_uploads(
+        self, filenames: list[str], attachments: list[Attachment]
+    ) -> None:
+        for attachment in attachments:
+            if attachment.filename in filenames:
+                Log.d('Reusing the uploaded URL for "%s".', attachment.filename)
+                self._upload_urls[attachment.filename] = _UploadUrl(
+                    attachment.url, self._get_expiry_time(attachment.url)
+                )
+
+    def _get_expiry_time(self, url: str) -> float:
+        # Signed CDN URLs have an "ex" param, which is a hex timestamp of their expiry.
+        expiry_time = time.time() + self._upload_url_ttl
+        try:
+            signed_expiry_time = int(parse_qs(urlsplit(url).query)["ex"][0], 16)
+        except (KeyError, ValueError):
+            return expiry_time
+        return min(expiry_time, signed_expiry_time - _UPLOAD_URL_EXPIRY_MARGIN_SECONDS)
+
+    def _get_asset(self, name: str) -> _LocalAsset | None:
+        # URLs (e.g. member avatars) are never local, so they aren't worth a disk check.
+        # Misses aren't cached either, so that they can't pile up during a raid.
+        if asset := self._assets.get(name):
+            return asset
+        elif not name or urlsplit(name).scheme or not (IMAGE_PATH / name).is_file():
+            return None
+
+        try:
+            asset = self._assets[name] = self._load_asset(name)
+            return asset
+        except OSError as error:
+            Log.e(f'Failed to read the image "{name}". ({error})')
+            return None
+
+    def _load_asset(self, name: str) -> _LocalAsset:
+        data = (IMAGE_PATH / name).read_bytes()
+        if self._manifest is None:
+            self._manifest = load_manifest()
+
+        if variants := self._manifest.get(name):
+            if variants.source_hash != get_content_hash(data):
+                Log.w(f'Optimized variants of "{name}" are outdated. Using the source.')
+            else:
+                variant_path = OPTIMIZED_IMAGE_PATH / variants.thumbnail
+                try:
+                    return _LocalAsset(
+                        variant_path.relative_to(IMAGE_PATH).as_posix(),
+                        variant_path.read_bytes(),
+                    )
+                except OSError as error:
+                    Log.w(f'Failed to read a variant of "{name}". ({error})')
+
+        return _LocalAsset(name, data)
+
+
+ASSET_STORE: Final[AssetStore] = AssetStore(
+    static_base_url=BotConfig.get_setting(_ASSET_SETTINGS, "static_base_url", ""),
+    reuse_uploads=BotConfig.get_setting(_ASSET_SETTINGS, "reuse_uploads", True),
+    upload_url_ttl=BotConfig.get_setting(
+        _ASSET_SETTINGS, "upload_url_ttl_seconds", 43200.0
+    ),
+)
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from asyncio import to_thread
+from collections import OrderedDict
+from pathlib import Path
+from typing import Final, NamedTuple, cast
+
+from qibot.utils.logging import Log
+
+
+class CacheStats(NamedTuple):
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    memory_evictions: int = 0
+    disk_evictions: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+
+class TieredCache:
+    """A bounded in-memory LRU cache of bytes, optionally backed by files on disk.
+
+    Every entry that is put into the cache is written through to both tiers. Entries
+    that are evicted from memory can still be found on disk (if it's enabled), and will
+    be promoted back into memory the next time they're requested. The disk tier is
+    bounded separately, and evicts its least-recently-written files first.
+    """
+
+    def __init__(
+        self,
+        max_memory_entries: int,
+        disk_path: Path | None = None,
+        max_disk_entries: int = 0,
+        file_suffix: str = "",
+    ) -> None:
+        self._max_memory_entries: Final[int] = max(max_memory_entries, 0)
+        self._max_disk_entries: Final[int] = max(max_disk_entries, 0)
+        self._disk_path: Final[Path | None] = disk_path if max_disk_entries else None
+        self._file_suffix: Final[str] = file_suffix
+
+        self._memory_entries: Final[OrderedDict[str, bytes]] = OrderedDict()
+        self._disk_entries: OrderedDict[str, Path] | None = None  # Loaded on demand.
+        self._stats: CacheStats = CacheStats()
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._stats
+
+    async def get(self, key: str) -> bytes | None:
+        if key in self._memory_entries:
+            self._memory_entries.move_to_end(key)
+            self._count(memory_hits=1)
+            return self._memory_entries[key]
+
+        if (disk_entries := await self._get_disk_entries()) and (key in disk_entries):
+            try:
+                data = await to_thread(disk_entries[key].read_bytes)
+            except OSError as error:
+                Log.w(f'Could not read cached file "{disk_entries[key]}". ({error})')
+                del disk_entries[key]
+            else:
+                self._count(disk_hits=1)
+                self._put_in_memory(key, data)
+                return data
+
+        self._count(misses=1)
+        return None
+
+    async def put(self, key: str, data: bytes) -> None:
+        self._put_in_memory(key, data)
+        if (disk_entries := await self._get_disk_entries()) is not None:
+            await self._put_on_disk(disk_entries, key, data)
+
+    def _count(self, **increments: int) -> None:
+        self._stats = self._stats._replace(
+            **{name: getattr(self._stats, name) + n for name, n in increments.items()}
+        )
+
+    def _put_in_memory(self, key: str, data: bytes) -> None:
+        if not self._max_memory_entries:
+            return
+        self._memory_entries[key] = data
+        self._memory_entries.move_to_end(key)
+        while len(self._memory_entries) > self._max_memory_entries:
+            self._memory_entries.popitem(last=False)
+            self._count(memory_evictions=1)
+
+    async def _put_on_disk(
+        self, disk_entries: OrderedDict[str, Path], key: str, data: bytes
+    ) -> None:
+        # Disk entries are only loaded if there's a disk path, so it's never `None`.
+        file_path = cast(Path, self._disk_path) / f"{key}{self._file_suffix}"
+        evicted_paths = []
+
+        disk_entries[key] = file_path
+        disk_entries.move_to_end(key)
+        while len(disk_entries) > self._max_disk_entries:
+            evicted_paths.append(disk_entries.popitem(last=False)[1])
+
+        def write_and_evict() -> None:
+            file_path.write_bytes(data)
+            for evicted_path in evicted_paths:
+                evicted_path.unlink(missing_ok=True)
+
+        try:
+            await to_thread(write_and_evict)
+        except OSError as error:
+            Log.w(f'Could not write cached file "{file_path}". ({error})')
+            disk_entries.pop(key, None)
+        else:
+            self._count(disk_evictions=len(evicted_paths))
+
+    async def _get_disk_entries(self) -> OrderedDict[str, Path] | None:
+        if (self._disk_path is None) or (self._disk_entries is not None):
+            return self._disk_entries
+
+        def load_disk_entries(disk_path: Path) -> list[Path]:
+            disk_path.mkdir(parents=True, exist_ok=True)
+            file_paths = disk_path.glob(f"*{self._file_suffix}")
+            return sorted(file_paths, key=lambda path: path.stat().st_mtime)
+
+        try:
+            file_paths = await to_thread(load_disk_entries, self._disk_path)
+        except OSError as error:
+            Log.w(f'Could not load cached files from "{self._disk_path}". ({error})')
+            file_paths = []
+
+        # Another coroutine may have finished loading the entries while this one waited.
+        if self._disk_entries is None:
+            self._disk_entries = OrderedDict(
+                (path.name.removesuffix(self._file_suffix), path) for path in file_paths
+            )
+            Log.d(f'Found {len(file_paths)} cached file(s) in "{self._disk_path}".')
+        return self._disk_entries
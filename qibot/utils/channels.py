@@ -1,63 +1,241 @@
+from asyncio import Lock, gather, to_thread
+from collections.abc import Mapping
 from enum import Enum, auto
-from typing import Final
+from functools import cache
+from time import perf_counter
+from typing import Any, Final
 
 from discord import ApplicationContext, Bot, TextChannel, Webhook
 
-from qibot.utils.config import BotConfig
+from qibot.utils.config import BotConfig, ConfigSnapshot
+from qibot.utils.http import HTTP_CLIENT
+from qibot.utils.json import load_json_from_file, save_json_to_file
 from qibot.utils.logging import Log
 from qibot.utils.templates import Template
 
 _BOT_WEBHOOK_NAME: Final[str] = "QiBot Webhook"
+_WEBHOOK_STORE_FILENAME: Final[str] = "webhooks"
 
 _CTX_MISMATCH: Final[Template] = Template("That command is only available in <#$id>.")
 
-_CHANNEL_CACHE: Final[dict[str, TextChannel]] = {}
-_WEBHOOK_CACHE: Final[dict[str, Webhook]] = {}
+# Each server's channels (and their webhooks) are cached separately, by server ID.
+_CHANNEL_CACHE: Final[dict[int, dict[str, TextChannel]]] = {}
+_WEBHOOK_CACHE: Final[dict[int, dict[str, Webhook]]] = {}
+
+# Keeps saves of the webhook store in order, since each one happens in a thread.
+_WEBHOOK_STORE_LOCK: Final[Lock] = Lock()
 
 
 class BotChannel(Enum):
+    """A role that a channel fills for the bot. Each server has its own channel for it.
+
+    Methods that take a `guild_id` use the primary server if it's `None`.
+    """
+
     @staticmethod
-    def _generate_next_value_(name: str, start: int, count: int, values: list) -> int:
-        # TODO: Define a channel to fall back to, so the others can be "required=False".
-        return BotConfig.get_channel_id(name, required=True)
+    def _generate_next_value_(name: str, start: int, count: int, values: list) -> str:
+        # Channel IDs can be reloaded, so they're looked up from the config on demand.
+        return name
 
     @classmethod
     async def initialize_all(cls, bot: Bot) -> None:
-        for enum_member in cls:
-            name, uid = enum_member.name, enum_member.value
+        # Prewarm the webhooks too, so the first message is as fast as any other.
+        start_time = perf_counter()
+        guild_channels = await cls._resolve_all(
+            bot, BotConfig.get_snapshot().guild_channel_ids
+        )
+        guild_webhooks = await gather(
+            *(
+                _prewarm_webhooks(channels, start_time)
+                for channels in guild_channels.values()
+            )
+        )
+        for (guild_id, channels), webhooks in zip(
+            guild_channels.items(), guild_webhooks
+        ):
+            _CHANNEL_CACHE.setdefault(guild_id, {}).update(channels)
+            _WEBHOOK_CACHE.setdefault(guild_id, {}).update(webhooks)
+
+    @classmethod
+    async def reload_all(cls, bot: Bot, snapshot: ConfigSnapshot) -> None:
+        # Resolve every channel before changing anything, in case any of them fail.
+        start_time = perf_counter()
+        guild_channels = await cls._resolve_all(bot, snapshot.guild_channel_ids)
+        changed_guild_channels = {
+            guild_id: {
+                name: channel
+                for name, channel in channels.items()
+                if _CHANNEL_CACHE.get(guild_id, {}).get(name) != channel
+            }
+            for guild_id, channels in guild_channels.items()
+        }
+        guild_webhooks = await gather(
+            *(
+                _prewarm_webhooks(changed_channels, start_time)
+                for changed_channels in changed_guild_channels.values()
+            )
+        )
+
+        # There are no awaits past this point, so the swap can't be interrupted.
+        for (guild_id, changed_channels), webhooks in zip(
+            changed_guild_channels.items(), guild_webhooks
+        ):
+            cached_webhooks = _WEBHOOK_CACHE.setdefault(guild_id, {})
+            for name, channel in changed_channels.items():
+                Log.i(f'Updated "{name}" channel to "{channel.name}" ({channel.id}).')
+                cached_webhooks.pop(name, None)
+            _CHANNEL_CACHE.setdefault(guild_id, {}).update(guild_channels[guild_id])
+            cached_webhooks.update(webhooks)
+
+    @classmethod
+    async def _resolve_all(
+        cls, bot: Bot, guild_channel_ids: Mapping[int, Mapping[str, int]]
+    ) -> dict[int, dict[str, TextChannel]]:
+        # Every channel in every server is resolved concurrently.
+        results = await gather(
+            *(cls._resolve_guild(bot, ids) for ids in guild_channel_ids.values())
+        )
+        return dict(zip(guild_channel_ids, results))
+
+    @classmethod
+    async def _resolve_guild(
+        cls, bot: Bot, channel_ids: Mapping[str, int]
+    ) -> dict[str, TextChannel]:
+        async def resolve(name: str) -> TextChannel:
+            # TODO: Define a channel to fall back to, so the others can be optional.
+            if not (uid := channel_ids.get(name.lower(), 0)):
+                raise ValueError(f'The "{name}" channel ID is missing from the config.')
+            start_time = perf_counter()
             channel = bot.get_channel(uid) or await bot.fetch_channel(uid)
             if not isinstance(channel, TextChannel):
                 raise ValueError(f'Invalid "{name}" channel. (Specified ID: "{uid}")')
-            _CHANNEL_CACHE[name] = channel
+            Log.d(f'Resolved "{name}" channel in {_get_elapsed_ms(start_time)} ms.')
+            return channel
+
+        names = [enum_member.name for enum_member in cls]
+        return dict(zip(names, await gather(*(resolve(name) for name in names))))
 
     ADMIN_LOG = auto()
     BOT_SPAM = auto()
     RULES = auto()
     WELCOME = auto()
 
-    @property
-    def url(self) -> str:
-        return self._get_from_cache().jump_url
+    def get_id(self, guild_id: int | None = None) -> int:
+        return BotConfig.get_channel_id(self.name, required=True, guild_id=guild_id)
+
+    def get_url(self, guild_id: int | None = None) -> str:
+        return self._get_from_cache(guild_id).jump_url
 
     async def is_context(self, ctx: ApplicationContext, respond: bool = True) -> bool:
-        if ctx.channel_id == self.value:
+        channel_id = self.get_id(ctx.guild_id)
+        if ctx.channel_id == channel_id:
             return True
         elif respond:
-            await ctx.respond(_CTX_MISMATCH.sub(id=self.value), ephemeral=True)
+            await ctx.respond(_CTX_MISMATCH.sub(id=channel_id), ephemeral=True)
         return False
 
-    async def get_webhook(self) -> Webhook:
-        if self.name not in _WEBHOOK_CACHE:
-            _WEBHOOK_CACHE[self.name] = await self._find_or_create_webhook()
-        return _WEBHOOK_CACHE[self.name]
-
-    async def _find_or_create_webhook(self) -> Webhook:
-        channel = self._get_from_cache()
-        for webhook in await channel.webhooks():
-            if webhook.name == _BOT_WEBHOOK_NAME:
-                return webhook
-        Log.i(f'Creating bot webhook in "{channel.name}" (Channel ID: {channel.id}).')
-        return await channel.create_webhook(name=_BOT_WEBHOOK_NAME)
-
-    def _get_from_cache(self) -> TextChannel:
-        return _CHANNEL_CACHE[self.name]
+    async def get_webhook(self, guild_id: int | None = None) -> Webhook:
+        guild_webhooks = _WEBHOOK_CACHE.setdefault(_get_guild_key(guild_id), {})
+        if self.name not in guild_webhooks:
+            channel = self._get_from_cache(guild_id)
+            guild_webhooks[self.name] = await _find_or_create_webhook(channel)
+            await _store_webhook(channel, guild_webhooks[self.name])
+        return guild_webhooks[self.name]
+
+    async def evict_webhook(
+        self, webhook: Webhook, guild_id: int | None = None
+    ) -> None:
+        # Should be called if the webhook was deleted, so it'll be replaced when needed.
+        Log.w(f'The webhook for "{self.name}" channel no longer exists.')
+        guild_webhooks = _WEBHOOK_CACHE.get(_get_guild_key(guild_id), {})
+        for name, cached_webhook in list(guild_webhooks.items()):
+            if cached_webhook.id == webhook.id:
+                del guild_webhooks[name]
+        await _store_webhook(self._get_from_cache(guild_id), None)
+
+    def _get_from_cache(self, guild_id: int | None) -> TextChannel:
+        return _CHANNEL_CACHE[_get_guild_key(guild_id)][self.name]
+
+
+def _get_guild_key(guild_id: int | None) -> int:
+    return guild_id or BotConfig.get_server_id()
+
+
+async def _prewarm_webhooks(
+    channels: Mapping[str, TextChannel], start_time: float
+) -> dict[str, Webhook]:
+    async def prewarm(channel: TextChannel) -> tuple[Webhook, str]:
+        # Stored webhooks are assumed to be valid until Discord says otherwise.
+        if not (webhook := _get_stored_webhook(channel)):
+            webhook = await _find_or_create_webhook(channel)
+            await _store_webhook(channel, webhook)
+        return webhook, _get_elapsed_ms(start_time)
+
+    # Channels may be shared by multiple names, but each only needs one webhook.
+    unique_channels = {channel.id: channel for channel in channels.values()}
+    results = await gather(
+        *(prewarm(channel) for channel in unique_channels.values()),
+        return_exceptions=True,
+    )
+    results_by_channel_id = dict(zip(unique_channels, results))
+
+    webhooks = {}
+    for name, channel in channels.items():
+        result = results_by_channel_id[channel.id]
+        if isinstance(result, BaseException):
+            # Not fatal, since the webhook will be requested again when it's needed.
+            Log.e(f'Failed to prewarm the webhook for "{name}" channel. ({result})')
+        else:
+            webhooks[name], elapsed_ms = result
+            Log.i(f'"{name}" channel is ready after {elapsed_ms} ms.')
+    return webhooks
+
+
+async def _find_or_create_webhook(channel: TextChannel) -> Webhook:
+    for webhook in await channel.webhooks():
+        if webhook.name == _BOT_WEBHOOK_NAME:
+            return webhook
+    Log.i(f'Creating bot webhook in "{channel.name}" (Channel ID: {channel.id}).')
+    return await channel.create_webhook(name=_BOT_WEBHOOK_NAME)
+
+
+@cache
+def _get_webhook_store() -> dict[str, Any]:
+    # Maps each channel ID (as a string) to the ID and token of the bot's webhook.
+    # Tokens are secrets, so the file isn't copied into a snapshot.
+    return load_json_from_file(
+        _WEBHOOK_STORE_FILENAME, dict, create_if_missing=True, use_snapshot=False
+    )
+
+
+def _get_stored_webhook(channel: TextChannel) -> Webhook | None:
+    entry = _get_webhook_store().get(str(channel.id))
+    if isinstance(entry, dict):
+        webhook_id, webhook_token = entry.get("id"), entry.get("token")
+        if isinstance(webhook_id, int) and isinstance(webhook_token, str):
+            Log.d(f'Using stored webhook for "{channel.name}" ({channel.id}).')
+            return Webhook.partial(
+                webhook_id, webhook_token, session=HTTP_CLIENT.session
+            )
+    return None
+
+
+async def _store_webhook(channel: TextChannel, webhook: Webhook | None) -> None:
+    store, channel_key = _get_webhook_store(), str(channel.id)
+    if webhook and webhook.token:
+        store[channel_key] = {"id": webhook.id, "token": webhook.token}
+    elif channel_key in store:
+        del store[channel_key]
+    else:
+        return
+
+    # Save a copy, in case the store is changed while the thread is writing it.
+    async with _WEBHOOK_STORE_LOCK:
+        try:
+            await to_thread(save_json_to_file, _WEBHOOK_STORE_FILENAME, dict(store))
+        except OSError as error:
+            Log.w(f"Failed to save the webhook store. ({error})")
+
+
+def _get_elapsed_ms(start_time: float) -> str:
+    return f"{(perf_counter() - start_time) * 1000:.0f}"
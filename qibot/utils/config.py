@@ -1,5 +1,9 @@
-from typing import Any, ClassVar, Final, overload
+from asyncio import CancelledError, sleep, to_thread
+from collections.abc import Awaitable, Callable, Mapping
+from types import MappingProxyType
+from typing import Any, ClassVar, Final, NamedTuple, TypeVar, overload
 
+from qibot.assets import DATA_PATH
 from qibot.utils.json import load_json_from_file
 from qibot.utils.logging import Log
 
@@ -7,72 +11,266 @@ _CONFIG_FILENAME: Final[str] = "config"
 
 _SERVER_ID_KEY: Final[str] = "server_id"
 _CHANNEL_IDS_KEY: Final[str] = "channel_ids"
+_GUILDS_KEY: Final[str] = "guilds"
+_SETTINGS_KEY: Final[str] = "settings"
 
 _DUMMY_SERVER_OR_CHANNEL_ID: Final[int] = 111111111111111111
 
-_INITIAL_CONFIG: Final[dict[str, Any]] = load_json_from_file(
-    filename=_CONFIG_FILENAME,
-    data_type=dict,
-    lowercase_dict_keys=True,
-    create_if_missing=True,
-    default_data={
-        _SERVER_ID_KEY: _DUMMY_SERVER_OR_CHANNEL_ID,
-        _CHANNEL_IDS_KEY: {},
-    },
-)
+_SettingT = TypeVar("_SettingT", str, int, float, bool)
+
+
+class ConfigSnapshot(NamedTuple):
+    server_id: int  # The primary server, i.e. the only one unless "guilds" are set.
+    channel_ids: Mapping[str, int]  # The channels in the primary server.
+    settings: Mapping[str, Mapping[str, Any]]
+    guild_channel_ids: Mapping[int, Mapping[str, int]]  # Includes the primary server.
+
+    @property
+    def is_multi_guild(self) -> bool:
+        return len(self.guild_channel_ids) > 1
 
 
 class BotConfig:
-    # TODO: Allow config (or at least channel IDs) to be reloaded while bot is online.
-    _current_config: ClassVar[dict[str, Any]] = _INITIAL_CONFIG
+    """Provides the values in the config file, as of the last time it was loaded.
+
+    The file is validated once whenever it's loaded, and the results are kept in an
+    immutable `ConfigSnapshot`. If `watch_for_changes()` is running, the snapshot is
+    replaced (all at once) whenever the file is modified and the new contents are valid.
+
+    To serve multiple servers, the config may contain a "guilds" object that maps each
+    additional server ID to its own "channel_ids". The top-level "server_id" is still
+    used as the primary server, but may be omitted if "guilds" is present.
+    """
+
+    _snapshot: ClassVar[ConfigSnapshot]
+
+    @classmethod
+    def get_snapshot(cls) -> ConfigSnapshot:
+        return cls._snapshot
 
     @classmethod
     def get_server_id(cls) -> int:
-        return _get_value(cls._current_config, _SERVER_ID_KEY, 0, True)
+        return cls._snapshot.server_id
+
+    @classmethod
+    def get_guild_ids(cls) -> list[int]:
+        return list(cls._snapshot.guild_channel_ids)
+
+    @classmethod
+    def is_configured_guild(cls, guild_id: int | None) -> bool:
+        return guild_id in cls._snapshot.guild_channel_ids
+
+    @classmethod
+    def get_channel_id(
+        cls, channel_name: str, required: bool, guild_id: int | None = None
+    ) -> int:
+        channel_ids = cls._snapshot.guild_channel_ids.get(
+            guild_id or cls._snapshot.server_id, {}
+        )
+        channel_id = channel_ids.get(channel_name.lower(), 0)
+        if required and not channel_id:
+            Log.e(f'Config file does not contain a valid ID for "{channel_name}".')
+        return channel_id
+
+    @classmethod
+    def get_setting(cls, group: str, key: str, fallback_value: _SettingT) -> _SettingT:
+        # Settings are optional. Any that aren't configured will use the fallback value.
+        # Note: Most settings are only read once (on import), so they need a restart.
+        group_settings = cls._snapshot.settings.get(group, {})
+        return _get_value(group_settings, key, fallback_value, False)
 
     @classmethod
-    def get_channel_id(cls, channel_name: str, required: bool) -> int:
-        channel_ids = _get_value(cls._current_config, _CHANNEL_IDS_KEY, {}, True)
-        return _get_value(channel_ids, channel_name.lower(), 0, required)
+    async def watch_for_changes(
+        cls,
+        on_change: Callable[[ConfigSnapshot], Awaitable[None]],
+        poll_interval: float,
+    ) -> None:
+        """Polls the config file for changes, and reloads it whenever it's modified.
+
+        The file is read and validated in a separate thread, so the event loop is never
+        blocked while this is running. Changes to the server IDs are not supported, and
+        any new snapshot that contains one will be rejected. So will any file with an
+        invalid value, instead of using a fallback value for it like on startup. (Only
+        optional keys that are missing entirely use their fallback values.)
+
+        Args:
+            on_change:
+                A coroutine function that's awaited with each new snapshot right before
+                it replaces the current one. If it raises an exception, the new snapshot
+                is rejected, and the current one remains in place.
+            poll_interval:
+                The number of seconds to wait between each check for modifications.
+        """
+        file_signature = await to_thread(_get_config_file_signature)
+        while True:
+            await sleep(poll_interval)
+            if file_signature == (
+                new_file_signature := await to_thread(_get_config_file_signature)
+            ):
+                continue
+
+            file_signature = new_file_signature
+            if not file_signature:
+                Log.w("Config file was removed. Keeping the current config.")
+                continue
+
+            try:
+                # Reading and parsing the file both happen in the thread, off the loop.
+                # Unlike on startup, invalid values are rejected instead of replaced.
+                snapshot = await to_thread(
+                    lambda: _create_snapshot(_load_config_file(), strict=True)
+                )
+                if snapshot == cls._snapshot:
+                    Log.d("Config file was modified, but its values are unchanged.")
+                elif (snapshot.server_id != cls._snapshot.server_id) or (
+                    snapshot.guild_channel_ids.keys()
+                    != cls._snapshot.guild_channel_ids.keys()
+                ):
+                    Log.e("Server IDs can't be changed while the bot is running.")
+                else:
+                    await on_change(snapshot)
+                    cls._snapshot = snapshot
+                    Log.i("Reloaded the config file.")
+            except CancelledError:
+                raise
+            except Exception as error:
+                Log.e(
+                    f"Failed to reload the config file. ({error})"
+                    f"{Log.NEWLINE}Keeping the current config."
+                )
+
+
+def _load_config_file(create_if_missing: bool = False) -> dict[str, Any]:
+    return load_json_from_file(
+        filename=_CONFIG_FILENAME,
+        data_type=dict,
+        lowercase_dict_keys=True,
+        create_if_missing=create_if_missing,
+        default_data={
+            _SERVER_ID_KEY: _DUMMY_SERVER_OR_CHANNEL_ID,
+            _CHANNEL_IDS_KEY: {},
+        },
+    )
+
+
+def _get_config_file_signature() -> tuple[int, int] | None:
+    try:
+        file_stat = (DATA_PATH / f"{_CONFIG_FILENAME}.json").stat()
+    except OSError:
+        return None
+    return file_stat.st_mtime_ns, file_stat.st_size
+
+
+def _create_snapshot(config: dict[str, Any], strict: bool = False) -> ConfigSnapshot:
+    # If `strict`, invalid values raise a ValueError instead of using fallback values.
+    guilds = _get_value(config, _GUILDS_KEY, {}, False, strict)
+    guild_channel_ids = {}
+    for guild_key in guilds:
+        if not guild_key.isdecimal():
+            raise ValueError(f'"{guild_key}" is not a valid server ID.')
+        guild_config = _get_value(guilds, guild_key, {}, True, strict)
+        guild_channel_ids[int(guild_key)] = _create_channel_ids(guild_config, strict)
+
+    # With multiple guilds, the top-level server is optional. Otherwise, it's required.
+    server_id = _get_value(config, _SERVER_ID_KEY, 0, not guild_channel_ids, strict)
+    if server_id or not guild_channel_ids:
+        channel_ids = _create_channel_ids(config, strict)
+        if server_id:
+            guild_channel_ids = {server_id: channel_ids} | guild_channel_ids
+    else:
+        server_id, channel_ids = next(iter(guild_channel_ids.items()))
+
+    settings = _get_value(config, _SETTINGS_KEY, {}, False, strict)
+    return ConfigSnapshot(
+        server_id=server_id,
+        channel_ids=channel_ids,
+        guild_channel_ids=MappingProxyType(guild_channel_ids),
+        settings=MappingProxyType(
+            {
+                group: MappingProxyType(dict(group_settings))
+                for group in settings
+                if (group_settings := _get_value(settings, group, {}, True, strict))
+            }
+        ),
+    )
+
+
+def _create_channel_ids(
+    config: Mapping[str, Any], strict: bool = False
+) -> Mapping[str, int]:
+    channel_ids = _get_value(config, _CHANNEL_IDS_KEY, {}, True, strict)
+    return MappingProxyType(
+        {
+            name: channel_id
+            for name in channel_ids
+            if (channel_id := _get_value(channel_ids, name, 0, True, strict))
+        }
+    )
+
+
+@overload
+def _get_value(
+    source: Mapping[str, Any],
+    key: str,
+    fallback_value: bool,
+    required: bool,
+    strict: bool = False,
+) -> bool:
+    ...
 
 
 @overload
 def _get_value(
-    source: dict[str, Any],
+    source: Mapping[str, Any],
     key: str,
     fallback_value: str,
     required: bool,
+    strict: bool = False,
 ) -> str:
     ...
 
 
 @overload
 def _get_value(
-    source: dict[str, Any],
+    source: Mapping[str, Any],
     key: str,
     fallback_value: int,
     required: bool,
+    strict: bool = False,
 ) -> int:
     ...
 
 
 @overload
 def _get_value(
-    source: dict[str, Any],
+    source: Mapping[str, Any],
+    key: str,
+    fallback_value: float,
+    required: bool,
+    strict: bool = False,
+) -> float:
+    ...
+
+
+@overload
+def _get_value(
+    source: Mapping[str, Any],
     key: str,
     fallback_value: dict[str, Any],
     required: bool,
+    strict: bool = False,
 ) -> dict[str, Any]:
     ...
 
 
 def _get_value(
-    source: dict[str, Any],
+    source: Mapping[str, Any],
     key: str,
-    fallback_value: str | int | dict[str, Any],
+    fallback_value: str | int | float | dict[str, Any],
     required: bool,
-) -> str | int | dict[str, Any]:
-    if not isinstance(fallback_value, (str, int, dict)):
+    strict: bool = False,
+) -> str | int | float | dict[str, Any]:
+    if not isinstance(fallback_value, (str, int, float, dict)):
         raise TypeError(f'Unsupported config value type: "{type(fallback_value)}".')
 
     # Use `get()` to avoid raising a KeyError. Will be `None` if `key` is not found.
@@ -82,7 +280,10 @@ def _get_value(
         error_message = (
             f'Config file is missing {"required" if required else ""} key "{key}".'
         )
-    elif type(value) != type(fallback_value):
+    # Whole numbers are acceptable wherever a float is expected.
+    elif (type(value) != type(fallback_value)) and not (
+        isinstance(fallback_value, float) and (type(value) is int)
+    ):
         error_message = (
             f'Config file contains a value of the wrong type for key "{key}". '
             f'Expected type "{type(fallback_value)}", but found "{type(value)}".'
@@ -90,10 +291,18 @@ def _get_value(
     elif value == _DUMMY_SERVER_OR_CHANNEL_ID:
         error_message = f'Config file contains a dummy/unset value for key "{key}".'
     else:
-        Log.d(f'Successfully retrieved config value for key "{key}".')
+        Log.d('Successfully retrieved config value for key "%s".', key)
         return value
 
+    # When strict, only a missing optional value may be replaced by the fallback.
+    if strict and (required or (value is not None)):
+        raise ValueError(error_message)
+
     (Log.e if required else Log.d)(
-        f'{error_message}{Log.NEWLINE}Using fallback value: "{fallback_value}"'
+        '%s%sUsing fallback value: "%s"', error_message, Log.NEWLINE, fallback_value
     )
     return fallback_value
+
+
+# The initial config is loaded on import, since most modules depend on its values.
+BotConfig._snapshot = _create_snapshot(_load_config_file(create_if_missing=True))
@@ -0,0 +1,92 @@
+from asyncio import Semaphore, get_running_loop
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from enum import Enum
+from typing import Any, Final, TypeVar
+
+from qibot.utils.logging import Log
+
+_T = TypeVar("_T")
+
+
+class ExecutorMode(Enum):
+    INLINE = "inline"
+    THREAD = "thread"
+    PROCESS = "process"
+
+    @classmethod
+    def from_name(cls, name: str) -> "ExecutorMode":
+        try:
+            return cls(name.lower())
+        except ValueError:
+            Log.e(f'Unknown executor mode "{name}". Using "thread" instead.')
+            return cls.THREAD
+
+
+class ExecutorQueueFull(RuntimeError):
+    pass
+
+
+class BoundedExecutor:
+    """Runs blocking functions away from the event loop, with bounded concurrency.
+
+    At most `max_workers` tasks will run at once. Up to `max_queued` more tasks may wait
+    for a free worker, and any tasks submitted beyond that will immediately raise an
+    `ExecutorQueueFull` error so that callers can fall back to something cheaper.
+
+    In `PROCESS` mode, the function and all of its args must be picklable. In `INLINE`
+    mode, tasks are run directly on the event loop (which is mainly useful to measure
+    the impact of the other modes).
+    """
+
+    def __init__(
+        self, name: str, mode: ExecutorMode, max_workers: int, max_queued: int
+    ) -> None:
+        self.name: Final[str] = name
+        self.mode: Final[ExecutorMode] = mode
+        self._max_workers: Final[int] = max(max_workers, 1)
+        self._max_pending: Final[int] = self._max_workers + max(max_queued, 0)
+        self._worker_slots: Final[Semaphore] = Semaphore(self._max_workers)
+        self._executor: Executor | None = None  # Created on demand.
+        self._pending_count: int = 0
+
+    @property
+    def pending_count(self) -> int:
+        return self._pending_count
+
+    async def run(self, func: Callable[..., _T], *args: Any) -> _T:
+        if self._pending_count >= self._max_pending:
+            raise ExecutorQueueFull(
+                f'Executor "{self.name}" is already handling {self._pending_count} '
+                f"tasks, and cannot accept any more right now."
+            )
+
+        self._pending_count += 1
+        try:
+            async with self._worker_slots:
+                if self.mode is ExecutorMode.INLINE:
+                    return func(*args)
+                executor = self._get_executor()
+                return await get_running_loop().run_in_executor(executor, func, *args)
+        finally:
+            self._pending_count -= 1
+
+    def shutdown(self) -> None:
+        if self._executor:
+            Log.d(f'Shutting down "{self.name}" executor.')
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self) -> Executor:
+        if not self._executor:
+            Log.d(
+                f'Starting "{self.name}" executor in {self.mode.value} mode '
+                f"with {self._max_workers} worker(s)."
+            )
+            if self.mode is ExecutorMode.PROCESS:
+                self._executor = ProcessPoolExecutor(max_workers=self._max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_workers, thread_name_prefix=self.name
+                )
+        return self._executor
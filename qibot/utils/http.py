@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import re
+from collections import OrderedDict
+from collections.abc import Mapping
+from time import monotonic
+from typing import Final, NamedTuple
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, TraceConfig, hdrs
+
+from qibot.utils.config import BotConfig
+from qibot.utils.logging import Log
+
+_HTTP_SETTINGS: Final[str] = "http"
+
+_MAX_AGE_PATTERN: Final[re.Pattern] = re.compile(r"max-age=(\d+)")
+_UNCACHEABLE_DIRECTIVES: Final[tuple[str, ...]] = ("no-store", "private")
+
+
+class _CachedResponse(NamedTuple):
+    content: bytes
+    etag: str | None
+    last_modified: str | None
+    fresh_until: float
+
+
+class HttpClient:
+    """Manages the HTTP session that's shared by everything outside of discord.py.
+
+    The session is created on first use (so it's always created within the event loop)
+    and should be closed along with the bot. Its connection pool, timeouts, and DNS
+    cache are configured by the "http" settings.
+
+    If `max_cached_responses` is positive, `get_content()` keeps the most recent
+    responses in memory. Cached responses are reused without a request while they're
+    fresh (according to `Cache-Control: max-age`), and are revalidated with their
+    `ETag` and/or `Last-Modified` headers after that, so unchanged content costs a 304.
+    """
+
+    def __init__(
+        self,
+        max_connections: int,
+        max_connections_per_host: int,
+        keepalive_timeout: float,
+        total_timeout: float,
+        connect_timeout: float,
+        dns_cache_ttl: int,
+        max_cached_responses: int,
+    ) -> None:
+        self._max_connections: Final[int] = max_connections
+        self._max_connections_per_host: Final[int] = max_connections_per_host
+        self._keepalive_timeout: Final[float] = keepalive_timeout
+        self._timeout: Final[ClientTimeout] = ClientTimeout(
+            total=total_timeout or None, connect=connect_timeout or None
+        )
+        self._dns_cache_ttl: Final[int] = dns_cache_ttl
+        self._max_cached_responses: Final[int] = max(max_cached_responses, 0)
+
+        self._trace_configs: Final[list[TraceConfig]] = []
+        self._responses: Final[OrderedDict[str, _CachedResponse]] = OrderedDict()
+        self._session: ClientSession | None = None  # Created on demand.
+
+    @property
+    def session(self) -> ClientSession:
+        if not self._session or self._session.closed:
+            connector = TCPConnector(
+                limit=self._max_connections,
+                limit_per_host=self._max_connections_per_host,
+                keepalive_timeout=self._keepalive_timeout,
+                ttl_dns_cache=self._dns_cache_ttl or None,
+                use_dns_cache=self._dns_cache_ttl > 0,
+            )
+            self._session = ClientSession(
+                connector=connector,
+                timeout=self._timeout,
+                trace_configs=self._trace_configs,
+            )
+        return self._session
+
+    def add_trace_config(self, trace_config: TraceConfig) -> None:
+        if self._session:
+            raise RuntimeError("Trace configs must be added before the session exists.")
+        self._trace_configs.append(trace_config)
+
+    async def get_content(self, url: str) -> bytes:
+        cached_response = self._responses.get(url)
+        if cached_response and (cached_response.fresh_until > monotonic()):
+            self._responses.move_to_end(url)
+            return cached_response.content
+
+        request_headers = {}
+        if cached_response and cached_response.etag:
+            request_headers[hdrs.IF_NONE_MATCH] = cached_response.etag
+        if cached_response and cached_response.last_modified:
+            request_headers[hdrs.IF_MODIFIED_SINCE] = cached_response.last_modified
+
+        async with self.session.get(url, headers=request_headers) as response:
+            if cached_response and (response.status == 304):
+                Log.d("Revalidated cached response for %s.", url)
+                content = cached_response.content
+            else:
+                content = await response.read()
+            if response.status in (200, 304):
+                self._cache_response(url, content, response.headers, cached_response)
+            return content
+
+    async def close(self) -> None:
+        if self._session:
+            await self._session.close()
+            self._session = None
+        self._responses.clear()
+
+    def _cache_response(
+        self,
+        url: str,
+        content: bytes,
+        headers: Mapping[str, str],
+        previous_response: _CachedResponse | None,
+    ) -> None:
+        if not self._max_cached_responses:
+            return
+
+        cache_control = headers.get(hdrs.CACHE_CONTROL, "").lower()
+        if any(directive in cache_control for directive in _UNCACHEABLE_DIRECTIVES):
+            self._responses.pop(url, None)
+            return
+
+        # A 304 response may omit the validators, so fall back to the previous ones.
+        etag = headers.get(hdrs.ETAG) or (previous_response and previous_response.etag)
+        last_modified = headers.get(hdrs.LAST_MODIFIED) or (
+            previous_response and previous_response.last_modified
+        )
+        max_age_match = _MAX_AGE_PATTERN.search(cache_control)
+
+        if not (etag or last_modified or max_age_match):
+            return  # There's no way to tell whether the content is still valid.
+
+        max_age = int(max_age_match.group(1)) if max_age_match else 0
+        if "no-cache" in cache_control:
+            max_age = 0  # The response may be stored, but must always be revalidated.
+
+        self._responses[url] = _CachedResponse(
+            content, etag, last_modified, monotonic() + max_age
+        )
+        self._responses.move_to_end(url)
+        while len(self._responses) > self._max_cached_responses:
+            self._responses.popitem(last=False)
+
+
+HTTP_CLIENT: Final[HttpClient] = HttpClient(
+    max_connections=BotConfig.get_setting(_HTTP_SETTINGS, "max_connections", 100),
+    max_connections_per_host=BotConfig.get_setting(
+        _HTTP_SETTINGS, "max_connections_per_host", 10
+    ),
+    keepalive_timeout=BotConfig.get_setting(
+        _HTTP_SETTINGS, "keepalive_timeout_seconds", 30.0
+    ),
+    total_timeout=BotConfig.get_setting(_HTTP_SETTINGS, "total_timeout_seconds", 30.0),
+    connect_timeout=BotConfig.get_setting(
+        _HTTP_SETTINGS, "connect_timeout_seconds", 10.0
+    ),
+    dns_cache_ttl=BotConfig.get_setting(_HTTP_SETTINGS, "dns_cache_ttl_seconds", 300),
+    max_cached_responses=BotConfig.get_setting(
+        _HTTP_SETTINGS, "max_cached_responses", 128
+    ),
+)
+
+
+async def load_content_from_url(url: str) -> bytes:
+    return await HTTP_CLIENT.get_content(url)
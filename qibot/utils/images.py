@@ -2,86 +2,233 @@ from __future__ import annotations
 
 from io import BytesIO
 from pathlib import Path
-from typing import Final, Literal, TypeAlias
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Final, Literal, NamedTuple, TypeAlias
 
 from discord import Asset, File, Member
-from PIL.Image import Image
-from PIL.Image import new as new_image
-from PIL.Image import open as open_image
-from PIL.ImageDraw import Draw
 
-from qibot.utils.misc import load_content_from_url
+from qibot.assets import CACHE_PATH
+from qibot.utils.cache import CacheStats, TieredCache
+from qibot.utils.config import BotConfig
+from qibot.utils.executors import BoundedExecutor, ExecutorMode, ExecutorQueueFull
+from qibot.utils.http import load_content_from_url
+from qibot.utils.logging import Log
+from qibot.utils.metrics import METRICS
 from qibot.utils.templates import Template
 
+if TYPE_CHECKING:
+    # Pillow is slow to import, so it's only loaded once an image is actually edited.
+    from PIL.Image import Image
+
+    from qibot.utils.rendering import ImageData, ImageOperation, StageTimings
+
 _ImageSource: TypeAlias = str | Asset
 
-_COLOR_BLACK: Final[int] = 0
-_COLOR_WHITE: Final[int] = 1
 
-_AVATAR_SIZE_MAX: Final[int] = 512
+class ImageEncoder(NamedTuple):
+    format: str
+    save_options: dict[str, Any]
+
+    @property
+    def extension(self) -> str:
+        return self.format.lower()
+
+
+_ENCODERS: Final[dict[str, ImageEncoder]] = {
+    "png": ImageEncoder("png", {"optimize": True}),
+    "webp": ImageEncoder("webp", {"quality": 90, "method": 4}),
+    "webp_lossless": ImageEncoder("webp", {"lossless": True, "method": 4}),
+}
+
+# Discord's CDN only serves sizes that are powers of 2 within this range.
+_CDN_SIZE_MIN: Final[int] = 16
+_CDN_SIZE_MAX: Final[int] = 4096
+_CDN_SOURCE_FORMAT: Final[Literal["png"]] = "png"
+
 _AVATAR_SIZE_DEFAULT: Final[int] = 64
 
-_IMAGE_FORMAT: Final[Literal["png"]] = "png"
+_IMAGE_SETTINGS: Final[str] = "image_processing"
+_AVATAR_CACHE_SETTINGS: Final[str] = "avatar_cache"
+
+
+def _get_configured_encoder() -> ImageEncoder:
+    encoder_name = BotConfig.get_setting(_IMAGE_SETTINGS, "encoder", "png").lower()
+    if encoder_name not in _ENCODERS:
+        Log.e(f'Unknown image encoder "{encoder_name}". Using "png" instead.')
+        encoder_name = "png"
+    return _ENCODERS[encoder_name]
+
 
-_FILENAME_TEMPLATE: Final[Template] = Template(f"$name.{_IMAGE_FORMAT}")
-_FILENAME_DEFAULT: Final[str] = _FILENAME_TEMPLATE.sub(name="image")
+_IMAGE_ENCODER: Final[ImageEncoder] = _get_configured_encoder()
+
+_FILENAME_TEMPLATE: Final[Template] = Template("$name.$extension")
+_FILENAME_DEFAULT_NAME: Final[str] = "image"
+
+_AVATAR_CACHE_KEY: Final[Template] = Template("${hash}-${size}px-${crop}")
+
+_AVATAR_CACHE: Final[TieredCache] = TieredCache(
+    max_memory_entries=BotConfig.get_setting(
+        _AVATAR_CACHE_SETTINGS, "max_memory_entries", 256
+    ),
+    disk_path=CACHE_PATH / "avatars",
+    max_disk_entries=BotConfig.get_setting(
+        _AVATAR_CACHE_SETTINGS, "max_disk_entries", 0
+    ),
+    file_suffix=f".{_IMAGE_ENCODER.extension}",
+)
+
+_IMAGE_EXECUTOR: Final[BoundedExecutor] = BoundedExecutor(
+    name="image_processing",
+    mode=ExecutorMode.from_name(
+        BotConfig.get_setting(_IMAGE_SETTINGS, "executor", "thread")
+    ),
+    max_workers=BotConfig.get_setting(_IMAGE_SETTINGS, "max_workers", 2),
+    max_queued=BotConfig.get_setting(_IMAGE_SETTINGS, "max_queued", 64),
+)
 
 
 async def get_member_avatar_file(
-    member: Member, size: int = _AVATAR_SIZE_DEFAULT, circle_crop: bool = True
-) -> File:
-    image_wrapper = await ImageWrapper.create_from(
+    member: Member,
+    size: int = _AVATAR_SIZE_DEFAULT,
+    circle_crop: bool = True,
+    name: str = "avatar",
+) -> File | str:
+    avatar = member.display_avatar
+    cache_key = _AVATAR_CACHE_KEY.sub(
+        hash=avatar.key, size=size, crop="circle" if circle_crop else "square"
+    )
+
+    if (image_data := await _AVATAR_CACHE.get(cache_key)) is None:
         # Note: "with_size" must be called with an integer that is a power of 2.
-        member.display_avatar.with_size(_AVATAR_SIZE_MAX).with_format(_IMAGE_FORMAT)
+        avatar = avatar.with_size(get_cdn_size(size))
+
+        start_time = perf_counter()
+        image_wrapper = await ImageWrapper.create_from(
+            avatar.with_format(_CDN_SOURCE_FORMAT)
+        )
+        fetch_time = perf_counter() - start_time
+        METRICS.observe("stage_seconds", fetch_time, stage="avatar_fetch")
+
+        # Resize first, so the crop mask is applied (and cached) at the final size.
+        image_wrapper.resize(size)
+        if circle_crop:
+            image_wrapper.circle_crop()
+
+        try:
+            image_data = await image_wrapper.write_to_bytes()
+        except ExecutorQueueFull as error:
+            # Let Discord display the unprocessed avatar rather than falling behind.
+            METRICS.increment("image_processing_skipped_total")
+            Log.w(f"Skipped processing avatar image {cache_key}. ({error})")
+            return avatar.url
+
+        METRICS.observe(
+            "stage_seconds",
+            sum(image_wrapper.timings.values()),
+            stage="image_processing",
+        )
+        await _AVATAR_CACHE.put(cache_key, image_data)
+        timings = {"fetch": fetch_time} | image_wrapper.timings
+        Log.d(
+            "Cached avatar image %s (%d bytes) in %s.%s%s",
+            cache_key,
+            len(image_data),
+            lambda: _format_timings(timings),
+            Log.NEWLINE,
+            get_avatar_cache_stats,
+        )
+
+    filename = _FILENAME_TEMPLATE.sub(name=name, extension=_IMAGE_ENCODER.extension)
+    return File(fp=BytesIO(image_data), filename=filename)
+
+
+def get_avatar_cache_stats() -> CacheStats:
+    return _AVATAR_CACHE.stats
+
+
+def get_cdn_size(size: int) -> int:
+    cdn_size = _CDN_SIZE_MIN
+    while (cdn_size < size) and (cdn_size < _CDN_SIZE_MAX):
+        cdn_size *= 2
+    return cdn_size
+
+
+def shutdown_image_executor() -> None:
+    _IMAGE_EXECUTOR.shutdown()
+
+
+def _format_timings(timings: StageTimings) -> str:
+    return ", ".join(
+        f"{stage} {seconds * 1000:.1f}ms" for stage, seconds in timings.items()
     )
-    if circle_crop:
-        image_wrapper.circle_crop()
-    return image_wrapper.resize(size).write_to_file(name="avatar")
 
 
 class ImageWrapper:
-    def __init__(self, image: Image) -> None:
-        self._image = image
+    """Records a pipeline of image edits and runs it away from the event loop.
+
+    Decoding, editing, and encoding are all deferred until the image is written, and
+    are then performed in a single task on the image executor (as configured by the
+    "image_processing" settings). Only fetching the source data happens on the loop.
+    """
+
+    def __init__(
+        self, source: ImageData, executor: BoundedExecutor | None = None
+    ) -> None:
+        self._source: Final[ImageData] = source
+        self._executor: Final[BoundedExecutor] = executor or _IMAGE_EXECUTOR
+        self._operations: Final[list[ImageOperation]] = []
+        self.timings: StageTimings = {}  # Populated after the image is written.
 
     @staticmethod
     async def _get_image_data(source: _ImageSource) -> str | bytes:
-        if isinstance(source, str):
-            if Path(source).is_file():
-                return source
-            return await load_content_from_url(source)
-        elif isinstance(source, Asset):
-            return await source.read()
-        else:
-            raise TypeError(
-                f'Cannot create image from object of type "{type(source)}". ({source})'
-            )
+        if isinstance(source, str) and Path(source).is_file():
+            return source
+        # Assets are fetched with the shared HTTP client too, to use its response cache.
+        url = source if isinstance(source, str) else source.url
+        return await load_content_from_url(url)
 
     @classmethod
-    async def create_from(cls, source: Image | _ImageSource) -> ImageWrapper:
+    async def create_from(
+        cls, source: Image | _ImageSource, executor: BoundedExecutor | None = None
+    ) -> ImageWrapper:
+        if isinstance(source, (str, Asset)):
+            return cls(await cls._get_image_data(source), executor)
+
+        from PIL.Image import Image
+
         if isinstance(source, Image):
             # Edits will be applied to a copy, in case the original is used elsewhere.
-            image = source.copy()
-        else:
-            data = await cls._get_image_data(source)
-            image = open_image(data if isinstance(data, str) else BytesIO(data))
-        return cls(image)
-
-    def write_to_file(self, name: str = "") -> File:
-        filename = _FILENAME_TEMPLATE.sub(name=name) if name else _FILENAME_DEFAULT
-        with BytesIO() as image_bytes:
-            self._image.save(fp=image_bytes, format=_IMAGE_FORMAT)
-            image_bytes.seek(0)
-            return File(fp=image_bytes, filename=filename)
+            return cls(source.copy(), executor)
+        raise TypeError(
+            f'Cannot create image from object of type "{type(source)}". ({source})'
+        )
+
+    async def write_to_bytes(self, encoder: ImageEncoder | None = None) -> bytes:
+        from qibot.utils.rendering import render_image
+
+        image_data, self.timings = await self._executor.run(
+            render_image,
+            self._source,
+            tuple(self._operations),
+            encoder or _IMAGE_ENCODER,
+        )
+        return image_data
+
+    async def write_to_file(
+        self, name: str = "", encoder: ImageEncoder | None = None
+    ) -> File:
+        encoder = encoder or _IMAGE_ENCODER
+        filename = _FILENAME_TEMPLATE.sub(
+            name=name or _FILENAME_DEFAULT_NAME, extension=encoder.extension
+        )
+        return File(fp=BytesIO(await self.write_to_bytes(encoder)), filename=filename)
 
     def circle_crop(self) -> ImageWrapper:
-        mask = new_image(mode="1", size=self._image.size, color=_COLOR_BLACK)
-        circle_size = (self._image.width - 2, self._image.height - 2)
-        Draw(mask).ellipse(xy=(0, 0, *circle_size), fill=_COLOR_WHITE)
-        self._image.putalpha(mask)
+        self._operations.append(("circle_crop", ()))
         return self
 
     def resize(self, size: int | tuple[int, int]) -> ImageWrapper:
         if isinstance(size, int):
             size = (size, size)
-        self._image = self._image.resize(size)
+        self._operations.append(("resize", (size,)))
         return self
@@ -1,8 +1,8 @@
 import json
+import marshal
+from glob import escape
 from pathlib import Path
-from typing import Any, Final, overload
-
-import json5
+from typing import Any, Final, TypeAlias, overload
 
 from qibot.assets import DATA_PATH
 from qibot.utils.logging import Log
@@ -12,6 +12,12 @@ _ENCODING: Final[str] = "utf-8"
 _INDENT_SPACES: Final[int] = 2
 
 _JSON_FILENAME: Final[Template] = Template("${filename}.json")
+_SNAPSHOT_FILENAME: Final[Template] = Template("${filename}.json.${variant}.snapshot")
+
+# Increment this whenever the snapshot format (or the way it's sanitized) changes.
+_SNAPSHOT_VERSION: Final[int] = 1
+
+_SnapshotKey: TypeAlias = tuple[int, str, int, int, str, bool]
 
 
 @overload
@@ -22,6 +28,7 @@ def load_json_from_file(
     lowercase_dict_keys: bool = False,
     create_if_missing: bool = False,
     default_data: dict[str, Any] | None = None,
+    use_snapshot: bool = True,
 ) -> dict[str, Any]:
     ...
 
@@ -34,6 +41,7 @@ def load_json_from_file(
     lowercase_dict_keys: bool = False,
     create_if_missing: bool = False,
     default_data: list[Any] | None = None,
+    use_snapshot: bool = True,
 ) -> list[Any]:
     ...
 
@@ -45,6 +53,7 @@ def load_json_from_file(
     lowercase_dict_keys: bool = False,
     create_if_missing: bool = False,
     default_data: dict[str, Any] | list[Any] | None = None,
+    use_snapshot: bool = True,
 ) -> dict[str, Any] | list[Any]:
     """Returns the contents of a JSON file parsed as a Python object.
 
@@ -52,6 +61,12 @@ def load_json_from_file(
     requested type. If the source file is nonexistent, empty, or otherwise invalid, this
     will simply be an empty object.
 
+    The parsed and sanitized contents of each valid file are saved to a binary snapshot
+    next to it (unless `use_snapshot` is `False`), with a separate snapshot for each
+    combination of `data_type` and `lowercase_dict_keys`. As long as the source file's
+    path, modification time, and size remain the same, subsequent calls with the same
+    options will load that snapshot instead of parsing the JSON.
+
     Args:
         filename:
             The name of the file, without the `.json` extension.
@@ -70,6 +85,10 @@ def load_json_from_file(
             then it will be initialized with this data. Must match the type specified by
             `data_type`. If omitted, defaults to an empty object of type `data_type`.
             Ignored if `create_if_missing` is `False`.
+        use_snapshot:
+            If `False`, the file is always parsed, and no snapshot of it is saved (any
+            existing one is deleted). Should be used for files that contain secrets, so
+            that they aren't copied. Defaults to `True`.
 
     Returns:
         An object of the specified `data_type`.
@@ -121,6 +140,9 @@ def load_json_from_file(
                 return json.loads(file_content)
             except json.decoder.JSONDecodeError:
                 # The json5 module is much slower, but is more lenient about formatting.
+                # It's only imported if it's needed, since it's also slow to import.
+                import json5
+
                 return json5.loads(file_content)
 
         # If we haven't returned anything by this point, the file contents are invalid.
@@ -138,5 +160,88 @@ def load_json_from_file(
                 Log.w(f'Ignoring non-string key "{key}" in file "{file_path}".')
         return sanitized_data
 
-    data = (is_valid_file_path() and get_json_from_file()) or empty_data
-    return data if isinstance(data, list) else sanitize_dict(data)
+    def sanitize_data(
+        raw_data: dict[Any, Any] | list[Any] | None
+    ) -> dict[str, Any] | list[Any] | None:
+        if isinstance(raw_data, dict):
+            return sanitize_dict(raw_data)
+        return raw_data
+
+    if not is_valid_file_path():
+        return empty_data
+
+    if not use_snapshot:
+        snapshot_pattern = _SNAPSHOT_FILENAME.sub(
+            filename=escape(filename), variant="*"
+        )
+        for snapshot_path in DATA_PATH.glob(snapshot_pattern):
+            snapshot_path.unlink(missing_ok=True)
+        return sanitize_data(get_json_from_file()) or empty_data
+
+    snapshot_path = _get_snapshot_path(filename, data_type, lowercase_dict_keys)
+
+    file_stat = file_path.stat()
+    snapshot_key: _SnapshotKey = (
+        _SNAPSHOT_VERSION,
+        str(file_path.resolve()),
+        file_stat.st_mtime_ns,
+        file_stat.st_size,
+        data_type.__name__,
+        lowercase_dict_keys,
+    )
+
+    if (data := _load_snapshot(snapshot_path, snapshot_key)) is not None:
+        Log.d(f'Loaded "{file_path}" from its snapshot.')
+        return data
+
+    if not (data := sanitize_data(get_json_from_file())):
+        return empty_data
+
+    _save_snapshot(snapshot_path, snapshot_key, data)
+    return data
+
+
+def save_json_to_file(filename: str, data: dict[str, Any] | list[Any]) -> None:
+    file_path = DATA_PATH / _JSON_FILENAME.sub(filename=filename)
+    # Write to a temporary file first, so that a partial file is never loaded.
+    temp_path = file_path.with_name(f"{file_path.name}.tmp")
+    temp_path.write_text(json.dumps(data, indent=_INDENT_SPACES), encoding=_ENCODING)
+    temp_path.replace(file_path)
+
+
+def _get_snapshot_path(
+    filename: str, data_type: type[dict | list], lowercase_dict_keys: bool
+) -> Path:
+    # Each way of loading a file sanitizes it differently, so each needs its own file.
+    variant = data_type.__name__
+    if lowercase_dict_keys and (data_type is dict):
+        variant += "-lowercase"
+    return DATA_PATH / _SNAPSHOT_FILENAME.sub(filename=filename, variant=variant)
+
+
+def _load_snapshot(
+    snapshot_path: Path, snapshot_key: _SnapshotKey
+) -> dict[str, Any] | list[Any] | None:
+    try:
+        saved_key, data = marshal.loads(snapshot_path.read_bytes())
+    except FileNotFoundError:
+        return None
+    except (EOFError, OSError, TypeError, ValueError):
+        Log.w(f'Ignoring unreadable snapshot "{snapshot_path}".')
+        return None
+    return data if (saved_key == snapshot_key) else None
+
+
+def _save_snapshot(
+    snapshot_path: Path, snapshot_key: _SnapshotKey, data: dict[str, Any] | list[Any]
+) -> None:
+    # Write to a temporary file first, so that a partial snapshot is never loaded.
+    temp_path = snapshot_path.with_name(f"{snapshot_path.name}.tmp")
+    try:
+        temp_path.write_bytes(marshal.dumps((snapshot_key, data)))
+        temp_path.replace(snapshot_path)
+    except (OSError, ValueError) as error:
+        # The data may contain values that can't be marshalled, or the directory may
+        # be read-only. Either way, the snapshot is only an optimization.
+        Log.w(f'Could not save snapshot "{snapshot_path}". ({error})')
+        temp_path.unlink(missing_ok=True)
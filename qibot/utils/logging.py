@@ -1,9 +1,11 @@
+import atexit
+import json
 import logging
 import sys
-from collections.abc import Callable
-from typing import Final, TypeAlias
-
-_LogMethod: TypeAlias = Callable[[str], None]
+from copy import copy
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from typing import Any, Final, Protocol
 
 _ROOT_LOGGER: Final[logging.Logger] = logging.getLogger()
 _EXTERNAL_LOGGER_NAMES: Final[list[str]] = ["discord", "PIL"]
@@ -15,33 +17,123 @@ _LOG_LEVEL_ALIASES: Final[dict[str, int]] = {
     "e": logging.ERROR,
 }
 
+_TEXT_FORMAT: Final[str] = "{asctime} | {levelname[0]} | {message}"
+_DATE_FORMAT: Final[str] = "%Y-%m-%d %H:%M:%S"
+
+# Name of the `LogRecord` attribute that holds the structured fields of an event.
+_FIELDS_ATTR: Final[str] = "qibot_fields"
+
+_TRACEBACK_FORMATTER: Final[logging.Formatter] = logging.Formatter()
+
+
+class _LogMethod(Protocol):
+    def __call__(self, message: str, *args: Any, **fields: Any) -> None:
+        ...
+
+
+def _create_log_method(level: int) -> _LogMethod:
+    def log(message: str, *args: Any, **fields: Any) -> None:
+        # Nothing is formatted (or computed) unless the message will actually be logged.
+        if _ROOT_LOGGER.isEnabledFor(level):
+            _ROOT_LOGGER.log(
+                level,
+                message,
+                *(arg() if callable(arg) else arg for arg in args),
+                extra={_FIELDS_ATTR: fields},
+                stacklevel=2,
+            )
+
+    return log
+
 
 class Log:
+    """Logs messages through the root logger.
+
+    Messages may contain `%`-style placeholders, which are only filled in (from the
+    positional args) if the message is going to be logged. Args that are callables are
+    only called in that case too, so they can defer expensive work. Keyword args are
+    structured fields (e.g. `member_id`), which are included in JSON-lines output.
+    """
+
     NEWLINE: Final[str] = "\n                          "
 
-    d: Final[_LogMethod] = _ROOT_LOGGER.debug
-    i: Final[_LogMethod] = _ROOT_LOGGER.info
-    w: Final[_LogMethod] = _ROOT_LOGGER.warning
-    e: Final[_LogMethod] = _ROOT_LOGGER.error
+    d: Final[_LogMethod] = _create_log_method(logging.DEBUG)
+    i: Final[_LogMethod] = _create_log_method(logging.INFO)
+    w: Final[_LogMethod] = _create_log_method(logging.WARNING)
+    e: Final[_LogMethod] = _create_log_method(logging.ERROR)
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The message and traceback are formatted on the thread that logged them, since
+        # the args and frames may change (or be freed) later. The traceback is kept in
+        # `exc_text`, so that each output format can decide where to put it.
+        record = copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = _TRACEBACK_FORMATTER.formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+class _JsonLinesFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, _DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        entry |= getattr(record, _FIELDS_ATTR, None) or {}
+        return json.dumps(entry, ensure_ascii=False, default=str)
 
 
 def initialize_logging(
     log_level: str | int = logging.DEBUG,
     external_log_level: str | int = logging.WARNING,
+    json_lines: bool = False,
+    queued: bool = True,
 ) -> None:
+    """Configures the root logger to write to stdout.
+
+    Args:
+        log_level: The lowest level of messages to log from the bot itself.
+        external_log_level: The lowest level of messages to log from dependencies.
+        json_lines: Whether to write each message as a JSON object instead of text.
+        queued: Whether to write from a background thread, so that slow output never
+            blocks the event loop. Messages are queued (and formatted) on the thread
+            that logged them, and the queue is flushed when the process exits.
+    """
+    if _ROOT_LOGGER.handlers:
+        return  # Logging has already been configured.
+
     if isinstance(log_level, str):
         if log_level in _LOG_LEVEL_ALIASES:
             log_level = _LOG_LEVEL_ALIASES[log_level]
         else:
             log_level = log_level.upper()
 
-    logging.basicConfig(
-        level=log_level,
-        style="{",
-        format="{asctime} | {levelname[0]} | {message}",
-        datefmt="%Y-%m-%d %H:%M:%S",
-        stream=sys.stdout,
+    output_handler = logging.StreamHandler(sys.stdout)
+    output_handler.setFormatter(
+        _JsonLinesFormatter()
+        if json_lines
+        else logging.Formatter(_TEXT_FORMAT, _DATE_FORMAT, style="{")
     )
 
+    if queued:
+        log_queue: SimpleQueue = SimpleQueue()
+        listener = QueueListener(log_queue, output_handler)
+        listener.start()
+        atexit.register(listener.stop)
+        handler: logging.Handler = _QueueHandler(log_queue)
+    else:
+        handler = output_handler
+
+    logging.basicConfig(level=log_level, handlers=[handler])
+
     for logger_name in _EXTERNAL_LOGGER_NAMES:
         logging.getLogger(logger_name).setLevel(external_log_level)
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import os
+from asyncio import sleep, to_thread
+from bisect import bisect_left
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from time import perf_counter
+from typing import Final, NamedTuple, TypeAlias
+
+from qibot.assets import DATA_PATH
+from qibot.utils.config import BotConfig
+from qibot.utils.logging import Log
+
+_METRICS_SETTINGS: Final[str] = "metrics"
+_METRIC_NAME_PREFIX: Final[str] = "qibot_"
+
+# Upper bounds (in seconds) of the histogram buckets, growing by ~1.5x per bucket.
+_BUCKET_BOUNDS: Final[tuple[float, ...]] = tuple(
+    round(0.0005 * (1.5**exponent), 6) for exponent in range(30)
+)
+
+_Labels: TypeAlias = tuple[tuple[str, str], ...]
+_MetricKey: TypeAlias = tuple[str, _Labels]
+
+
+class EventContext(NamedTuple):
+    listener: str
+    started_at: float  # As returned by `perf_counter()`.
+
+
+# Identifies the gateway event (if any) that led to the code that's currently running.
+_CURRENT_EVENT: Final[ContextVar[EventContext | None]] = ContextVar(
+    "current_event", default=None
+)
+
+
+class Histogram:
+    """Counts observed durations in fixed, exponentially-sized buckets.
+
+    Observing a value is just a binary search and an increment, so it's cheap enough to
+    do on every event. Percentiles are estimated by interpolating within the bucket that
+    contains them, which is accurate to within the width of that bucket.
+    """
+
+    def __init__(self) -> None:
+        self._bucket_counts: Final[list[int]] = [0] * (len(_BUCKET_BOUNDS) + 1)
+        self.count: int = 0
+        self.sum: float = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self._bucket_counts[bisect_left(_BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def get_percentile(self, fraction: float) -> float:
+        if not self.count:
+            return 0.0
+
+        target_count = fraction * self.count
+        cumulative_count = 0
+        for index, bucket_count in enumerate(self._bucket_counts):
+            if bucket_count and (cumulative_count + bucket_count >= target_count):
+                lower_bound = _BUCKET_BOUNDS[index - 1] if index else 0.0
+                upper_bound = _BUCKET_BOUNDS[min(index, len(_BUCKET_BOUNDS) - 1)]
+                position = (target_count - cumulative_count) / bucket_count
+                return lower_bound + (upper_bound - lower_bound) * position
+            cumulative_count += bucket_count
+        return _BUCKET_BOUNDS[-1]
+
+    def get_cumulative_counts(self) -> Iterator[tuple[str, int]]:
+        cumulative_count = 0
+        for bound, bucket_count in zip(_BUCKET_BOUNDS, self._bucket_counts):
+            cumulative_count += bucket_count
+            yield f"{bound:g}", cumulative_count
+        yield "+Inf", self.count
+
+
+class MetricsRegistry:
+    """Keeps the bot's latency histograms and error counters, and exports them.
+
+    Metrics are identified by a name and a set of labels (e.g. `listener="join"`). The
+    exposition file uses Prometheus' text format, so it can be scraped by any tool that
+    understands it (or just read by a human).
+    """
+
+    def __init__(self, exposition_path: Path | None) -> None:
+        self._exposition_path: Final[Path | None] = exposition_path
+        self._histograms: Final[dict[_MetricKey, Histogram]] = {}
+        self._counters: Final[dict[_MetricKey, int]] = {}
+
+    @property
+    def histograms(self) -> dict[_MetricKey, Histogram]:
+        return self._histograms
+
+    @property
+    def counters(self) -> dict[_MetricKey, int]:
+        return self._counters
+
+    @staticmethod
+    def get_current_event() -> EventContext | None:
+        return _CURRENT_EVENT.get()
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        key = (name, tuple(labels.items()))
+        if not (histogram := self._histograms.get(key)):
+            histogram = self._histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+    def increment(self, name: str, amount: int = 1, **labels: str) -> None:
+        key = (name, tuple(labels.items()))
+        self._counters[key] = self._counters.get(key, 0) + amount
+
+    @contextmanager
+    def time(self, name: str, **labels: str) -> Iterator[None]:
+        start_time = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, perf_counter() - start_time, **labels)
+
+    @contextmanager
+    def track_event(
+        self, listener: str, received_at: float | None = None
+    ) -> Iterator[None]:
+        # Anything sent as a result of this event can report its end-to-end latency.
+        # If the event waited before being handled, `received_at` includes that wait.
+        start_time = perf_counter()
+        token = _CURRENT_EVENT.set(EventContext(listener, received_at or start_time))
+        try:
+            yield
+        except Exception:
+            self.increment("listener_errors_total", listener=listener)
+            raise
+        finally:
+            _CURRENT_EVENT.reset(token)
+            self.observe(
+                "listener_seconds", perf_counter() - start_time, listener=listener
+            )
+
+    def render_exposition(self) -> str:
+        lines = []
+        metric_groups: list[tuple[str, Mapping[_MetricKey, Histogram | int]]] = [
+            ("histogram", self._histograms),
+            ("counter", self._counters),
+        ]
+        for metric_type, metrics in metric_groups:
+            for name in sorted({name for name, _ in metrics}):
+                lines.append(f"# TYPE {_METRIC_NAME_PREFIX}{name} {metric_type}")
+                for (metric_name, labels), metric in metrics.items():
+                    if metric_name == name:
+                        lines += _render_metric(name, labels, metric)
+        return "\n".join(lines) + "\n"
+
+    async def export_periodically(self, interval: float) -> None:
+        while True:
+            await sleep(interval)
+            await self.export()
+
+    async def export(self) -> None:
+        if self._exposition_path:
+            try:
+                await to_thread(
+                    _write_atomically, self._exposition_path, self.render_exposition()
+                )
+            except OSError as error:
+                Log.w(f"Failed to write metrics to {self._exposition_path}. ({error})")
+
+
+def _render_metric(name: str, labels: _Labels, metric: Histogram | int) -> list[str]:
+    full_name = f"{_METRIC_NAME_PREFIX}{name}"
+    label_text = ",".join(f'{key}="{value}"' for key, value in labels)
+    if not isinstance(metric, Histogram):
+        return [f"{full_name}{{{label_text}}} {metric}"]
+
+    prefix = f"{label_text}," if label_text else ""
+    return [
+        f'{full_name}_bucket{{{prefix}le="{bound}"}} {count}'
+        for bound, count in metric.get_cumulative_counts()
+    ] + [
+        f"{full_name}_sum{{{label_text}}} {metric.sum:.6f}",
+        f"{full_name}_count{{{label_text}}} {metric.count}",
+    ]
+
+
+def _write_atomically(path: Path, text: str) -> None:
+    temp_path = path.with_name(f"{path.name}.tmp")
+    temp_path.write_text(text, encoding="utf-8")
+    os.replace(temp_path, path)
+
+
+def _get_exposition_path() -> Path | None:
+    filename = BotConfig.get_setting(
+        _METRICS_SETTINGS, "exposition_file", "metrics.prom"
+    )
+    return (DATA_PATH / filename) if filename else None
+
+
+METRICS: Final[MetricsRegistry] = MetricsRegistry(_get_exposition_path())
@@ -1,15 +1,11 @@
 from datetime import datetime
 from typing import Final
 
-from aiohttp import ClientSession
 from discord import ClientUser, Member
 from discord.utils import utcnow
-from humanize import naturaltime
 
 from qibot.utils.templates import Template
 
-_CLIENT_SESSION: Final[ClientSession] = ClientSession()
-
 _MEMBER_NAMETAG: Final[Template] = Template("${name}#${tag}")
 _TIME_STAMP_FORMAT: Final[Template] = Template("<t:${timestamp}>")
 
@@ -21,6 +17,9 @@ def format_time(
     if show_timestamp:
         results.append(_TIME_STAMP_FORMAT.sub(timestamp=int(time.timestamp())))
     if show_elapsed:
+        # Imported here because it's slow to load, and only needed for a few commands.
+        from humanize import naturaltime
+
         elapsed_time = naturaltime(utcnow() - time)
         results.append(f"({elapsed_time})" if results else elapsed_time)
     return " ".join(results)
@@ -28,8 +27,3 @@ def format_time(
 
 def get_member_nametag(member: Member | ClientUser) -> str:
     return _MEMBER_NAMETAG.sub(name=member.name, tag=member.discriminator)
-
-
-async def load_content_from_url(url: str) -> bytes:
-    async with _CLIENT_SESSION.get(url) as response:
-        return await response.read()
@@ -0,0 +1,324 @@
+from __future__ import annotations
+
+import heapq
+from asyncio import Event, Task, TimeoutError, create_task, sleep, wait_for
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from enum import IntEnum
+from itertools import count
+from time import monotonic, perf_counter
+from types import SimpleNamespace
+from typing import Any, Final, TypeAlias, cast
+
+from aiohttp import ClientSession, TraceConfig, TraceRequestEndParams
+from discord import NotFound, Webhook
+
+from qibot.utils.assets import ASSET_STORE
+from qibot.utils.channels import BotChannel
+from qibot.utils.config import BotConfig
+from qibot.utils.http import HTTP_CLIENT
+from qibot.utils.logging import Log
+from qibot.utils.metrics import METRICS, EventContext
+
+_OUTBOUND_SETTINGS: Final[str] = "outbound"
+
+_WEBHOOK_PATH_SEGMENT: Final[str] = "webhooks"
+
+_QueueKey: TypeAlias = tuple[BotChannel, int]  # The channel's role, and its server ID.
+
+
+class Priority(IntEnum):
+    HIGH = 0  # e.g. Admin reports. Never shed to make room for other messages.
+    NORMAL = 1
+    LOW = 2  # e.g. Welcome messages. The first to go when a queue is full.
+
+
+@dataclass(order=True)
+class _OutboundMessage:
+    priority: Priority
+    sequence: int
+    send_kwargs: dict[str, Any] = field(compare=False)
+    created_at: float = field(compare=False, default_factory=monotonic)
+    # Called with whether the message was sent, once it's been sent or dropped.
+    on_done: Callable[[bool], None] | None = field(compare=False, default=None)
+    # The gateway event that led to this message, for measuring end-to-end latency.
+    event: EventContext | None = field(
+        compare=False, default_factory=METRICS.get_current_event
+    )
+
+    def notify_done(self, sent: bool) -> None:
+        if self.on_done:
+            self.on_done(sent)
+
+
+class _RateLimitTracker:
+    """Keeps track of the rate-limit buckets reported by Discord for each webhook."""
+
+    def __init__(self) -> None:
+        self._reset_times: Final[dict[int, float]] = {}
+
+    def create_trace_config(self) -> TraceConfig:
+        trace_config = TraceConfig()
+        # Trace callbacks take three args, but `aiosignal` only types them with one.
+        trace_config.on_request_end.append(cast(Any, self._on_request_end))
+        return trace_config
+
+    async def wait_for_bucket(self, webhook_id: int) -> None:
+        if (reset_time := self._reset_times.pop(webhook_id, 0)) > monotonic():
+            delay = reset_time - monotonic()
+            Log.d("Webhook %d is rate-limited. Waiting %.2fs.", webhook_id, delay)
+            await sleep(delay)
+
+    async def _on_request_end(
+        self, _: ClientSession, __: SimpleNamespace, params: TraceRequestEndParams
+    ) -> None:
+        path_segments = params.url.path.split("/")
+        if _WEBHOOK_PATH_SEGMENT not in path_segments:
+            return
+
+        try:
+            webhook_index = path_segments.index(_WEBHOOK_PATH_SEGMENT) + 1
+            webhook_id = int(path_segments[webhook_index])
+            headers = params.response.headers
+            if headers.get("X-RateLimit-Remaining") == "0":
+                reset_after = float(headers["X-RateLimit-Reset-After"])
+            elif params.response.status == 429:
+                METRICS.increment("rate_limited_total")
+                reset_after = float(headers["Retry-After"])
+            else:
+                return
+        except (IndexError, KeyError, ValueError):
+            return
+
+        self._reset_times[webhook_id] = monotonic() + reset_after
+
+
+class _ChannelQueue:
+    def __init__(self, max_size: int) -> None:
+        self._max_size: Final[int] = max_size
+        self._messages: Final[list[_OutboundMessage]] = []  # Kept as a heap.
+        self._not_empty: Final[Event] = Event()
+        self._has_room: Final[Event] = Event()
+        self._has_room.set()
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    async def put(self, message: _OutboundMessage) -> _OutboundMessage | None:
+        # Returns the message that was shed to make room for this one, if any.
+        # Important messages are never shed, so if they're all that's left, wait for
+        # one of them to be sent. This holds up whoever is submitting them instead.
+        while self._is_full_of_important_messages(message):
+            self._has_room.clear()
+            await self._has_room.wait()
+
+        heapq.heappush(self._messages, message)
+        self._not_empty.set()
+
+        if self._max_size and (len(self._messages) > self._max_size):
+            # Shed the newest message with the lowest priority, unless it's important.
+            shed_message = max(self._messages)
+            if shed_message.priority is not Priority.HIGH:
+                self._messages.remove(shed_message)
+                heapq.heapify(self._messages)
+                return shed_message
+        return None
+
+    async def wait_until_not_empty(self) -> None:
+        await self._not_empty.wait()
+
+    def pop(self) -> _OutboundMessage:
+        message = heapq.heappop(self._messages)
+        if not self._messages:
+            self._not_empty.clear()
+        self._has_room.set()
+        return message
+
+    def _is_full_of_important_messages(self, message: _OutboundMessage) -> bool:
+        # The max (i.e. lowest-priority) message is only HIGH if all of them are.
+        return (
+            bool(self._max_size)
+            and (message.priority is Priority.HIGH)
+            and (len(self._messages) >= self._max_size)
+            and (max(self._messages).priority is Priority.HIGH)
+        )
+
+
+class OutboundScheduler:
+    """Sends webhook messages in the background, in order of priority.
+
+    Each `BotChannel` in each server has its own queue and worker task, so a slow or
+    rate-limited channel never holds up the others (or the listeners that submit them).
+    Before each send, the worker waits out any rate limit that Discord has reported for
+    the channel's webhook, and then picks the most important message in its queue.
+
+    Queues are limited to `max_queue_size` messages. When a queue is full, the newest
+    message with the lowest priority is dropped to make room. `HIGH` priority messages
+    are never dropped though, so when a queue is full of them, submitting another one
+    waits until there's room for it. Messages that have waited for longer than
+    `max_message_age` seconds are dropped instead of being sent late.
+    If the channel's webhook can't be found, its messages stay queued while the worker
+    waits `webhook_retry_delay` seconds before trying again.
+    """
+
+    def __init__(
+        self,
+        max_queue_size: int,
+        max_message_age: float,
+        drain_timeout: float,
+        webhook_retry_delay: float,
+    ) -> None:
+        self._max_queue_size: Final[int] = max_queue_size
+        self._max_message_age: Final[float] = max_message_age
+        self._drain_timeout: Final[float] = drain_timeout
+        self._webhook_retry_delay: Final[float] = max(webhook_retry_delay, 0.1)
+
+        self._rate_limits: Final[_RateLimitTracker] = _RateLimitTracker()
+        HTTP_CLIENT.add_trace_config(self._rate_limits.create_trace_config())
+        self._queues: Final[dict[_QueueKey, _ChannelQueue]] = {}
+        self._workers: Final[dict[_QueueKey, Task]] = {}
+        self._idle_events: Final[dict[_QueueKey, Event]] = {}
+        self._sequence: Final[count] = count()
+
+    async def submit(
+        self,
+        channel: BotChannel,
+        priority: Priority,
+        guild_id: int | None = None,
+        on_done: Callable[[bool], None] | None = None,
+        **send_kwargs: Any,
+    ) -> None:
+        key = (channel, guild_id or BotConfig.get_server_id())
+        if key not in self._queues:
+            self._queues[key] = _ChannelQueue(self._max_queue_size)
+            self._idle_events[key] = Event()
+            self._workers[key] = create_task(self._run_worker(key))
+
+        message = _OutboundMessage(
+            priority, next(self._sequence), send_kwargs, on_done=on_done
+        )
+        self._idle_events[key].clear()
+
+        if shed_message := await self._queues[key].put(message):
+            METRICS.increment(
+                "outbound_dropped_total", channel=channel.name, reason="queue_full"
+            )
+            Log.w(
+                f"Outbound queue for {channel.name} is full. Dropped a message with "
+                f"{shed_message.priority.name} priority."
+            )
+            shed_message.notify_done(False)
+
+    async def close(self) -> None:
+        if self._workers:
+            try:
+                await wait_for(self._wait_until_idle(), timeout=self._drain_timeout)
+            except TimeoutError:
+                pending_count = sum(len(queue) for queue in self._queues.values())
+                Log.w(f"Closing with {pending_count} outbound message(s) unsent.")
+
+        for worker in self._workers.values():
+            worker.cancel()
+        self._workers.clear()
+        self._queues.clear()
+
+    async def _wait_until_idle(self) -> None:
+        for idle_event in list(self._idle_events.values()):
+            await idle_event.wait()
+
+    async def _run_worker(self, key: _QueueKey) -> None:
+        channel, guild_id = key
+        queue = self._queues[key]
+        while True:
+            if not len(queue):
+                self._idle_events[key].set()
+            await queue.wait_until_not_empty()
+
+            try:
+                webhook = await channel.get_webhook(guild_id)
+            except Exception as error:
+                # Keep the messages queued, since this may just be too early (e.g.
+                # before the channels are initialized) or a temporary failure on
+                # Discord's end.
+                METRICS.increment("outbound_errors_total", channel=channel.name)
+                Log.e(
+                    f"Failed to get the webhook for {channel.name}. Retrying in "
+                    f"{self._webhook_retry_delay:g}s. ({error})"
+                )
+                await sleep(self._webhook_retry_delay)
+                continue
+
+            message = None
+            try:
+                await self._rate_limits.wait_for_bucket(webhook.id)
+                message = queue.pop()
+
+                message_age = monotonic() - message.created_at
+                METRICS.observe("stage_seconds", message_age, stage="queue_wait")
+                if self._max_message_age and (message_age > self._max_message_age):
+                    METRICS.increment(
+                        "outbound_dropped_total", channel=channel.name, reason="expired"
+                    )
+                    Log.w(
+                        f"Dropped a message for {channel.name} that was queued for "
+                        f"{message_age:.1f}s. ({message.priority.name} priority)"
+                    )
+                    message.notify_done(False)
+                else:
+                    await self._send_to_channel(key, webhook, message.send_kwargs)
+                    message.notify_done(True)
+                    if message.event:
+                        METRICS.observe(
+                            "event_to_send_seconds",
+                            perf_counter() - message.event.started_at,
+                            listener=message.event.listener,
+                        )
+            except Exception as error:
+                METRICS.increment("outbound_errors_total", channel=channel.name)
+                Log.e(f"Failed to send a message to {channel.name}. ({error})")
+                if message:
+                    message.notify_done(False)
+
+    async def _send_to_channel(
+        self, key: _QueueKey, webhook: Webhook, send_kwargs: dict[str, Any]
+    ) -> None:
+        channel, guild_id = key
+        try:
+            await self._send(webhook, **send_kwargs)
+        except NotFound:
+            # The webhook was deleted (or its stored token is stale). Replace it once.
+            METRICS.increment("outbound_retries_total", channel=channel.name)
+            await channel.evict_webhook(webhook, guild_id)
+            for file in send_kwargs.get("files") or []:
+                file.reset()
+            await self._send(await channel.get_webhook(guild_id), **send_kwargs)
+
+    async def _send(self, webhook: Webhook, **send_kwargs: Any) -> None:
+        # Wait for the sent message if it uploads any assets, so their URLs are reused.
+        uploads = ASSET_STORE.get_pending_uploads(send_kwargs.get("files"))
+        if not webhook.token:
+            raise ValueError(f"Webhook {webhook.id} has no token, so it can't send.")
+
+        partial_webhook = Webhook.partial(
+            webhook.id, webhook.token, session=HTTP_CLIENT.session
+        )
+        with METRICS.time("stage_seconds", stage="send"):
+            if not uploads:
+                await partial_webhook.send(**send_kwargs)
+                return
+            message = await partial_webhook.send(wait=True, **send_kwargs)
+        ASSET_STORE.record_uploads(uploads, message.attachments)
+
+
+OUTBOUND_SCHEDULER: Final[OutboundScheduler] = OutboundScheduler(
+    max_queue_size=BotConfig.get_setting(_OUTBOUND_SETTINGS, "max_queue_size", 100),
+    max_message_age=BotConfig.get_setting(
+        _OUTBOUND_SETTINGS, "max_message_age_seconds", 0.0
+    ),
+    drain_timeout=BotConfig.get_setting(
+        _OUTBOUND_SETTINGS, "drain_timeout_seconds", 5.0
+    ),
+    webhook_retry_delay=BotConfig.get_setting(
+        _OUTBOUND_SETTINGS, "webhook_retry_delay_seconds", 5.0
+    ),
+)
@@ -0,0 +1,360 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+from asyncio import Event, Lock, Task, create_task, shield, sleep, to_thread
+from dataclasses import dataclass, field
+from io import BytesIO
+from pathlib import Path
+from time import perf_counter, time
+from typing import Any, Final
+from uuid import uuid4
+
+from discord import Embed, File
+
+from qibot.assets import DATA_PATH
+from qibot.utils.channels import BotChannel
+from qibot.utils.config import BotConfig
+from qibot.utils.logging import Log
+from qibot.utils.metrics import METRICS
+from qibot.utils.outbound import OUTBOUND_SCHEDULER, OutboundScheduler, Priority
+
+_OUTBOX_SETTINGS: Final[str] = "outbox"
+
+_SCHEMA: Final = """
+CREATE TABLE IF NOT EXISTS outbox (
+    key TEXT PRIMARY KEY,
+    channel TEXT NOT NULL,
+    guild_id INTEGER NOT NULL,
+    priority INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS outbox_files (
+    key TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (key, position)
+);
+"""
+
+
+@dataclass
+class _OutboxEntry:
+    key: str  # Identifies the message across retries and restarts.
+    channel: BotChannel
+    guild_id: int
+    priority: Priority
+    payload: dict[str, Any]  # The webhook's username and avatar URL, and the embeds.
+    files: list[tuple[str, bytes]]  # The filename and contents of each attachment.
+    created_at: float = field(default_factory=time)
+    attempts: int = 0
+
+    def create_send_kwargs(self) -> dict[str, Any]:
+        # Files can only be sent once, so new ones are created for each attempt.
+        return {
+            "username": self.payload.get("username"),
+            "avatar_url": self.payload.get("avatar_url"),
+            "embeds": [Embed.from_dict(embed) for embed in self.payload["embeds"]],
+            "files": [File(BytesIO(data), filename=name) for name, data in self.files],
+        }
+
+
+class Outbox:
+    """Persists outbound messages in SQLite until they've been sent, for durability.
+
+    Messages are passed to the `OutboundScheduler` as soon as they're submitted, so
+    persistence doesn't delay them. Meanwhile, they're written to the database in the
+    background. Every write that's requested within `flush_interval` seconds of the
+    first is committed in the same transaction (along with the removal of any messages
+    that were sent in that time), so a burst of messages costs a single disk sync.
+
+    Messages that fail to send are retried after `retry_delay` seconds, doubling the
+    delay after each attempt, and are abandoned after `max_attempts`. Any that are
+    still in the database when the bot starts (e.g. because it crashed or was closed
+    before they were sent) are replayed once the channels are ready.
+
+    If the outbox isn't `enabled`, messages are passed to the scheduler without being
+    persisted, and nothing is replayed.
+
+    Each message has a unique key, which keeps it from being sent more than once at a
+    time (e.g. by a retry and a replay). Discord's webhooks don't accept idempotency
+    keys though, so delivery is at-least-once: a message that was sent right before a
+    crash (but not yet removed from the database) will be sent again after a restart.
+    """
+
+    def __init__(
+        self,
+        scheduler: OutboundScheduler,
+        enabled: bool,
+        database_path: Path,
+        flush_interval: float,
+        retry_delay: float,
+        max_attempts: int,
+    ) -> None:
+        self._scheduler: Final[OutboundScheduler] = scheduler
+        self._enabled: Final[bool] = enabled
+        self._database_path: Final[Path] = database_path
+        self._flush_interval: Final[float] = flush_interval
+        self._retry_delay: Final[float] = retry_delay
+        self._max_attempts: Final[int] = max(max_attempts, 1)
+
+        self._connection: sqlite3.Connection | None = None  # Opened on demand.
+        self._database_lock: Final[Lock] = Lock()
+        # Writes that haven't been committed yet, keyed by entry key (in order).
+        self._inserts: Final[dict[str, _OutboxEntry]] = {}
+        self._deletes: Final[dict[str, None]] = {}
+        self._has_writes: Final[Event] = Event()
+        self._writer: Task | None = None
+
+        self._in_flight: Final[set[str]] = set()
+        self._retries: Final[set[Task]] = set()
+        self._has_replayed: bool = False
+
+    async def submit(
+        self,
+        channel: BotChannel,
+        priority: Priority,
+        guild_id: int | None = None,
+        **send_kwargs: Any,
+    ) -> None:
+        # Takes the same arguments as `OutboundScheduler.submit()`.
+        if not self._enabled:
+            await self._scheduler.submit(channel, priority, guild_id, **send_kwargs)
+            return
+
+        entry = _OutboxEntry(
+            key=uuid4().hex,
+            channel=channel,
+            guild_id=guild_id or BotConfig.get_server_id(),
+            priority=priority,
+            payload={
+                "username": send_kwargs.get("username"),
+                "avatar_url": send_kwargs.get("avatar_url"),
+                "embeds": [embed.to_dict() for embed in send_kwargs.get("embeds", [])],
+            },
+            files=[_read_file(file) for file in send_kwargs.get("files") or []],
+        )
+        self._queue_write(entry.key, entry)
+        # The original files are used for the first attempt. (See `AssetStore`.)
+        await self._send(entry, send_kwargs)
+
+    async def replay(self) -> None:
+        # Only needs to happen once, even if the bot reconnects.
+        if self._has_replayed or not self._enabled:
+            return
+        self._has_replayed = True
+
+        async with self._database_lock:
+            entries = await to_thread(self._load_entries)
+        if entries:
+            Log.i(f"Replaying {len(entries)} unsent message(s) from the outbox.")
+        for entry in entries:
+            METRICS.increment("outbox_replayed_total", channel=entry.channel.name)
+            await self._send(entry)
+
+    async def close(self) -> None:
+        # Unsent messages stay in the database, so that they're replayed on restart.
+        for retry in self._retries:
+            retry.cancel()
+        self._retries.clear()
+        if self._writer:
+            self._writer.cancel()
+            self._writer = None
+        await self._flush()
+
+        async with self._database_lock:
+            if self._connection:
+                await to_thread(self._connection.close)
+                self._connection = None
+
+    async def _send(
+        self, entry: _OutboxEntry, send_kwargs: dict[str, Any] | None = None
+    ) -> None:
+        if entry.key in self._in_flight:
+            return
+        self._in_flight.add(entry.key)
+        await self._scheduler.submit(
+            entry.channel,
+            entry.priority,
+            entry.guild_id,
+            on_done=lambda sent: self._on_send_done(entry, sent),
+            **(send_kwargs or entry.create_send_kwargs()),
+        )
+
+    def _on_send_done(self, entry: _OutboxEntry, sent: bool) -> None:
+        self._in_flight.discard(entry.key)
+        entry.attempts += 1
+        if sent:
+            self._queue_write(entry.key, None)
+        elif entry.attempts >= self._max_attempts:
+            METRICS.increment("outbox_abandoned_total", channel=entry.channel.name)
+            Log.e(
+                f"Gave up on a message for {entry.channel.name} after "
+                f"{entry.attempts} attempt(s)."
+            )
+            self._queue_write(entry.key, None)
+        else:
+            METRICS.increment("outbox_retries_total", channel=entry.channel.name)
+            delay = self._retry_delay * (2 ** (entry.attempts - 1))
+            Log.w(f"Retrying a message for {entry.channel.name} in {delay:.1f}s.")
+            retry = create_task(self._retry(entry, delay))
+            self._retries.add(retry)
+            retry.add_done_callback(self._retries.discard)
+
+    async def _retry(self, entry: _OutboxEntry, delay: float) -> None:
+        await sleep(delay)
+        await self._send(entry)
+
+    def _queue_write(self, key: str, entry: _OutboxEntry | None) -> None:
+        # Inserts the entry, or deletes the one with this key if `entry` is `None`.
+        if entry:
+            self._inserts[key] = entry
+        elif key in self._inserts:
+            # It was sent before it was written, so it never needs to be written.
+            del self._inserts[key]
+        else:
+            self._deletes[key] = None
+
+        self._has_writes.set()
+        if not self._writer:
+            self._writer = create_task(self._run_writer())
+
+    async def _run_writer(self) -> None:
+        while True:
+            await self._has_writes.wait()
+            # Give other writes a chance to join this batch, so they're committed once.
+            await sleep(self._flush_interval)
+            # Any commit in progress should finish, even if the writer is cancelled.
+            if not await shield(self._flush()):
+                await sleep(self._retry_delay)
+
+    async def _flush(self) -> bool:
+        # Returns whether all the pending writes (if any) were committed successfully.
+        async with self._database_lock:
+            self._has_writes.clear()
+            if not (self._inserts or self._deletes):
+                return True
+
+            inserts, deletes = list(self._inserts.values()), list(self._deletes)
+            self._inserts.clear()
+            self._deletes.clear()
+
+            start_time = perf_counter()
+            try:
+                await to_thread(self._commit, inserts, deletes)
+            except Exception as error:
+                # Try again with the next batch. (Anything newer takes precedence.)
+                METRICS.increment("outbox_write_errors_total")
+                Log.e(f"Failed to write to the outbox. ({error})")
+                for entry in inserts:
+                    self._inserts.setdefault(entry.key, entry)
+                for key in deletes:
+                    self._deletes.setdefault(key, None)
+                self._has_writes.set()
+                return False
+
+        elapsed_time = perf_counter() - start_time
+        METRICS.observe("stage_seconds", elapsed_time, stage="outbox_commit")
+        Log.d(
+            "Committed %d insert(s) and %d delete(s) to the outbox in %.1f ms.",
+            len(inserts),
+            len(deletes),
+            elapsed_time * 1000,
+        )
+        return True
+
+    def _get_connection(self) -> sqlite3.Connection:
+        # Only called from worker threads, while the database lock is held.
+        if not self._connection:
+            self._database_path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(
+                self._database_path, check_same_thread=False
+            )
+            # A crash of the bot can't lose commits in WAL mode. (Only an OS crash can.)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(_SCHEMA)
+        return self._connection
+
+    def _commit(self, inserts: list[_OutboxEntry], deletes: list[str]) -> None:
+        connection = self._get_connection()
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO outbox VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        entry.key,
+                        entry.channel.name,
+                        entry.guild_id,
+                        int(entry.priority),
+                        json.dumps(entry.payload),
+                        entry.created_at,
+                    )
+                    for entry in inserts
+                ],
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO outbox_files VALUES (?, ?, ?, ?)",
+                [
+                    (entry.key, position, filename, data)
+                    for entry in inserts
+                    for position, (filename, data) in enumerate(entry.files)
+                ],
+            )
+            keys = [(key,) for key in deletes]
+            connection.executemany("DELETE FROM outbox WHERE key = ?", keys)
+            connection.executemany("DELETE FROM outbox_files WHERE key = ?", keys)
+
+    def _load_entries(self) -> list[_OutboxEntry]:
+        connection = self._get_connection()
+        files: dict[str, list[tuple[str, bytes]]] = {}
+        for key, filename, data in connection.execute(
+            "SELECT key, filename, data FROM outbox_files ORDER BY key, position"
+        ):
+            files.setdefault(key, []).append((filename, data))
+
+        entries, invalid_keys = [], []
+        rows = connection.execute("SELECT * FROM outbox ORDER BY created_at")
+        for key, channel_name, guild_id, priority, payload, created_at in rows:
+            if (channel_name in BotChannel.__members__) and (
+                BotConfig.is_configured_guild(guild_id)
+            ):
+                entries.append(
+                    _OutboxEntry(
+                        key=key,
+                        channel=BotChannel[channel_name],
+                        guild_id=guild_id,
+                        priority=Priority(priority),
+                        payload=json.loads(payload),
+                        files=files.get(key, []),
+                        created_at=created_at,
+                    )
+                )
+            else:
+                Log.w(f"Discarding an outbox message for {channel_name} ({guild_id}).")
+                invalid_keys.append(key)
+
+        if invalid_keys:
+            self._commit([], invalid_keys)
+        return entries
+
+
+def _read_file(file: File) -> tuple[str, bytes]:
+    # Files are read from memory, so this is fast enough to do on the event loop.
+    data = file.fp.read()
+    file.reset()
+    return file.filename or "untitled", data  # The same default as discord.py uses.
+
+
+OUTBOX: Final[Outbox] = Outbox(
+    scheduler=OUTBOUND_SCHEDULER,
+    enabled=BotConfig.get_setting(_OUTBOX_SETTINGS, "enabled", True),
+    database_path=DATA_PATH / "outbox.sqlite3",
+    flush_interval=BotConfig.get_setting(
+        _OUTBOX_SETTINGS, "flush_interval_seconds", 0.05
+    ),
+    retry_delay=BotConfig.get_setting(_OUTBOX_SETTINGS, "retry_delay_seconds", 2.0),
+    max_attempts=BotConfig.get_setting(_OUTBOX_SETTINGS, "max_attempts", 5),
+)
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+from asyncio import Event, Queue, Task, TimeoutError, create_task, wait_for
+from collections import deque
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass, field
+from enum import Enum
+from time import perf_counter
+from typing import Final
+
+from qibot.utils.config import BotConfig
+from qibot.utils.logging import Log
+from qibot.utils.metrics import METRICS
+
+_PIPELINE_SETTINGS: Final[str] = "event_pipeline"
+
+
+class OverflowPolicy(Enum):
+    BLOCK = "block"  # Wait for room, which holds up the listener that submitted it.
+    DROP_NEWEST = "drop_newest"  # Reject the event that was just submitted.
+    DROP_OLDEST = "drop_oldest"  # Discard the event that has waited the longest.
+
+    @classmethod
+    def from_name(cls, name: str) -> "OverflowPolicy":
+        try:
+            return cls(name.lower())
+        except ValueError:
+            Log.e(f'Unknown overflow policy "{name}". Using "drop_oldest" instead.')
+            return cls.DROP_OLDEST
+
+
+@dataclass
+class _Job:
+    listener: str
+    handler: Callable[[], Awaitable[None]]
+    received_at: float = field(default_factory=perf_counter)
+
+
+class EventPipeline:
+    """Handles gateway events in the background, with a bounded pool of workers.
+
+    Each event is submitted with a key (e.g. a member ID). Events with the same key are
+    handled one at a time, in the order they were submitted, so a member's "leave" is
+    never reported before their "join". Events with different keys are handled by up to
+    `max_workers` workers at once, taking turns so that one busy key can't starve the
+    others.
+
+    At most `max_queued` events may wait for a worker. When that many are waiting, the
+    `overflow_policy` decides what happens to the next one. Either way, the memory and
+    concurrency used by event handlers stay bounded, no matter how fast events arrive.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_queued: int,
+        overflow_policy: OverflowPolicy,
+        drain_timeout: float,
+    ) -> None:
+        self._max_workers: Final[int] = max(max_workers, 1)
+        self._max_queued: Final[int] = max(max_queued, 1)
+        self._overflow_policy: Final[OverflowPolicy] = overflow_policy
+        self._drain_timeout: Final[float] = drain_timeout
+
+        # A key has an entry here from when its first job is submitted until its last
+        # job is done. While none of its jobs are running, it waits in the ready queue.
+        self._jobs: Final[dict[Hashable, deque[_Job]]] = {}
+        self._ready_keys: Final[Queue[Hashable]] = Queue()
+        self._workers: Final[list[Task]] = []
+        self._queued_count: int = 0
+        self._has_room: Final[Event] = Event()
+        self._idle: Final[Event] = Event()
+        self._has_room.set()
+        self._idle.set()
+
+    @property
+    def queued_count(self) -> int:
+        return self._queued_count
+
+    async def submit(
+        self, key: Hashable, listener: str, handler: Callable[[], Awaitable[None]]
+    ) -> bool:
+        # Returns whether the event was accepted. It may still be dropped later on.
+        if not self._workers:
+            self._workers.extend(
+                create_task(self._run_worker()) for _ in range(self._max_workers)
+            )
+
+        while self._queued_count >= self._max_queued:
+            if self._overflow_policy is OverflowPolicy.BLOCK:
+                METRICS.increment("pipeline_blocked_total", listener=listener)
+                await self._has_room.wait()
+            elif self._overflow_policy is OverflowPolicy.DROP_NEWEST:
+                self._record_drop(listener)
+                return False
+            else:
+                self._drop_oldest()
+
+        self._queued_count += 1
+        if self._queued_count >= self._max_queued:
+            self._has_room.clear()
+        self._idle.clear()
+
+        if key in self._jobs:
+            self._jobs[key].append(_Job(listener, handler))
+        else:
+            self._jobs[key] = deque([_Job(listener, handler)])
+            self._ready_keys.put_nowait(key)
+        return True
+
+    async def close(self) -> None:
+        if self._workers:
+            try:
+                await wait_for(self._idle.wait(), timeout=self._drain_timeout)
+            except TimeoutError:
+                Log.w(f"Closing with {self._queued_count} event(s) unhandled.")
+
+        for worker in self._workers:
+            worker.cancel()
+        self._workers.clear()
+
+    def _drop_oldest(self) -> None:
+        # Each key's jobs are in order, so the oldest job is first in one of them.
+        oldest_jobs = min(
+            (jobs for jobs in self._jobs.values() if jobs),
+            key=lambda jobs: jobs[0].received_at,
+        )
+        self._record_drop(self._take_job_from(oldest_jobs).listener)
+
+    def _take_job_from(self, jobs: deque[_Job]) -> _Job:
+        self._queued_count -= 1
+        self._has_room.set()
+        return jobs.popleft()
+
+    def _record_drop(self, listener: str) -> None:
+        reason = self._overflow_policy.value
+        METRICS.increment("pipeline_dropped_total", listener=listener, reason=reason)
+        Log.w(
+            "Event pipeline is full. Dropped a %s event. (%s)",
+            listener,
+            reason,
+            action=listener,
+        )
+
+    async def _run_worker(self) -> None:
+        while True:
+            key = await self._ready_keys.get()
+            jobs = self._jobs[key]
+            if jobs:
+                await self._run_job(key, self._take_job_from(jobs))
+
+            # The key goes back to the end of the line, so other keys can take a turn.
+            if jobs:
+                self._ready_keys.put_nowait(key)
+            else:
+                del self._jobs[key]
+                if not self._jobs:
+                    self._idle.set()
+
+    async def _run_job(self, key: Hashable, job: _Job) -> None:
+        METRICS.observe(
+            "stage_seconds", perf_counter() - job.received_at, stage="pipeline_wait"
+        )
+        try:
+            with METRICS.track_event(job.listener, received_at=job.received_at):
+                await job.handler()
+        except Exception as error:
+            Log.e(
+                "Error while handling a %s event for %s. (%s)",
+                job.listener,
+                key,
+                error,
+                action=job.listener,
+            )
+
+
+EVENT_PIPELINE: Final[EventPipeline] = EventPipeline(
+    max_workers=BotConfig.get_setting(_PIPELINE_SETTINGS, "max_workers", 8),
+    max_queued=BotConfig.get_setting(_PIPELINE_SETTINGS, "max_queued", 1000),
+    overflow_policy=OverflowPolicy.from_name(
+        BotConfig.get_setting(_PIPELINE_SETTINGS, "overflow_policy", "drop_oldest")
+    ),
+    drain_timeout=BotConfig.get_setting(
+        _PIPELINE_SETTINGS, "drain_timeout_seconds", 5.0
+    ),
+)
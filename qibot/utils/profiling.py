@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import sys
+from collections.abc import Callable, Sequence
+from importlib.abc import Loader
+from importlib.machinery import ModuleSpec
+from time import perf_counter
+from types import ModuleType
+from typing import Final, NamedTuple
+
+from qibot.utils.logging import Log
+
+_MAX_REPORTED_MODULES: Final[int] = 25
+
+
+class _ModuleTiming(NamedTuple):
+    name: str
+    self_seconds: float
+    total_seconds: float
+
+
+class StartupProfiler:
+    """Measures how long each module takes to import, and how long each stage takes.
+
+    While the profiler is running, it sits at the front of `sys.meta_path` and times
+    the execution of every module that's imported for the first time. This includes the
+    code that runs at the top level of each module (i.e. its initialization). "Self"
+    times exclude any nested imports, while "total" times include them.
+
+    Modules keep the loaders that were found for them (so that type checks on them
+    still work), but their `exec_module()` methods are wrapped until profiling stops.
+    """
+
+    def __init__(self) -> None:
+        self._start_time: float = 0.0
+        self._stage_times: Final[dict[str, float]] = {}
+        self._module_timings: Final[list[_ModuleTiming]] = []
+        self._child_seconds: Final[list[float]] = []  # Stack of nested import times.
+        self._timed_loaders: Final[list[Loader]] = []
+
+    @property
+    def is_running(self) -> bool:
+        return self in sys.meta_path
+
+    def start(self) -> None:
+        if not self.is_running:
+            self._start_time = perf_counter()
+            sys.meta_path.insert(0, self)
+
+    def mark_stage(self, stage: str) -> None:
+        if self.is_running:
+            self._stage_times[stage] = perf_counter() - self._start_time
+
+    def stop(self) -> None:
+        if not self.is_running:
+            return
+
+        sys.meta_path.remove(self)
+        for loader in self._timed_loaders:
+            delattr(loader, "exec_module")  # Reveals the original method again.
+        self._timed_loaders.clear()
+
+        module_timings = sorted(
+            self._module_timings, key=lambda timing: timing.self_seconds, reverse=True
+        )
+        lines = ["Startup profile:", "  Stages (time since profiling began):"]
+        lines += [
+            f"    {seconds * 1000:9.1f} ms | {stage}"
+            for stage, seconds in self._stage_times.items()
+        ]
+        lines.append(
+            f"  Slowest of {len(module_timings)} imported modules (self | total):"
+        )
+        lines += [
+            f"    {timing.self_seconds * 1000:9.1f} ms | "
+            f"{timing.total_seconds * 1000:9.1f} ms | {timing.name}"
+            for timing in module_timings[:_MAX_REPORTED_MODULES]
+        ]
+        Log.i(Log.NEWLINE.join(lines))
+
+    def find_spec(
+        self,
+        fullname: str,
+        path: Sequence[str] | None,
+        target: ModuleType | None = None,
+    ) -> ModuleSpec | None:
+        # Let the other finders do the real work, then time the loader that they found.
+        for finder in sys.meta_path:
+            if (finder is self) or not hasattr(finder, "find_spec"):
+                continue
+            if spec := finder.find_spec(fullname, path, target):
+                self._time_loader(spec.loader)
+                return spec
+        return None
+
+    def _time_loader(self, loader: Loader | None) -> None:
+        # Built-in and frozen modules are loaded by classes, which are left alone.
+        if (loader is None) or isinstance(loader, type):
+            return
+        # Some loaders are shared by several modules (e.g. `zipimporter`s), so they're
+        # only wrapped once. Loaders that can't be given attributes can't be timed.
+        if not hasattr(loader, "__dict__") or ("exec_module" in vars(loader)):
+            return
+        setattr(loader, "exec_module", self._time(loader.exec_module))
+        self._timed_loaders.append(loader)
+
+    def _time(
+        self, exec_module: Callable[[ModuleType], None]
+    ) -> Callable[[ModuleType], None]:
+        def timed_exec_module(module: ModuleType) -> None:
+            self._child_seconds.append(0.0)
+            start_time = perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                total_seconds = perf_counter() - start_time
+                self_seconds = total_seconds - self._child_seconds.pop()
+                if self._child_seconds:
+                    self._child_seconds[-1] += total_seconds
+                self._module_timings.append(
+                    _ModuleTiming(module.__name__, self_seconds, total_seconds)
+                )
+
+        return timed_exec_module
+
+
+STARTUP_PROFILER: Final[StartupProfiler] = StartupProfiler()
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from functools import lru_cache
+from io import BytesIO
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Final, TypeAlias
+
+from PIL.Image import Image, Resampling
+from PIL.Image import new as new_image
+from PIL.Image import open as open_image
+from PIL.ImageDraw import Draw
+
+if TYPE_CHECKING:
+    from qibot.utils.images import ImageEncoder
+
+# The functions in this module are run on the image executor, so they must be
+# picklable. This is also the only module that imports Pillow, which is slow to load.
+
+ImageData: TypeAlias = str | bytes | Image  # File path, raw data, or decoded image.
+ImageOperation: TypeAlias = tuple[str, tuple[Any, ...]]  # Operation name and args.
+StageTimings: TypeAlias = dict[str, float]
+
+_COLOR_BLACK: Final[int] = 0
+_COLOR_WHITE: Final[int] = 255
+_MASK_SUPERSAMPLING: Final[int] = 4  # Draw masks bigger, then shrink to anti-alias.
+
+
+def render_image(
+    source: ImageData,
+    operations: tuple[ImageOperation, ...],
+    encoder: ImageEncoder,
+) -> tuple[bytes, StageTimings]:
+    timings: StageTimings = {}
+    start_time = perf_counter()
+
+    def mark_stage(stage: str) -> None:
+        nonlocal start_time
+        end_time = perf_counter()
+        timings[stage] = timings.get(stage, 0) + (end_time - start_time)
+        start_time = end_time
+
+    if isinstance(source, Image):
+        image = source
+    else:
+        image = open_image(source if isinstance(source, str) else BytesIO(source))
+        image.load()
+        mark_stage("decode")
+
+    for operation_name, args in operations:
+        image = _OPERATIONS[operation_name](image, *args)
+        mark_stage(operation_name)
+
+    with BytesIO() as image_bytes:
+        image.save(fp=image_bytes, format=encoder.format, **encoder.save_options)
+        mark_stage("encode")
+        return image_bytes.getvalue(), timings
+
+
+def _circle_crop(image: Image) -> Image:
+    if image.mode != "RGBA":
+        image = image.convert("RGBA")
+    image.putalpha(_get_circle_mask(image.size))
+    return image
+
+
+def _resize(image: Image, size: tuple[int, int]) -> Image:
+    if image.size == size:
+        return image
+    return image.resize(size, resample=Resampling.LANCZOS)
+
+
+@lru_cache(maxsize=16)
+def _get_circle_mask(size: tuple[int, int]) -> Image:
+    width, height = size
+    large_size = (width * _MASK_SUPERSAMPLING, height * _MASK_SUPERSAMPLING)
+    mask = new_image(mode="L", size=large_size, color=_COLOR_BLACK)
+    circle_bounds = (0, 0, large_size[0] - 1, large_size[1] - 1)
+    Draw(mask).ellipse(xy=circle_bounds, fill=_COLOR_WHITE)
+    return mask.resize(size, resample=Resampling.LANCZOS)
+
+
+_OPERATIONS: Final[dict[str, Callable[..., Image]]] = {
+    "circle_crop": _circle_crop,
+    "resize": _resize,
+}
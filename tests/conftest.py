@@ -0,0 +1,29 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from qibot.assets import DATA_PATH
+
+# Any IDs will do, since nothing is ever sent to Discord.
+_TEST_CONFIG = {
+    "server_id": 1,
+    "channel_ids": {"admin_log": 11, "bot_spam": 12, "rules": 13, "welcome": 14},
+}
+
+_CONFIG_PATH = DATA_PATH / "config.json"
+_CREATED_PATHS: list[Path] = []
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    # `BotConfig` loads the config file on import, so it must exist before collection.
+    if not _CONFIG_PATH.exists():
+        _CONFIG_PATH.write_text(json.dumps(_TEST_CONFIG), encoding="utf-8")
+        _CREATED_PATHS.extend(
+            [_CONFIG_PATH, DATA_PATH / "config.json.dict-lowercase.snapshot"]
+        )
+
+
+def pytest_unconfigure(config: pytest.Config) -> None:
+    for path in _CREATED_PATHS:
+        path.unlink(missing_ok=True)
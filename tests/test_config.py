@@ -0,0 +1,93 @@
+import asyncio
+from typing import Any
+
+import pytest
+
+from qibot.utils import BotConfig
+from qibot.utils import config as config_module
+from qibot.utils.config import ConfigSnapshot
+
+
+def _create_valid_config(**settings: dict[str, Any]) -> dict[str, Any]:
+    snapshot = BotConfig.get_snapshot()
+    return {
+        "server_id": snapshot.server_id,
+        "channel_ids": dict(snapshot.channel_ids),
+        "guilds": {
+            str(guild_id): {"channel_ids": dict(channel_ids)}
+            for guild_id, channel_ids in snapshot.guild_channel_ids.items()
+            if guild_id != snapshot.server_id
+        },
+        "settings": settings,
+    }
+
+
+def _reload(
+    monkeypatch: pytest.MonkeyPatch, new_config: dict[str, Any] | Exception
+) -> list[ConfigSnapshot]:
+    # Pretends the file is modified before every poll, and contains `new_config`.
+    signatures = iter(range(1000))
+    monkeypatch.setattr(
+        config_module, "_get_config_file_signature", lambda: (next(signatures), 0)
+    )
+
+    def load_config_file() -> dict[str, Any]:
+        if isinstance(new_config, Exception):
+            raise new_config
+        return new_config
+
+    monkeypatch.setattr(config_module, "_load_config_file", load_config_file)
+    # Whatever happens, the snapshot is restored for the other tests.
+    monkeypatch.setattr(BotConfig, "_snapshot", BotConfig.get_snapshot())
+
+    changes = []
+
+    async def on_change(snapshot: ConfigSnapshot) -> None:
+        changes.append(snapshot)
+
+    async def run() -> None:
+        watcher = asyncio.create_task(BotConfig.watch_for_changes(on_change, 0.01))
+        await asyncio.sleep(0.1)
+        watcher.cancel()
+
+    asyncio.run(run())
+    return changes
+
+
+def test_valid_config_is_reloaded(monkeypatch: pytest.MonkeyPatch) -> None:
+    new_config = _create_valid_config(digest={"window_seconds": 5})
+    changes = _reload(monkeypatch, new_config)
+
+    assert len(changes) == 1  # Later polls find the same values.
+    assert BotConfig.get_snapshot() is changes[0]
+    assert BotConfig.get_setting("digest", "window_seconds", 10.0) == 5
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        {"server_id": "not a number"},
+        {"server_id": None},
+        {"channel_ids": None},
+        {"channel_ids": {"admin_log": "11"}},
+        {"channel_ids": {"admin_log": 111111111111111111}},
+        {"guilds": ["not", "an", "object"]},
+        {"settings": {"digest": {"window_seconds": 5}, "outbox": 5}},
+    ],
+)
+def test_invalid_config_is_rejected(
+    monkeypatch: pytest.MonkeyPatch, changes: dict[str, Any]
+) -> None:
+    original_snapshot = BotConfig.get_snapshot()
+    # Everything else is valid, and would change a setting if it were accepted.
+    new_config = _create_valid_config(digest={"window_seconds": 5}) | changes
+    new_config = {key: value for key, value in new_config.items() if value is not None}
+
+    assert not _reload(monkeypatch, new_config)
+    assert BotConfig.get_snapshot() is original_snapshot
+
+
+def test_unreadable_config_is_rejected(monkeypatch: pytest.MonkeyPatch) -> None:
+    original_snapshot = BotConfig.get_snapshot()
+    assert not _reload(monkeypatch, ValueError("Expecting value: line 1 column 1"))
+    assert BotConfig.get_snapshot() is original_snapshot
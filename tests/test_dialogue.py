@@ -0,0 +1,58 @@
+import pytest
+
+from qibot.characters.core import Character
+from qibot.characters.dialogue import compile_dialogue, is_dialogue_category
+
+
+def test_references_to_other_fields_are_resolved() -> None:
+    responses = {
+        "emoji": ["Not", "a", "string"],
+        "dialogue": ["Read the ${rules_link}, $name.", "", "Hi, $name!"],
+        "rules_link": "[$rules_title]($url)",
+        "rules_title": "rules",
+    }
+    variants = compile_dialogue(responses, "dialogue")
+
+    assert len(variants) == 2  # Empty variants are skipped.
+    assert variants[0].template.template == "Read the [rules]($url), $name."
+    assert variants[0].required_keys == {"url", "name"}
+    assert variants[0].render(url="example.com", name="Qi") == (
+        "Read the [rules](example.com), Qi."
+    )
+    assert variants[1].render(name="Qi") == "Hi, Qi!"
+    assert compile_dialogue(responses, "digest_dialogue") == []
+
+
+def test_missing_references_are_left_for_rendering() -> None:
+    (variant,) = compile_dialogue({"dialogue": "$name joined $server."}, "dialogue")
+
+    assert variant.required_keys == {"name", "server"}
+    # Missing values are logged, but don't stop the rest from being filled in.
+    assert variant.render(name="Qi") == "Qi joined $server."
+    assert variant.render(name="Qi", server="the Oasis") == "Qi joined the Oasis."
+
+
+@pytest.mark.parametrize(
+    ("responses", "cycle"),
+    [
+        ({"dialogue": "$a", "a": "$a"}, "a -> a"),
+        ({"dialogue": "$a", "a": "$b", "b": "${a}!"}, "a -> b -> a"),
+        ({"dialogue": "Say $dialogue"}, "dialogue -> dialogue"),
+    ],
+)
+def test_cycles_are_rejected(responses: dict[str, object], cycle: str) -> None:
+    with pytest.raises(ValueError, match=cycle):
+        compile_dialogue(responses, "dialogue")
+
+
+def test_all_character_dialogue_compiles() -> None:
+    for role, data in Character.DATA.items():
+        for action_key, responses in data["responses"].items():
+            static_fields = {
+                key for key, value in responses.items() if isinstance(value, str)
+            }
+            for category in filter(is_dialogue_category, responses):
+                variants = compile_dialogue(responses, category)
+                assert variants, f"{role}.{action_key}.{category} is empty."
+                for variant in variants:
+                    assert not (variant.required_keys & static_fields)
@@ -0,0 +1,80 @@
+import asyncio
+
+from qibot.characters.digest import KeyedDebouncer, MessageBatch
+
+
+class _Flushes:
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+
+    async def flush(self, items: list[str]) -> None:
+        self.batches.append(items)
+
+
+def test_items_with_the_same_key_are_flushed_together() -> None:
+    flushes = _Flushes()
+
+    async def run() -> None:
+        debouncer = KeyedDebouncer(flushes.flush, 0.05, 1.0)
+        for item in ("A", "B", "C"):
+            await debouncer.add("renamed", item)
+            await asyncio.sleep(0.01)
+        await debouncer.add("other", "X")
+        assert not flushes.batches
+        await asyncio.sleep(0.2)
+
+    asyncio.run(run())
+    assert sorted(flushes.batches) == [["A", "B", "C"], ["X"]]
+
+
+def test_items_are_flushed_by_the_max_delay() -> None:
+    flushes = _Flushes()
+
+    async def run() -> None:
+        # Each item would push the deadline back forever, if not for the max delay.
+        debouncer = KeyedDebouncer(flushes.flush, 0.05, 0.15)
+        for index in range(15):
+            await debouncer.add("renamed", str(index))
+            await asyncio.sleep(0.02)
+        await asyncio.sleep(0.2)
+
+    asyncio.run(run())
+    assert len(flushes.batches) > 1
+    assert [item for batch in flushes.batches for item in batch] == [
+        str(index) for index in range(15)
+    ]
+
+
+def test_items_are_flushed_right_away_without_a_delay() -> None:
+    flushes = _Flushes()
+
+    async def run() -> None:
+        debouncer = KeyedDebouncer(flushes.flush, 0, 0)
+        await debouncer.add("renamed", "A")
+        await debouncer.add("renamed", "B")
+        assert flushes.batches == [["A"], ["B"]]
+
+    asyncio.run(run())
+
+
+def test_flush_sends_pending_items_without_waiting() -> None:
+    flushes = _Flushes()
+
+    async def run() -> None:
+        debouncer = KeyedDebouncer(flushes.flush, 30.0, 60.0)
+        batch = MessageBatch(flushes.flush, 0, 30.0)
+        await debouncer.add("renamed", "A")
+        await debouncer.add("renamed", "B")
+        await debouncer.add("other", "X")
+        await batch.add("joined")
+
+        await debouncer.flush()
+        await batch.flush()
+        assert sorted(flushes.batches) == [["A", "B"], ["X"], ["joined"]]
+
+        # Nothing is left to be flushed again later.
+        await debouncer.flush()
+        await batch.flush()
+        assert len(flushes.batches) == 3
+
+    asyncio.run(run())
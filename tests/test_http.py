@@ -0,0 +1,154 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+
+import pytest
+from aiohttp import hdrs, web
+
+from qibot.utils import http as http_module
+from qibot.utils.http import HttpClient
+
+_LAST_MODIFIED = "Sat, 01 Jan 2022 00:00:00 GMT"
+
+
+class _Server:
+    """Serves a single resource that can be changed, and records each request to it."""
+
+    def __init__(
+        self,
+        cache_control: str | None = None,
+        use_etag: bool = False,
+        last_modified: str | None = None,
+    ) -> None:
+        self.cache_control: str | None = cache_control
+        self.use_etag: bool = use_etag
+        self.last_modified: str | None = last_modified
+        self.content: bytes = b"first"
+        self.requests: list[dict[str, str]] = []  # The validators sent with each one.
+
+        app = web.Application()
+        app.router.add_get("/resource", self._handle_resource)
+        self._runner = web.AppRunner(app, access_log=None)
+
+    async def start(self) -> str:
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        return f"http://{host}:{port}/resource"
+
+    async def stop(self) -> None:
+        await self._runner.cleanup()
+
+    async def _handle_resource(self, request: web.Request) -> web.Response:
+        validators: dict[str, str] = {
+            header: request.headers[header]
+            for header in (hdrs.IF_NONE_MATCH, hdrs.IF_MODIFIED_SINCE)
+            if header in request.headers
+        }
+        self.requests.append(validators)
+
+        headers: dict[str, str] = {}  # 304 responses repeat these too, as they should.
+        if self.cache_control:
+            headers[hdrs.CACHE_CONTROL] = self.cache_control
+        if self.use_etag:
+            headers[hdrs.ETAG] = f'"{self.content.decode()}"'
+            if validators.get(hdrs.IF_NONE_MATCH) == headers[hdrs.ETAG]:
+                return web.Response(status=304, headers=headers)
+        if self.last_modified:
+            headers[hdrs.LAST_MODIFIED] = self.last_modified
+            if validators.get(hdrs.IF_MODIFIED_SINCE) == self.last_modified:
+                return web.Response(status=304, headers=headers)
+        return web.Response(body=self.content, headers=headers)
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    # Lets the tests skip ahead in time, instead of waiting for responses to expire.
+    now = [1000.0]
+    monkeypatch.setattr(http_module, "monotonic", lambda: now[0])
+    return now
+
+
+def _run_with_server(
+    server: _Server, test: Callable[[HttpClient, str], Awaitable[None]]
+) -> None:
+    async def run() -> None:
+        client = HttpClient(10, 10, 30.0, 5.0, 5.0, 0, max_cached_responses=2)
+        url = await server.start()
+        try:
+            await test(client, url)
+        finally:
+            await client.close()
+            await server.stop()
+
+    asyncio.run(run())
+
+
+def test_fresh_responses_are_reused_until_they_expire(clock: list[float]) -> None:
+    server = _Server(cache_control="max-age=60")
+
+    async def test(client: HttpClient, url: str) -> None:
+        assert await client.get_content(url) == b"first"
+        server.content = b"second"
+        clock[0] += 59
+        assert await client.get_content(url) == b"first"
+        assert len(server.requests) == 1
+
+        clock[0] += 2
+        assert await client.get_content(url) == b"second"
+        assert server.requests == [{}, {}]  # There was nothing to revalidate with.
+
+    _run_with_server(server, test)
+
+
+def test_stale_responses_are_revalidated_with_their_etag(clock: list[float]) -> None:
+    server = _Server(cache_control="max-age=60", use_etag=True)
+
+    async def test(client: HttpClient, url: str) -> None:
+        assert await client.get_content(url) == b"first"
+        clock[0] += 61
+        assert await client.get_content(url) == b"first"  # Unchanged (i.e. a 304).
+        assert server.requests[-1] == {hdrs.IF_NONE_MATCH: '"first"'}
+
+        # The 304 made the response fresh again, so this doesn't make a request.
+        assert await client.get_content(url) == b"first"
+        assert len(server.requests) == 2
+
+        server.content = b"second"
+        clock[0] += 61
+        assert await client.get_content(url) == b"second"
+        assert server.requests[-1] == {hdrs.IF_NONE_MATCH: '"first"'}
+        clock[0] += 61
+        assert await client.get_content(url) == b"second"
+        assert server.requests[-1] == {hdrs.IF_NONE_MATCH: '"second"'}
+
+    _run_with_server(server, test)
+
+
+def test_responses_are_revalidated_with_their_last_modified_date() -> None:
+    # Without a `max-age`, the response has to be revalidated every time.
+    server = _Server(last_modified=_LAST_MODIFIED)
+
+    async def test(client: HttpClient, url: str) -> None:
+        for _ in range(3):
+            assert await client.get_content(url) == b"first"
+        assert server.requests == [{}] + [{hdrs.IF_MODIFIED_SINCE: _LAST_MODIFIED}] * 2
+
+        server.content = b"second"
+        server.last_modified = "Sun, 02 Jan 2022 00:00:00 GMT"
+        assert await client.get_content(url) == b"second"
+
+    _run_with_server(server, test)
+
+
+@pytest.mark.parametrize("cache_control", ["no-store", "private, max-age=60"])
+def test_uncacheable_responses_are_not_reused(cache_control: str) -> None:
+    server = _Server(cache_control=cache_control, use_etag=True)
+
+    async def test(client: HttpClient, url: str) -> None:
+        assert await client.get_content(url) == b"first"
+        server.content = b"second"
+        assert await client.get_content(url) == b"second"
+        assert server.requests == [{}, {}]
+
+    _run_with_server(server, test)
@@ -0,0 +1,66 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from qibot.utils import json as json_module
+from qibot.utils import load_json_from_file
+
+
+@pytest.fixture(autouse=True)
+def data_path(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Path:
+    monkeypatch.setattr(json_module, "DATA_PATH", tmp_path)
+    return tmp_path
+
+
+def _write_json(path: Path, data: object) -> None:
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+def test_files_can_be_loaded_without_a_snapshot(data_path: Path) -> None:
+    _write_json(data_path / "secrets.json", {"Token": "secret"})
+    # Even an existing snapshot (e.g. from an older version) isn't kept around.
+    load_json_from_file("secrets", dict)
+    load_json_from_file("secrets", dict, lowercase_dict_keys=True)
+    assert len(list(data_path.glob("*.snapshot"))) == 2
+
+    data = load_json_from_file("secrets", dict, use_snapshot=False)
+    assert data == {"Token": "secret"}
+    assert not list(data_path.glob("*.snapshot"))
+    assert load_json_from_file("secrets", list, use_snapshot=False) == []
+
+
+def test_snapshots_are_kept_for_each_way_of_loading_a_file(data_path: Path) -> None:
+    file_path = data_path / "characters.json"
+    _write_json(file_path, {"Qi": ["Hi!"]})
+    assert load_json_from_file("characters", dict) == {"Qi": ["Hi!"]}
+    assert load_json_from_file("characters", dict, lowercase_dict_keys=True) == {
+        "qi": ["Hi!"]
+    }
+    assert load_json_from_file("characters", list) == ["Hi!"]
+
+    # Sneak in a change that the snapshots can't detect, to show that they're used.
+    file_stat = file_path.stat()
+    _write_json(file_path, {"Qi": ["Yo!"]})
+    os.utime(file_path, ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns))
+    assert load_json_from_file("characters", dict) == {"Qi": ["Hi!"]}
+    assert load_json_from_file("characters", dict, lowercase_dict_keys=True) == {
+        "qi": ["Hi!"]
+    }
+    assert load_json_from_file("characters", list) == ["Hi!"]
+
+
+def test_snapshots_are_invalidated_when_the_file_changes(data_path: Path) -> None:
+    file_path = data_path / "characters.json"
+    _write_json(file_path, {"Qi": "Hi!"})
+    assert load_json_from_file("characters", dict) == {"Qi": "Hi!"}
+
+    _write_json(file_path, {"Qi": "Hello!"})
+    assert load_json_from_file("characters", dict) == {"Qi": "Hello!"}
+
+    # Even if the size stays the same, the modification time gives it away.
+    file_stat = file_path.stat()
+    _write_json(file_path, {"Qi": "Howdy!"})
+    os.utime(file_path, ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns + 1))
+    assert load_json_from_file("characters", dict) == {"Qi": "Howdy!"}
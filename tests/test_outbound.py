@@ -0,0 +1,223 @@
+import asyncio
+from io import BytesIO
+from time import monotonic
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from discord import File, NotFound
+
+from qibot.utils import METRICS, BotChannel, Priority
+from qibot.utils.outbound import OutboundScheduler, _RateLimitTracker
+
+_CHANNEL = BotChannel.WELCOME
+
+
+class _FakeDiscord:
+    def __init__(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        self.sent: list[tuple[int, Any]] = []  # Each message's webhook ID and content.
+        self.evicted: list[int] = []
+        self.webhook_id: int = 1
+        self.deleted_webhook_ids: set[int] = set()
+        # Nothing can be sent until the test is ready, so that messages pile up.
+        self.is_ready: asyncio.Event = asyncio.Event()
+
+        async def get_webhook(_: BotChannel, guild_id: int | None = None) -> Any:
+            await self.is_ready.wait()
+            return SimpleNamespace(id=self.webhook_id, token="token")
+
+        async def evict_webhook(
+            _: BotChannel, webhook: Any, guild_id: int | None = None
+        ) -> None:
+            self.evicted.append(webhook.id)
+            self.webhook_id += 1
+
+        monkeypatch.setattr(BotChannel, "get_webhook", get_webhook)
+        monkeypatch.setattr(BotChannel, "evict_webhook", evict_webhook)
+
+    async def send(self, webhook: Any, **send_kwargs: Any) -> None:
+        if files := send_kwargs.get("files"):
+            content = files[0].fp.read()  # Uploaded before the webhook is checked.
+        else:
+            content = send_kwargs["content"]
+        if webhook.id in self.deleted_webhook_ids:
+            raise NotFound(SimpleNamespace(status=404, reason="Not Found"), "Gone")
+        self.sent.append((webhook.id, content))
+
+
+def _create_scheduler(
+    discord: _FakeDiscord, max_queue_size: int = 100
+) -> OutboundScheduler:
+    scheduler = OutboundScheduler(max_queue_size, 0, 5.0, 0.1)
+    setattr(scheduler, "_send", discord.send)
+    return scheduler
+
+
+def _get_shed_count() -> int:
+    key = (
+        "outbound_dropped_total",
+        (("channel", _CHANNEL.name), ("reason", "queue_full")),
+    )
+    return METRICS.counters.get(key, 0)
+
+
+def test_full_queues_shed_the_newest_least_important_message(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    discord = _FakeDiscord(monkeypatch)
+    results: dict[str, bool] = {}
+    shed_count = _get_shed_count()
+
+    async def submit(scheduler: OutboundScheduler, content: str, priority: Priority):
+        def on_done(sent: bool) -> None:
+            results[content] = sent
+
+        await scheduler.submit(_CHANNEL, priority, on_done=on_done, content=content)
+
+    async def run() -> None:
+        scheduler = _create_scheduler(discord, max_queue_size=2)
+        await submit(scheduler, "low", Priority.LOW)
+        await submit(scheduler, "first normal", Priority.NORMAL)
+        await submit(scheduler, "second normal", Priority.NORMAL)  # Sheds "low".
+        await submit(scheduler, "another low", Priority.LOW)  # Sheds itself.
+        await submit(scheduler, "high", Priority.HIGH)  # Sheds "second normal".
+        discord.is_ready.set()
+        await scheduler.close()
+
+    asyncio.run(run())
+    assert [content for _, content in discord.sent] == ["high", "first normal"]
+    assert results == {
+        "low": False,
+        "another low": False,
+        "second normal": False,
+        "high": True,
+        "first normal": True,
+    }
+    assert _get_shed_count() == shed_count + 3
+
+
+def test_queues_full_of_high_priority_messages_hold_up_submissions(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    discord = _FakeDiscord(monkeypatch)
+    shed_count = _get_shed_count()
+
+    async def run() -> None:
+        scheduler = _create_scheduler(discord, max_queue_size=2)
+        for content in ("first", "second"):
+            await scheduler.submit(_CHANNEL, Priority.HIGH, content=content)
+        submission = asyncio.create_task(
+            scheduler.submit(_CHANNEL, Priority.HIGH, content="third")
+        )
+        await asyncio.sleep(0.01)
+        assert not submission.done()
+
+        discord.is_ready.set()
+        await submission
+        await scheduler.close()
+
+    asyncio.run(run())
+    assert [content for _, content in discord.sent] == ["first", "second", "third"]
+    assert _get_shed_count() == shed_count
+
+
+def test_deleted_webhooks_are_replaced_and_retried_once(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    discord = _FakeDiscord(monkeypatch)
+    discord.deleted_webhook_ids.add(1)
+    discord.is_ready.set()
+
+    async def run() -> None:
+        scheduler = _create_scheduler(discord)
+        file = File(BytesIO(b"image"), filename="image.png")
+        await scheduler.submit(_CHANNEL, Priority.HIGH, files=[file])
+        await asyncio.sleep(0.01)
+        # If the replacement is gone too, the message isn't sent.
+        discord.deleted_webhook_ids.update([2, 3])
+        await scheduler.submit(_CHANNEL, Priority.HIGH, content="unsent")
+        await scheduler.close()
+
+    asyncio.run(run())
+    # The file is sent in full, even though the first attempt already read it.
+    assert discord.sent == [(2, b"image")]
+    assert discord.evicted == [1, 2]
+
+
+def _create_request_end_params(
+    path: str, status: int, **headers: str
+) -> SimpleNamespace:
+    response = SimpleNamespace(status=status, headers=headers)
+    return SimpleNamespace(url=SimpleNamespace(path=path), response=response)
+
+
+async def _time_wait_for_bucket(tracker: _RateLimitTracker, webhook_id: int) -> float:
+    start_time = monotonic()
+    await tracker.wait_for_bucket(webhook_id)
+    return monotonic() - start_time
+
+
+def test_rate_limits_are_waited_out_per_webhook() -> None:
+    rate_limited_count = METRICS.counters.get(("rate_limited_total", ()), 0)
+    tracker = _RateLimitTracker()
+
+    async def run() -> None:
+        params = [
+            _create_request_end_params(
+                "/api/v10/webhooks/1/token",
+                200,
+                **{"X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": "0.05"},
+            ),
+            _create_request_end_params(
+                "/api/v10/webhooks/2/token", 429, **{"Retry-After": "0.05"}
+            ),
+            # Other requests, and webhooks with requests to spare, don't wait.
+            _create_request_end_params(
+                "/api/v10/channels/3/messages", 429, **{"Retry-After": "10"}
+            ),
+            _create_request_end_params(
+                "/api/v10/webhooks/4/token",
+                200,
+                **{"X-RateLimit-Remaining": "1", "X-RateLimit-Reset-After": "10"},
+            ),
+        ]
+        for param in params:
+            await tracker._on_request_end(None, None, param)  # type: ignore[arg-type]
+
+        waits = await asyncio.gather(
+            *(_time_wait_for_bucket(tracker, webhook_id) for webhook_id in range(1, 5))
+        )
+        assert [wait >= 0.04 for wait in waits] == [True, True, False, False]
+        # Once a bucket resets, the next send can go ahead straight away.
+        assert await _time_wait_for_bucket(tracker, 1) < 0.04
+
+    asyncio.run(run())
+    assert METRICS.counters.get(("rate_limited_total", ()), 0) == rate_limited_count + 1
+
+
+def test_workers_wait_for_rate_limits_between_sends(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    discord = _FakeDiscord(monkeypatch)
+    discord.is_ready.set()
+    send_times: list[float] = []
+
+    async def run() -> None:
+        scheduler = _create_scheduler(discord)
+        tracker = getattr(scheduler, "_rate_limits")
+
+        async def send(webhook: Any, **send_kwargs: Any) -> None:
+            send_times.append(monotonic())
+            params = _create_request_end_params(
+                f"/api/v10/webhooks/{webhook.id}/token", 429, **{"Retry-After": "0.05"}
+            )
+            await tracker._on_request_end(None, None, params)
+
+        setattr(scheduler, "_send", send)
+        for content in ("first", "second"):
+            await scheduler.submit(_CHANNEL, Priority.HIGH, content=content)
+        await scheduler.close()
+
+    asyncio.run(run())
+    assert len(send_times) == 2
+    assert send_times[1] - send_times[0] >= 0.04
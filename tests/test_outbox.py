@@ -0,0 +1,136 @@
+import asyncio
+from collections.abc import Callable
+from io import BytesIO
+from pathlib import Path
+from typing import Any, cast
+
+from discord import Embed, File
+
+from qibot.utils import METRICS, BotChannel, Priority
+from qibot.utils.outbound import OutboundScheduler
+from qibot.utils.outbox import Outbox
+
+
+class _FakeScheduler:
+    def __init__(self) -> None:
+        self.submissions: list[dict[str, Any]] = []
+
+    async def submit(
+        self,
+        channel: BotChannel,
+        priority: Priority,
+        guild_id: int | None = None,
+        on_done: Callable[[bool], None] | None = None,
+        **send_kwargs: Any,
+    ) -> None:
+        # Nothing is sent until the test calls `on_done`, as if the send just finished.
+        self.submissions.append(
+            {"channel": channel, "priority": priority, "on_done": on_done} | send_kwargs
+        )
+
+
+def _create_outbox(
+    database_path: Path, max_attempts: int = 5
+) -> tuple[Outbox, _FakeScheduler]:
+    scheduler = _FakeScheduler()
+    outbox = Outbox(
+        scheduler=cast(OutboundScheduler, scheduler),
+        enabled=True,
+        database_path=database_path,
+        flush_interval=0.01,
+        retry_delay=0.01,
+        max_attempts=max_attempts,
+    )
+    return outbox, scheduler
+
+
+async def _submit_message(outbox: Outbox, text: str) -> None:
+    await outbox.submit(
+        BotChannel.ADMIN_LOG,
+        Priority.HIGH,
+        username="Bouncer",
+        embeds=[Embed(description=text)],
+        files=[File(BytesIO(text.encode()), filename=f"{text}.png")],
+    )
+
+
+async def _replay_after_restart(database_path: Path) -> list[dict[str, Any]]:
+    outbox, scheduler = _create_outbox(database_path)
+    await outbox.replay()
+    await outbox.close()
+    return scheduler.submissions
+
+
+def _get_counter(name: str) -> int:
+    return METRICS.counters.get((name, (("channel", "ADMIN_LOG"),)), 0)
+
+
+def test_unsent_messages_are_replayed_after_a_restart(tmp_path: Path) -> None:
+    database_path = tmp_path / "outbox.sqlite3"
+
+    async def run() -> None:
+        outbox, scheduler = _create_outbox(database_path)
+        await _submit_message(outbox, "sent")
+        await _submit_message(outbox, "unsent")
+        scheduler.submissions[0]["on_done"](True)
+        # Simulate a crash (or shutdown) before the second message could be sent.
+        await outbox.close()
+
+        replayed = await _replay_after_restart(database_path)
+        assert len(replayed) == 1
+        assert replayed[0]["channel"] is BotChannel.ADMIN_LOG
+        assert replayed[0]["priority"] is Priority.HIGH
+        assert replayed[0]["username"] == "Bouncer"
+        assert [embed.description for embed in replayed[0]["embeds"]] == ["unsent"]
+        file = replayed[0]["files"][0]
+        assert (file.filename, file.fp.read()) == ("unsent.png", b"unsent")
+
+        # Once the replayed message is sent, it isn't replayed again.
+        outbox, scheduler = _create_outbox(database_path)
+        await outbox.replay()
+        scheduler.submissions[0]["on_done"](True)
+        await outbox.close()
+        assert not await _replay_after_restart(database_path)
+
+    asyncio.run(run())
+
+
+def test_failed_messages_are_retried_until_abandoned(tmp_path: Path) -> None:
+    database_path = tmp_path / "outbox.sqlite3"
+    retries = _get_counter("outbox_retries_total")
+    abandoned = _get_counter("outbox_abandoned_total")
+
+    async def run() -> None:
+        outbox, scheduler = _create_outbox(database_path, max_attempts=2)
+        await _submit_message(outbox, "retried")
+        scheduler.submissions[0]["on_done"](False)
+        await asyncio.sleep(0.1)
+
+        assert len(scheduler.submissions) == 2
+        assert scheduler.submissions[1]["embeds"][0].description == "retried"
+        scheduler.submissions[1]["on_done"](False)
+        await asyncio.sleep(0.1)
+        await outbox.close()
+
+        assert len(scheduler.submissions) == 2
+        assert not await _replay_after_restart(database_path)
+
+    asyncio.run(run())
+    assert _get_counter("outbox_retries_total") == retries + 1
+    assert _get_counter("outbox_abandoned_total") == abandoned + 1
+
+
+def test_disabled_outbox_passes_messages_straight_through(tmp_path: Path) -> None:
+    database_path = tmp_path / "outbox.sqlite3"
+    scheduler = _FakeScheduler()
+    outbox = Outbox(cast(OutboundScheduler, scheduler), False, database_path, 0, 0, 1)
+
+    async def run() -> None:
+        await _submit_message(outbox, "direct")
+        await outbox.replay()
+        await outbox.close()
+
+    asyncio.run(run())
+    assert len(scheduler.submissions) == 1
+    assert scheduler.submissions[0]["on_done"] is None
+    assert not database_path.exists()
@@ -0,0 +1,34 @@
+from discord import Embed
+
+from qibot.characters.overseer import (
+    _BOT_STATS_FIELDS,
+    _get_counter_lines,
+    _get_histogram_lines,
+)
+from qibot.embeds.fields import add_rendered_fields
+from qibot.utils import METRICS
+
+
+def test_stats_fields_fit_within_discords_limits() -> None:
+    for index in range(200):
+        METRICS.increment("outbound_shed_total", channel=f"CHANNEL_{index}")
+        METRICS.observe("listener_seconds", 0.1, listener=f"listener_{index}")
+
+    counter_lines = _get_counter_lines()
+    fields = _BOT_STATS_FIELDS.fill(
+        _get_histogram_lines("listener_seconds", "listener"),
+        [],
+        [],
+        counter_lines,
+    )
+
+    assert all(len(field.value) <= 1024 for field in fields)
+    *shown_lines, more_line = fields[-1].value.splitlines()
+    assert f"*+{len(counter_lines) - len(shown_lines)} more*" in more_line
+    assert len(add_rendered_fields(Embed(title="Stats"), fields)) <= 6000
+
+
+def test_short_fields_are_shown_in_full() -> None:
+    fields = _BOT_STATS_FIELDS.fill(["one"], ["two"], ["three", "four"], [])
+    assert "four" in fields[2].value
+    assert "more" not in "".join(field.value for field in fields)
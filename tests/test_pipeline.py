@@ -0,0 +1,170 @@
+import asyncio
+import random
+from collections.abc import Awaitable, Callable
+
+from qibot.utils import METRICS
+from qibot.utils.pipeline import EventPipeline, OverflowPolicy
+
+
+def _create_pipeline(
+    overflow_policy: OverflowPolicy, max_workers: int = 1, max_queued: int = 2
+) -> EventPipeline:
+    return EventPipeline(max_workers, max_queued, overflow_policy, drain_timeout=5.0)
+
+
+def _get_drop_count(listener: str, policy: OverflowPolicy) -> int:
+    key = ("pipeline_dropped_total", (("listener", listener), ("reason", policy.value)))
+    return METRICS.counters.get(key, 0)
+
+
+class _Recorder:
+    def __init__(self) -> None:
+        self.handled: list[str] = []
+        self.release: asyncio.Event = asyncio.Event()
+
+    def record(self, name: str) -> Callable[[], Awaitable[None]]:
+        async def handler() -> None:
+            self.handled.append(name)
+
+        return handler
+
+    def block(self, name: str) -> Callable[[], Awaitable[None]]:
+        async def handler() -> None:
+            self.handled.append(name)
+            await self.release.wait()
+
+        return handler
+
+
+async def _submit_while_blocked(
+    pipeline: EventPipeline, recorder: _Recorder, listener: str
+) -> list[bool]:
+    # Occupy the only worker, so that the following events have to wait in the queue.
+    await pipeline.submit("blocker", listener, recorder.block("blocker"))
+    await asyncio.sleep(0)
+    return [
+        await pipeline.submit(name, listener, recorder.record(name))
+        for name in ("first", "second", "third")
+    ]
+
+
+def test_events_with_the_same_key_are_handled_in_order() -> None:
+    random.seed(0)
+    handled: dict[int, list[int]] = {key: [] for key in range(5)}
+    running: set[int] = set()
+
+    def create_handler(key: int, index: int) -> Callable[[], Awaitable[None]]:
+        async def handler() -> None:
+            assert key not in running
+            running.add(key)
+            await asyncio.sleep(random.uniform(0, 0.002))
+            handled[key].append(index)
+            running.discard(key)
+
+        return handler
+
+    async def run() -> None:
+        pipeline = _create_pipeline(OverflowPolicy.BLOCK, max_workers=4, max_queued=100)
+        for index in range(20):
+            for key in handled:
+                await pipeline.submit(key, "test_order", create_handler(key, index))
+        await pipeline.close()
+
+    asyncio.run(run())
+    assert handled == {key: list(range(20)) for key in handled}
+
+
+def test_drop_newest_rejects_the_submitted_event() -> None:
+    listener = "test_drop_newest"
+    drop_count = _get_drop_count(listener, OverflowPolicy.DROP_NEWEST)
+    recorder = _Recorder()
+
+    async def run() -> None:
+        pipeline = _create_pipeline(OverflowPolicy.DROP_NEWEST)
+        assert await _submit_while_blocked(pipeline, recorder, listener) == [
+            True,
+            True,
+            False,
+        ]
+        assert pipeline.queued_count == 2
+        recorder.release.set()
+        await pipeline.close()
+        assert pipeline.queued_count == 0
+
+    asyncio.run(run())
+    assert recorder.handled == ["blocker", "first", "second"]
+    assert _get_drop_count(listener, OverflowPolicy.DROP_NEWEST) == drop_count + 1
+
+
+def test_drop_oldest_discards_the_longest_waiting_event() -> None:
+    listener = "test_drop_oldest"
+    drop_count = _get_drop_count(listener, OverflowPolicy.DROP_OLDEST)
+    recorder = _Recorder()
+
+    async def run() -> None:
+        pipeline = _create_pipeline(OverflowPolicy.DROP_OLDEST)
+        assert await _submit_while_blocked(pipeline, recorder, listener) == [
+            True,
+            True,
+            True,
+        ]
+        assert pipeline.queued_count == 2
+        recorder.release.set()
+        await pipeline.close()
+        assert pipeline.queued_count == 0
+
+    asyncio.run(run())
+    assert recorder.handled == ["blocker", "second", "third"]
+    assert _get_drop_count(listener, OverflowPolicy.DROP_OLDEST) == drop_count + 1
+
+
+def test_block_waits_for_room_without_dropping() -> None:
+    recorder = _Recorder()
+
+    async def run() -> None:
+        pipeline = _create_pipeline(OverflowPolicy.BLOCK)
+        submission = asyncio.create_task(
+            _submit_while_blocked(pipeline, recorder, "test_block")
+        )
+        await asyncio.sleep(0.01)
+        assert not submission.done()
+        assert pipeline.queued_count == 2
+
+        recorder.release.set()
+        assert await submission == [True, True, True]
+        await pipeline.close()
+
+    asyncio.run(run())
+    assert recorder.handled == ["blocker", "first", "second", "third"]
+
+
+def test_errors_in_handlers_do_not_stop_the_workers() -> None:
+    recorder = _Recorder()
+
+    async def fail() -> None:
+        raise RuntimeError("Expected by the test.")
+
+    async def run() -> None:
+        pipeline = _create_pipeline(OverflowPolicy.BLOCK)
+        await pipeline.submit("key", "test_errors", fail)
+        await pipeline.submit("key", "test_errors", recorder.record("after"))
+        await pipeline.close()
+
+    asyncio.run(run())
+    assert recorder.handled == ["after"]
+
+
+def test_events_with_different_keys_do_not_wait_for_each_other() -> None:
+    recorder = _Recorder()
+
+    async def run() -> None:
+        # e.g. A member's greeting shouldn't wait for their (slow) join report to send.
+        pipeline = _create_pipeline(OverflowPolicy.BLOCK, max_workers=2)
+        await pipeline.submit(1, "test_keys", recorder.block("report"))
+        await pipeline.submit(("greet", 1), "test_keys", recorder.record("greeting"))
+        await asyncio.sleep(0.01)
+        assert recorder.handled == ["report", "greeting"]
+        recorder.release.set()
+        await pipeline.close()
+
+    asyncio.run(run())
@@ -0,0 +1,47 @@
+import importlib
+import sys
+from collections.abc import Iterator
+from importlib import resources
+from importlib.machinery import SourceFileLoader
+from pathlib import Path
+
+import pytest
+
+from qibot.utils.profiling import StartupProfiler
+
+_PACKAGE_NAME = "profiled_package"
+
+
+@pytest.fixture
+def package_path(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Iterator[Path]:
+    package_path = tmp_path / _PACKAGE_NAME
+    package_path.mkdir()
+    (package_path / "__init__.py").write_text(f"from {_PACKAGE_NAME} import child")
+    (package_path / "child.py").write_text("VALUE = 1")
+    (package_path / "data.txt").write_text("data")
+
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield package_path
+    for name in (_PACKAGE_NAME, f"{_PACKAGE_NAME}.child"):
+        sys.modules.pop(name, None)
+
+
+def test_imports_are_timed_without_replacing_loaders(package_path: Path) -> None:
+    profiler = StartupProfiler()
+    profiler.start()
+    try:
+        package = importlib.import_module(_PACKAGE_NAME)
+    finally:
+        profiler.stop()
+
+    timings = {timing.name: timing for timing in getattr(profiler, "_module_timings")}
+    assert timings.keys() == {_PACKAGE_NAME, f"{_PACKAGE_NAME}.child"}
+    package_timing = timings[_PACKAGE_NAME]
+    assert package_timing.total_seconds >= package_timing.self_seconds
+
+    assert package.__spec__
+    loader = package.__spec__.loader
+    assert isinstance(loader, SourceFileLoader)
+    assert "exec_module" not in vars(loader)  # Unwrapped once profiling stopped.
+    assert resources.files(package).joinpath("data.txt").read_text() == "data"
+    assert importlib.reload(package.child).VALUE == 1